@@ -23,3 +23,12 @@ class AppUserAdmin(UserAdmin):
         (None, {'fields': ('role',)}),
         (None, {'fields': ('email_verified',)}),
     )
+
+
+@admin.register(models.EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'to', 'status', 'attempts', 'next_attempt', 'sent', 'created')
+    list_filter = ('status', 'kind')
+    search_fields = ('to',)
+    ordering = ('-created',)
+    readonly_fields = ('user', 'attempts', 'claim', 'error', 'sent', 'created', 'updated')
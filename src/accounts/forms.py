@@ -3,11 +3,13 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import transaction
+from django.db.models import Q
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column, Field, HTML
 
-from utils.send_verify_email import send_verify_email
+from .models import EmailOutbox, email_matches, expired_unverified_users, username_matches
 
 
 User = get_user_model()
@@ -21,11 +23,14 @@ class BaseAppUserCreationForm(UserCreationForm):
         __init__(*args, **kwargs):
             Initializes the form with custom layout and field properties using crispy forms.
         save(commit=True):
-            Saves the user instance with the assigned role and sends a verification email.
+            Saves the user instance with the assigned role and queues a verification email
+            in the same transaction, replacing the expired unverified accounts holding its email or username.
         clean_email():
-            Validates that the email is unique.
+            Normalises the email and validates that it is unique in any case, ignoring accounts
+            whose verification link expired.
         clean_username():
-            Validates that the username is unique and strips any leading/trailing whitespace.
+            Normalises the username (stripped and lowercased) and validates that it is unique in any case,
+            ignoring accounts whose verification link expired.
     """
 
     role = None
@@ -89,19 +94,35 @@ class BaseAppUserCreationForm(UserCreationForm):
         user.is_active = False
 
         if commit:
-            user.save()
-            send_verify_email(user)
+            # The email is sent by the `send_emails` command, the request never waits on the mail server
+            with transaction.atomic():
+                # An account whose link expired before it was verified gives up its email and username
+                expired_unverified_users().filter(
+                    email_matches(user.email) | Q(username_matches(user.username))
+                ).delete()
+                user.save()
+                EmailOutbox.objects.enqueue(user, EmailOutbox.Kinds.VERIFY_EMAIL)
 
         return user
 
     def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        email = User.objects.normalize_email(self.cleaned_data.get('email'))
+        if self.taken(email_matches(email)):
             raise forms.ValidationError('This email address is already in use.')
         return email
     
     def clean_username(self):
-        username = self.cleaned_data.get('username')
-        if User.objects.filter(username=username).exists():
+        username = User.normalize_username(self.cleaned_data.get('username'))
+        User._meta.get_field('username').run_validators(username)
+        if self.taken(username_matches(username)):
             raise forms.ValidationError('This username is already in use.')
-        return username.strip().lower()
+        return username
+
+    def _get_validation_exclusions(self):
+        # Uniqueness is checked by clean_email and clean_username, the model's unique
+        # constraints would also count the expired accounts that save() replaces
+        return super()._get_validation_exclusions() | {'username', 'email'}
+
+    @staticmethod
+    def taken(lookup) -> bool:
+        return User.objects.filter(lookup).exclude(pk__in=expired_unverified_users().values('pk')).exists()
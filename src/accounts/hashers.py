@@ -0,0 +1,105 @@
+import time
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# Seconds spent hashing passwords in the current request, see PasswordHashTimingMiddleware
+_hash_time = ContextVar('password_hash_time', default=None)
+
+
+def start_hash_timer():
+    """
+    Starts counting the time spent hashing passwords in the current context.
+    Returns:
+        Token: Passed to `stop_hash_timer`.
+    """
+
+    return _hash_time.set([0.0])
+
+
+def stop_hash_timer(token) -> float:
+    """
+    Stops the timer started with `start_hash_timer`.
+    Returns:
+        float: Seconds spent hashing passwords since the timer was started.
+    """
+
+    elapsed = _hash_time.get()
+    _hash_time.reset(token)
+    return elapsed[0] if elapsed else 0.0
+
+
+class TimedHasherMixin:
+    """
+    Password hasher mixin that adds the time spent in `encode` and `verify` to the hash timer
+    of the current request. The mixin must come before the hasher class.
+    """
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = _hash_time.get()
+            if elapsed is not None:
+                elapsed[0] += time.perf_counter() - started
+
+    def encode(self, *args, **kwargs):
+        return self._timed(super().encode, *args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        return self._timed(super().verify, *args, **kwargs)
+
+
+class TunedScryptPasswordHasher(TimedHasherMixin, hashers.ScryptPasswordHasher):
+    """
+    Scrypt hasher with its cost read from the PASSWORD_SCRYPT_* settings.
+    Hashes made with other parameters are rehashed on the next successful login.
+    """
+
+    # Only an upper bound for hashlib.scrypt, which refuses more than 32 MiB by default
+    maxmem = 1024 * 1024 * 1024
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class TunedArgon2PasswordHasher(TimedHasherMixin, hashers.Argon2PasswordHasher):
+    """
+    Argon2 hasher with its cost read from the PASSWORD_ARGON2_* settings. Needs argon2-cffi.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedPBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher with its iterations read from PASSWORD_PBKDF2_ITERATIONS.
+    Also verifies the hashes made before the hasher policy was introduced.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,61 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from utils.logging import send_log
+
+from .hashers import start_hash_timer, stop_hash_timer
+
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashTimingMiddleware:
+    """
+    Records the time each request spends hashing passwords (logins, sign ups, password changes).
+
+    The time is reported in a `Server-Timing: hash;dur=<ms>` response header and
+    kept on `request.password_hash_time`, and requests over PASSWORD_HASH_BUDGET_MS are logged.
+    Only the tuned hashers of `accounts.hashers` are timed.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = start_hash_timer()
+        try:
+            response = self.get_response(request)
+        finally:
+            request.password_hash_time = stop_hash_timer(token)
+
+        return self.report(request, response)
+
+    async def __acall__(self, request):
+        token = start_hash_timer()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request.password_hash_time = stop_hash_timer(token)
+
+        return self.report(request, response)
+
+    def report(self, request, response):
+        if request.password_hash_time:
+            duration = request.password_hash_time * 1000
+            timing = f'hash;dur={duration:.1f}'
+            response['Server-Timing'] = f'{response["Server-Timing"]}, {timing}' if response.has_header('Server-Timing') else timing
+
+            if duration > settings.PASSWORD_HASH_BUDGET_MS:
+                send_log(logger, f'Password hashing took {duration:.0f}ms on {request.path}', level='warning')
+
+        return response
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:38
+
+import accounts.models
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def normalise_accounts(apps, schema_editor):
+    """
+    Lowercases the stored usernames and emails, refusing to run while two accounts
+    share a username or an email in different cases.
+    """
+
+    AppUser = apps.get_model('accounts', 'AppUser')
+
+    collisions = []
+    for field in ('username', 'email'):
+        duplicates = (
+            AppUser.objects.exclude(**{field: ''})
+            .values(key=Lower(Trim(field)))
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .order_by('key')
+        )
+        collisions += [f'{field} {row["key"]!r} ({row["count"]} accounts)' for row in duplicates[:50]]
+
+    if collisions:
+        raise RuntimeError(
+            'Cannot add the case-insensitive unique indexes, these accounts collide: '
+            f'{", ".join(collisions)}. Rename or merge them and run the migration again.'
+        )
+
+    for field in ('username', 'email'):
+        normalised = Lower(Trim(field))
+        AppUser.objects.exclude(**{field: normalised}).update(**{field: normalised})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_emailoutbox'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='appuser',
+            managers=[
+                ('objects', accounts.models.AppUserAccountManager()),
+            ],
+        ),
+        migrations.RunPython(normalise_accounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='appuser_username_ci_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='appuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='appuser_email_ci_uniq'),
+        ),
+    ]
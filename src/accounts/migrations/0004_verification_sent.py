@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:03
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_verification_sent(apps, schema_editor):
+    """
+    Dates the links of existing accounts from their registration, when they were sent.
+    """
+
+    AppUser = apps.get_model('accounts', 'AppUser')
+    AppUser.objects.update(verification_sent=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_case_insensitive_username_email'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='verification_sent',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_verification_sent, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['verification_sent'], name='appuser_verification_sent_idx'),
+        ),
+    ]
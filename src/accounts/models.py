@@ -2,13 +2,19 @@ import os
 import logging
 import shortuuid
 
+from datetime import timedelta
 from uuid import uuid4
 
-from django.contrib.auth.models import AbstractUser
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
+from django.utils import timezone
 
 from utils.logging import send_log
 from utils.image_compression import compress
+from utils.models import DirtyFieldsMixin
 
 
 DEFAULT_IMAGE_PATH = 'img/def.png'
@@ -16,18 +22,40 @@ DEFAULT_IMAGE_PATH = 'img/def.png'
 logger = logging.getLogger(__name__)
 
 
-class AppUser(AbstractUser):
+class AppUserAccountManager(UserManager):
+    """
+    Default manager of the AppUser model, looking accounts up case-insensitively.
+    Methods:
+        normalize_email(email): Returns the email stripped and lowercased.
+        get_by_natural_key(username): Returns the user with the username in any case,
+            used by the authentication backend.
+    """
+
+    @classmethod
+    def normalize_email(cls, email):
+        return (email or '').strip().lower()
+
+    def get_by_natural_key(self, username):
+        return self.get(username_matches(username))
+
+
+class AppUser(DirtyFieldsMixin, AbstractUser):
     """
     AppUser model that extends the AbstractUser model to include additional fields and methods.
     Attributes:
         role (str): The role of the user, chosen from predefined roles (USER, MENTOR, MANAGER, ADMIN).
         email_verified (bool): Indicates whether the user's email has been verified.
+        verification_sent (datetime): When the last verification link was sent, which it expires after.
     Meta:
         ordering (list): Default ordering of the users by creation date in descending order.
-        indexes (list): Database indexes for the role and created fields.
+        indexes (list): Database indexes for the role, created and verification_sent fields.
+        constraints (list): Case-insensitive unique indexes on the username and the (non-empty) email.
     Methods:
         __str__(): Returns the username of the user.
-        save(*args, **kwargs): Custom save method to set is_staff and is_superuser based on the user's role.
+        normalize_username(username): Returns the username stripped and lowercased.
+        save(*args, **kwargs): Custom save method to normalise the username and email and to set
+            is_staff and is_superuser based on the user's role, writing only the changed fields.
+        apply_role_flags(): Sets is_staff and is_superuser based on the user's role, also used where save is bypassed.
         profile: Property that returns the user's profile based on their role.
     """
 
@@ -40,23 +68,41 @@ class AppUser(AbstractUser):
     role = models.CharField(max_length=15, choices=Roles, default=Roles.USER)
 
     email_verified = models.BooleanField(default=False)
+    verification_sent = models.DateTimeField(default=timezone.now)
 
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
 
+    objects = AppUserAccountManager()
+
     class Meta:
         ordering = ['-created']
         indexes = [
             models.Index(fields=['role'], name='appuser_role_idx'),
             models.Index(fields=['created'], name='appuser_created_idx'),
+            models.Index(fields=['verification_sent'], name='appuser_verification_sent_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(Lower('username'), name='appuser_username_ci_uniq'),
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='appuser_email_ci_uniq'),
         ]
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def normalize_username(cls, username):
+        return super().normalize_username(username or '').strip().lower()
     
     def save(self, *args, **kwargs):
+        self.username = self.normalize_username(self.username)
+        self.email = AppUserAccountManager.normalize_email(self.email)
+        self.apply_role_flags()
+        super().save(*args, **kwargs)
+
+    def apply_role_flags(self):
         if self.role == self.Roles.MANAGER:
             self.is_staff = True
         elif self.role == self.Roles.ADMIN:
@@ -68,8 +114,6 @@ class AppUser(AbstractUser):
         else:
             self.is_staff = False
             self.is_superuser = False
-            
-        super().save(*args, **kwargs)
 
     @property
     def profile(self):
@@ -85,6 +129,38 @@ class AppUser(AbstractUser):
             return None
     
     
+def username_matches(username: str, field: str = 'username') -> Exact:
+    """
+    Returns a filter matching a username in any case, answered by the Lower('username') index.
+    Args:
+        username (str): The username to look up.
+        field (str, optional): Path of the username field from the queried model.
+    Example:
+        MentorProfile.objects.filter(username_matches(username, 'user__username'))
+    """
+
+    return Exact(Lower(field), AppUser.normalize_username(username))
+
+
+def email_matches(email: str, field: str = 'email') -> models.Q:
+    """
+    Returns a filter matching an email in any case, answered by the Lower('email') index.
+    The index leaves out empty emails, so the filter does too, or the index could not be used.
+    """
+
+    return models.Q(Exact(Lower(field), AppUserAccountManager.normalize_email(email))) & ~models.Q(**{field: ''})
+
+
+def expired_unverified_users():
+    """
+    Returns a queryset of the accounts that were never verified and whose
+    last verification link has expired.
+    """
+
+    threshold = timezone.now() - timedelta(seconds=settings.EMAIL_VERIFICATION_MAX_AGE)
+    return AppUser.objects.filter(email_verified=False, is_active=False, verification_sent__lt=threshold)
+
+
 class AppUserManager(models.Manager):
     """
     Custom manager for the AppUser model to filter users by their roles.
@@ -94,8 +170,15 @@ class AppUserManager(models.Manager):
         mentors(): Returns a queryset of users with the role 'MENTOR'.
         managers(): Returns a queryset of users with the role 'MANAGER'.
         admins(): Returns a queryset of users with the role 'ADMIN'.
+        directory(): Returns a queryset of verified mentors prepared for the mentors directory.
     """
 
+    DIRECTORY_FIELDS = (
+        'id', 'username', 'first_name', 'last_name', 'role', 'email_verified', 'created',
+        'mentor_profile__id', 'mentor_profile__user', 'mentor_profile__image', 'mentor_profile__renditions',
+        'mentor_profile__verified',
+    )
+
     def by_role(self, role):
         return super().get_queryset().filter(role=role)
     
@@ -110,6 +193,21 @@ class AppUserManager(models.Manager):
     
     def admins(self):
         return self.by_role(role=AppUser.Roles.ADMIN)
+
+    def directory(self):
+        """
+        Returns verified mentors with their profile joined in and skills prefetched,
+        loading only the columns rendered by the mentor cards, so that a page costs
+        a fixed number of queries regardless of its size.
+        """
+
+        return (
+            self.mentors()
+            .filter(email_verified=True)
+            .select_related('mentor_profile')
+            .prefetch_related('mentor_profile__skills__skill')
+            .only(*self.DIRECTORY_FIELDS)
+        )
     
 
 class AppUserProxy(AppUser):
@@ -125,4 +223,80 @@ class AppUserProxy(AppUser):
         return self.role == role
     
     class Meta:
-        proxy = True
\ No newline at end of file
+        proxy = True
+
+
+class EmailOutboxManager(models.Manager):
+    """
+    Custom manager for the EmailOutbox model.
+    Methods:
+        due(): Returns a queryset of the messages waiting to be sent whose next attempt is due, oldest first.
+        enqueue(user, kind): Creates a pending message for the user, to be written in the same
+            transaction as the change that triggers it.
+    """
+
+    def due(self):
+        return self.filter(
+            status=EmailOutbox.Statuses.PENDING,
+            next_attempt__lte=timezone.now(),
+        ).order_by('next_attempt')
+
+    def enqueue(self, user, kind):
+        return self.create(user=user, kind=kind, to=user.email)
+
+
+class EmailOutbox(models.Model):
+    """
+    A transactional email waiting to be delivered by the `send_emails` management command.
+
+    Messages are written in the same transaction as the change that triggers them, so that
+    a request never talks to the mail server and no email is lost or sent for a rolled back change.
+    The message itself is rendered when it is sent.
+    Attributes:
+        user (AppUser): The recipient. Pending messages are dropped with the user.
+        kind (str): The kind of email, chosen from predefined kinds.
+        to (str): The address the email is sent to.
+        status (str): The state of the message, chosen from predefined statuses.
+        attempts (int): How many times sending the message has been tried.
+        next_attempt (datetime): When the message is due to be sent, pushed back after a failed attempt.
+        claim (UUID): Identifies the worker that is sending the message.
+        error (str): The last error raised while sending the message.
+        sent (datetime): When the message was handed to the mail server.
+    """
+
+    class Kinds(models.TextChoices):
+        VERIFY_EMAIL = ('verify_email', 'Verify email')
+
+    class Statuses(models.TextChoices):
+        PENDING = ('pending', 'Pending')
+        SENDING = ('sending', 'Sending')
+        SENT = ('sent', 'Sent')
+        FAILED = ('failed', 'Failed')
+
+    user = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='outbox')
+    kind = models.CharField(max_length=30, choices=Kinds)
+    to = models.EmailField()
+
+    status = models.CharField(max_length=15, choices=Statuses, default=Statuses.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    claim = models.UUIDField(null=True, blank=True, editable=False)
+    error = models.TextField(blank=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
+
+    objects = EmailOutboxManager()
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name_plural = 'email outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt'], name='outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} to {self.to} ({self.status})'
@@ -0,0 +1,136 @@
+import logging
+
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from utils.logging import send_log
+from utils.send_verify_email import verify_email_message
+
+
+logger = logging.getLogger(__name__)
+
+# Builds the message of each kind of email from its recipient and the connection it is sent with
+BUILDERS = {
+    'verify_email': verify_email_message,
+}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Returns how long to wait before the next attempt, doubling with every failed one
+    up to EMAIL_OUTBOX_MAX_RETRY_DELAY.
+    """
+
+    delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def claim(batch_size: int) -> list:
+    """
+    Claims up to `batch_size` due messages for this worker.
+
+    Messages are claimed with one conditional UPDATE that tags them with a fresh claim id,
+    so that concurrent workers never send the same message twice.
+    Returns:
+        list[EmailOutbox]: The claimed messages, with their users joined in.
+    """
+
+    from accounts.models import EmailOutbox
+
+    Statuses = EmailOutbox.Statuses
+
+    ids = list(EmailOutbox.objects.due().values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    claim_id = uuid4()
+    EmailOutbox.objects.filter(pk__in=ids, status=Statuses.PENDING).update(
+        status=Statuses.SENDING,
+        claim=claim_id,
+        attempts=F('attempts') + 1,
+        updated=timezone.now(),
+    )
+
+    return list(EmailOutbox.objects.filter(claim=claim_id).select_related('user').order_by('next_attempt'))
+
+
+def send_batch(batch_size: int | None = None, connection=None) -> tuple[int, int]:
+    """
+    Sends a batch of due messages over one mail server connection.
+
+    A failed message goes back to the queue with an exponential backoff, and is given up on
+    after EMAIL_OUTBOX_MAX_ATTEMPTS attempts. The connection is closed after a failure,
+    since the server may have dropped it, and opened again for the next message.
+    Args:
+        batch_size (int, optional): Number of messages to claim, defaults to EMAIL_OUTBOX_BATCH_SIZE.
+        connection (BaseEmailBackend, optional): An open connection to reuse across batches.
+            Defaults to a new connection that is closed once the batch is sent.
+    Returns:
+        tuple[int, int]: The number of sent and failed messages.
+    """
+
+    from accounts.models import AppUser, EmailOutbox
+
+    Statuses = EmailOutbox.Statuses
+
+    messages = claim(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0, 0
+
+    own_connection = connection is None
+    if own_connection:
+        connection = get_connection()
+
+    sent = []
+    linked_users = []
+    failed = []
+
+    try:
+        for message in messages:
+            try:
+                # Opening an open connection does nothing, so the whole batch shares one session
+                connection.open()
+
+                email = BUILDERS[message.kind](message.user, connection=connection)
+                email.to = [message.to]
+                connection.send_messages([email])
+            except Exception as error:
+                send_log(logger, f'Sending {message.kind} email to {message.to} failed: {error}', level='warning')
+                connection.close()
+
+                message.error = str(error)
+                if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    message.status = Statuses.FAILED
+                else:
+                    message.status = Statuses.PENDING
+                    message.next_attempt = timezone.now() + retry_delay(message.attempts)
+                message.claim = None
+                failed.append(message)
+            else:
+                sent.append(message.pk)
+                if message.kind == EmailOutbox.Kinds.VERIFY_EMAIL:
+                    linked_users.append(message.user_id)
+    finally:
+        if own_connection:
+            connection.close()
+
+    EmailOutbox.objects.filter(pk__in=sent).update(
+        status=Statuses.SENT,
+        claim=None,
+        error='',
+        sent=timezone.now(),
+        updated=timezone.now(),
+    )
+
+    # The link is dated when it is built, the account expires with it rather than at registration
+    AppUser.objects.filter(pk__in=linked_users).update(verification_sent=timezone.now())
+
+    for message in failed:
+        message.save(update_fields=['status', 'next_attempt', 'claim', 'error', 'updated'])
+
+    return len(sent), len(failed)
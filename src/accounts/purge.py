@@ -0,0 +1,239 @@
+import os
+import shutil
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from mentors.models import MentorCard, MentorSkill, Skill
+from mentors.search import update_index
+from profiles.models import MentorProfile, ImageProcessingJob, PROFILE_MODELS, DEFAULT_IMAGE_PATH
+from profiles.storage import is_blob, profile_media_storage
+
+from utils.logging import send_log
+
+from .models import AppUser, EmailOutbox, expired_unverified_users
+
+
+logger = logging.getLogger(__name__)
+
+
+# Every model that references an account or its profiles, deleted by the fast path
+PURGED_MODELS = {
+    LogEntry, EmailOutbox, MentorCard, MentorSkill, *PROFILE_MODELS,
+    AppUser.groups.through, AppUser.user_permissions.through,
+}
+
+
+def unhandled_relations() -> list:
+    """
+    Returns the models referencing accounts or profiles that the fast path does not know about.
+    When there are any, accounts are deleted through the ORM instead.
+    """
+
+    related = set()
+    for model in (AppUser, *PROFILE_MODELS):
+        related.update(relation.related_model for relation in model._meta.related_objects if relation.on_delete)
+        related.update(field.remote_field.through for field in model._meta.many_to_many)
+
+    return sorted(model._meta.label for model in related - PURGED_MODELS)
+
+
+@dataclass
+class PurgeReport:
+    """
+    Outcome of a purge run.
+    Attributes:
+        expired (int): Number of expired unverified accounts found when the run started.
+        deleted (int): Number of accounts deleted.
+        rows (int): Number of rows deleted, accounts included.
+        media (int): Number of media directories and files removed.
+        media_errors (int): Number of media removals that failed.
+        elapsed (float): Total wall time in seconds.
+    """
+
+    expired: int = 0
+    deleted: int = 0
+    rows: int = 0
+    media: int = 0
+    media_errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+
+class UnverifiedPurger:
+    """
+    Deletes expired unverified accounts in bounded batches.
+
+    Each batch is deleted in one transaction with a raw DELETE per table, skipping the
+    per-object signals and cascade collection of the ORM. What the signals would have done
+    is done once per batch instead: uploaded media is removed by a thread pool, shared blobs
+    are released, and the skill counts and search index of deleted mentors are refreshed.
+    Args:
+        batch_size (int): Number of accounts deleted per transaction.
+        workers (int): Threads removing media files and directories.
+        limit (int, optional): Delete at most this many accounts.
+    """
+
+    def __init__(self, batch_size: int = 500, workers: int = 4, limit: int | None = None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.limit = limit
+        self.unhandled = unhandled_relations()
+
+    def count(self) -> dict:
+        """
+        Returns the number of expired unverified accounts by role, for dry runs.
+        """
+
+        counts = {}
+        for role in expired_unverified_users().values_list('role', flat=True).iterator():
+            counts[role] = counts.get(role, 0) + 1
+        return counts
+
+    def purge(self, on_batch=None) -> PurgeReport:
+        """
+        Deletes the expired unverified accounts.
+        Args:
+            on_batch (callable, optional): Called with the report after each batch.
+        Returns:
+            PurgeReport: The outcome of the run.
+        """
+
+        started = time.perf_counter()
+        report = PurgeReport(expired=expired_unverified_users().count())
+
+        if self.unhandled:
+            send_log(logger, f'Purging through the ORM, unknown relations: {", ".join(self.unhandled)}', level='warning')
+
+        pending = []
+
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix='purge-media') as executor:
+            while self.limit is None or report.deleted < self.limit:
+                size = self.batch_size if self.limit is None else min(self.batch_size, self.limit - report.deleted)
+                user_ids = list(expired_unverified_users().order_by('verification_sent').values_list('pk', flat=True)[:size])
+                if not user_ids:
+                    break
+
+                if self.unhandled:
+                    report.rows += AppUser.objects.filter(pk__in=user_ids).delete()[0]
+                    paths = []
+                else:
+                    paths = self._delete_batch(user_ids, report)
+
+                # Media of the previous batch is removed while this one was deleted,
+                # waiting for it keeps at most one batch of removals in flight
+                self._collect(pending, report)
+                pending = [executor.submit(self._remove_media, path) for path in paths]
+
+                report.deleted += len(user_ids)
+                report.elapsed = time.perf_counter() - started
+
+                if on_batch is not None:
+                    on_batch(report)
+
+            self._collect(pending, report)
+
+        report.elapsed = time.perf_counter() - started
+
+        return report
+
+    def _delete_batch(self, user_ids: list, report: PurgeReport) -> list:
+        """
+        Deletes a batch of accounts with everything that references them.
+        Returns:
+            list: Media paths and storage names to remove once the rows are gone.
+        """
+
+        storage = profile_media_storage()
+        blobs = []
+        paths = []
+        profiles = {}
+
+        for model in PROFILE_MODELS:
+            rows = list(model.objects.filter(user_id__in=user_ids).values_list('pk', 'user__username', 'image', 'renditions'))
+            profiles[model] = [pk for pk, *_ in rows]
+
+            for _, username, image, renditions in rows:
+                paths.append(os.path.join(settings.MEDIA_ROOT, 'profiles', username))
+
+                names = [name for sizes in (renditions or {}).values() for name in sizes.values()]
+                if image and image != DEFAULT_IMAGE_PATH:
+                    names.append(image)
+
+                for name in names:
+                    # Blob references live in the database, plain files are only on disk
+                    (blobs if is_blob(name) else paths).append(name)
+
+        mentor_ids = profiles[MentorProfile]
+        skill_ids = set(MentorSkill.objects.filter(profile_id__in=mentor_ids).values_list('skill_id', flat=True))
+        listed = list(MentorCard.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+
+        querysets = [
+            EmailOutbox.objects.filter(user_id__in=user_ids),
+            LogEntry.objects.filter(user_id__in=user_ids),
+            AppUser.groups.through.objects.filter(appuser_id__in=user_ids),
+            AppUser.user_permissions.through.objects.filter(appuser_id__in=user_ids),
+            MentorSkill.objects.filter(profile_id__in=mentor_ids),
+            MentorCard.objects.filter(user_id__in=user_ids),
+            *(
+                ImageProcessingJob.objects.filter(
+                    content_type=ContentType.objects.get_for_model(model), object_id__in=profile_ids
+                )
+                for model, profile_ids in profiles.items() if profile_ids
+            ),
+            *(model.objects.filter(pk__in=profiles[model]) for model in PROFILE_MODELS),
+            AppUser.objects.filter(pk__in=user_ids),
+        ]
+
+        with transaction.atomic():
+            for queryset in querysets:
+                report.rows += queryset._raw_delete(queryset.db)
+
+        for name in blobs:
+            storage.delete(name)
+
+        if listed:
+            update_index(listed)
+        if skill_ids:
+            Skill.objects.recount(skill_ids)
+
+        return paths
+
+    @staticmethod
+    def _collect(futures: list, report: PurgeReport):
+        for future in futures:
+            try:
+                report.media += future.result()
+            except Exception as error:
+                send_log(logger, f'Failed to remove purged media: {error}', level='error')
+                report.media_errors += 1
+
+    @staticmethod
+    def _remove_media(path) -> bool:
+        """
+        Removes a profile media directory, or a file outside the blob store by its storage name.
+        Returns:
+            bool: Whether anything was removed.
+        """
+
+        if os.path.isabs(path):
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path)
+            return True
+
+        storage = profile_media_storage()
+        if not storage.exists(path):
+            return False
+        storage.delete(path)
+        return True
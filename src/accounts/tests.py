@@ -1,3 +1,408 @@
-from django.test import TestCase
+import os
+import time
 
-# Create your tests here.
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from mentors.models import MentorSkill
+from profiles.models import ImageProcessingJob, MentorProfile
+from profiles.tests import TemporaryMediaTestCase, make_upload
+from utils.throttle import _buckets
+
+from .models import AppUser, EmailOutbox, email_matches, username_matches
+from .outbox import send_batch
+from .tokens import make_verify_token
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class EmailOutboxTests(TemporaryMediaTestCase):
+    """
+    Tests for queueing verification emails at registration and draining the outbox.
+    """
+
+    def register(self, username='johndoe'):
+        return self.client.post(reverse('profiles:register_user'), {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password1': 'correct-horse-battery',
+            'password2': 'correct-horse-battery',
+        })
+
+    def test_registration_queues_email_without_sending(self):
+        response = self.register()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.to, 'johndoe@example.com')
+        self.assertEqual(message.status, EmailOutbox.Statuses.PENDING)
+        self.assertFalse(message.user.is_active)
+
+    def test_command_sends_batch_over_one_connection(self):
+        for username in ('alice', 'bob', 'carol'):
+            self.register(username)
+
+        with mock.patch('commands.management.commands.send_emails.get_connection', wraps=get_connection) as command_connection, \
+                mock.patch('accounts.outbox.get_connection') as batch_connection:
+            call_command('send_emails', batch_size=2, stdout=StringIO())
+
+        command_connection.assert_called_once()
+        batch_connection.assert_not_called()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('/accounts/verify-email/', mail.outbox[0].body)
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.Statuses.SENT).exists())
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_email_is_retried_with_backoff_then_given_up(self):
+        self.register()
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=OSError('connection refused')):
+            self.assertEqual(send_batch(), (0, 1))
+
+            message = EmailOutbox.objects.get()
+            self.assertEqual(message.status, EmailOutbox.Statuses.PENDING)
+            self.assertEqual(message.attempts, 1)
+            self.assertGreater(message.next_attempt, timezone.now() + timedelta(seconds=50))
+
+            # Not due yet
+            self.assertEqual(send_batch(), (0, 0))
+
+            EmailOutbox.objects.update(next_attempt=timezone.now())
+            send_batch()
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.Statuses.FAILED)
+        self.assertEqual(message.error, 'connection refused')
+        self.assertEqual(mail.outbox, [])
+
+    def test_pending_email_is_dropped_with_user(self):
+        self.register()
+
+        AppUser.objects.get(username='johndoe').delete()
+
+        self.assertFalse(EmailOutbox.objects.exists())
+
+
+@override_settings(EMAIL_VERIFICATION_MAX_AGE=60 * 60, THROTTLE_ENABLED=False)
+class VerifyEmailTests(TemporaryMediaTestCase):
+    """
+    Tests for the signed email verification links.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.user = AppUser.objects.create_user(
+            username='johndoe', email='johndoe@example.com', password='correct-horse-battery', is_active=False,
+        )
+
+    def verify(self, token):
+        return self.client.get(reverse('accounts:verify_email', args=[token]))
+
+    def test_valid_link_activates_and_logs_in(self):
+        response = self.verify(make_verify_token(self.user))
+
+        self.assertRedirects(response, reverse('profiles:edit_profile'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        self.assertTrue(self.user.email_verified)
+
+    def test_forged_link_is_rejected_without_queries(self):
+        token = make_verify_token(self.user)
+
+        with self.assertNumQueries(0):
+            response = self.verify(token[:-1] + ('a' if token[-1] != 'a' else 'b'))
+
+        self.assertTemplateUsed(response, 'emails/verify_email_failed.html')
+
+    def test_expired_link_is_rejected_without_queries(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() - 2 * 60 * 60):
+            token = make_verify_token(self.user)
+
+        with self.assertNumQueries(0):
+            response = self.verify(token)
+
+        self.assertTemplateUsed(response, 'emails/verify_email_failed.html')
+        self.assertTrue(AppUser.objects.filter(pk=self.user.pk).exists())
+
+    def test_link_is_bound_to_email_and_single_use(self):
+        token = make_verify_token(self.user)
+
+        AppUser.objects.filter(pk=self.user.pk).update(email='janedoe@example.com')
+        self.assertTemplateUsed(self.verify(token), 'emails/verify_email_failed.html')
+
+        AppUser.objects.filter(pk=self.user.pk).update(email='johndoe@example.com')
+        self.verify(token)
+        self.client.logout()
+        self.assertTemplateUsed(self.verify(token), 'emails/verify_email_failed.html')
+
+    def test_purge_unverified_deletes_expired_accounts(self):
+        verified = AppUser.objects.create_user(username='janedoe', email='janedoe@example.com', email_verified=True)
+        fresh = AppUser.objects.create_user(username='newcomer', email='newcomer@example.com', is_active=False)
+        AppUser.objects.filter(pk__in=[self.user.pk, verified.pk]).update(verification_sent=timezone.now() - timedelta(days=1))
+
+        call_command('purge_unverified', batch_size=1, stdout=StringIO())
+
+        self.assertQuerySetEqual(AppUser.objects.order_by('username'), [verified, fresh])
+
+    def test_resent_link_keeps_old_account(self):
+        AppUser.objects.filter(pk=self.user.pk).update(
+            created=timezone.now() - timedelta(days=1), verification_sent=timezone.now() - timedelta(days=1),
+        )
+
+        call_command('resend_verification', stdout=StringIO())
+        call_command('purge_unverified', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(AppUser.objects.filter(pk=self.user.pk).exists())
+
+    def test_expired_account_does_not_block_registration(self):
+        AppUser.objects.filter(pk=self.user.pk).update(verification_sent=timezone.now() - timedelta(days=1))
+
+        self.client.post(reverse('profiles:register_user'), {
+            'username': 'johndoe',
+            'email': 'johndoe@example.com',
+            'password1': 'correct-horse-battery',
+            'password2': 'correct-horse-battery',
+        })
+
+        user = AppUser.objects.get(username='johndoe')
+        self.assertNotEqual(user.pk, self.user.pk)
+        self.assertEqual(EmailOutbox.objects.get().user, user)
+
+    def test_invalid_registration_keeps_expired_account(self):
+        AppUser.objects.filter(pk=self.user.pk).update(verification_sent=timezone.now() - timedelta(days=1))
+
+        self.client.post(reverse('profiles:register_user'), {
+            'username': 'johndoe',
+            'email': 'johndoe@example.com',
+            'password1': 'correct-horse-battery',
+            'password2': 'wrong-horse-battery',
+        })
+
+        self.assertQuerySetEqual(AppUser.objects.all(), [self.user])
+
+
+@override_settings(EMAIL_VERIFICATION_MAX_AGE=60 * 60, IMAGE_PROCESSING_WORKERS=0)
+class PurgeUnverifiedTests(TemporaryMediaTestCase):
+    """
+    Tests for the raw delete fast path of the `purge_unverified` command.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.verified = self.create_user('janedoe', email_verified=True)
+        self.expired = self.create_user('johndoe', is_active=False)
+        AppUser.objects.filter(pk=self.expired.pk).update(verification_sent=timezone.now() - timedelta(days=1))
+
+        # Both upload the same image, which is stored once
+        for user in (self.verified, self.expired):
+            profile = user.mentor_profile
+            profile.image = make_upload()
+            profile.save()
+            MentorSkill.objects.add(profile, 'Python')
+
+        EmailOutbox.objects.enqueue(self.expired, EmailOutbox.Kinds.VERIFY_EMAIL)
+
+    def create_user(self, username, **fields):
+        return AppUser.objects.create_user(
+            username=username, email=f'{username}@example.com', role=AppUser.Roles.MENTOR, **fields
+        )
+
+    def test_dry_run_deletes_nothing(self):
+        stdout = StringIO()
+        call_command('purge_unverified', dry_run=True, stdout=stdout)
+
+        self.assertIn('Would delete 1 unverified accounts (1 mentor)', stdout.getvalue())
+        self.assertTrue(AppUser.objects.filter(pk=self.expired.pk).exists())
+
+    def test_purge_deletes_rows_and_releases_media(self):
+        image = MentorProfile.objects.get(user=self.verified).image
+        directory = os.path.join(settings.MEDIA_ROOT, 'profiles', 'johndoe')
+        os.makedirs(directory, exist_ok=True)
+
+        call_command('purge_unverified', workers=2, stdout=StringIO())
+
+        self.assertQuerySetEqual(AppUser.objects.all(), [self.verified])
+        self.assertEqual(MentorProfile.objects.count(), 1)
+        self.assertEqual(MentorSkill.objects.count(), 1)
+        self.assertFalse(EmailOutbox.objects.exists())
+        self.assertFalse(ImageProcessingJob.objects.exclude(object_id=self.verified.mentor_profile.pk).exists())
+        self.assertFalse(os.path.exists(directory))
+
+        # The blob is kept for the remaining profile
+        self.assertEqual(image.storage.references(image.name), 1)
+        self.assertTrue(image.storage.exists(image.name))
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class CaseInsensitiveAccountTests(TestCase):
+    """
+    Tests for the case-insensitive usernames and emails.
+    """
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            username=' JohnDoe ', email='John.Doe@Example.com', password='correct-horse-battery',
+        )
+
+    def test_username_and_email_are_normalised_on_write(self):
+        self.assertEqual(self.user.username, 'johndoe')
+        self.assertEqual(self.user.email, 'john.doe@example.com')
+
+    def test_case_variants_are_rejected_by_the_database(self):
+        for fields in ({'username': 'JOHNDOE', 'email': 'other@example.com'}, {'username': 'other', 'email': 'JOHN.DOE@example.com'}):
+            with self.subTest(**fields), self.assertRaises(IntegrityError), transaction.atomic():
+                # bulk_create skips the normalisation of save
+                AppUser.objects.bulk_create([AppUser(**fields)])
+
+    def test_lookups_use_the_case_insensitive_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked on SQLite')
+
+        for lookup, index in ((username_matches('JohnDoe'), 'appuser_username_ci_uniq'), (email_matches('John.Doe@Example.com'), 'appuser_email_ci_uniq')):
+            with self.subTest(index=index):
+                self.assertIn(f'USING INDEX {index}', AppUser.objects.filter(lookup).explain())
+
+    def test_registration_rejects_case_variants(self):
+        response = self.client.post(reverse('profiles:register_user'), {
+            'username': 'JohnDOE',
+            'email': 'JOHN.DOE@example.com',
+            'password1': 'correct-horse-battery',
+            'password2': 'correct-horse-battery',
+        })
+
+        self.assertFormError(response.context['form'], 'username', 'This username is already in use.')
+        self.assertFormError(response.context['form'], 'email', 'This email address is already in use.')
+
+    def test_login_ignores_username_case(self):
+        response = self.client.post(reverse('accounts:login'), {'username': 'JOHNDOE', 'password': 'correct-horse-battery'})
+
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(self.client.session['_auth_user_id'], str(self.user.pk))
+
+
+@override_settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10, THROTTLE_ENABLED=False)
+class PasswordHasherPolicyTests(TestCase):
+    """
+    Tests for the tunable hasher policy, transparent rehashing and hash timing.
+    """
+
+    def login(self):
+        return self.client.post(reverse('accounts:login'), {'username': 'johndoe', 'password': 'correct-horse-battery'})
+
+    def create_user(self, encoded):
+        user = AppUser.objects.create_user(username='johndoe', email='johndoe@example.com')
+        AppUser.objects.filter(pk=user.pk).update(password=encoded)
+        return user
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = self.create_user(make_password('correct-horse-battery', hasher='pbkdf2_sha256'))
+
+        self.login()
+
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, 'scrypt')
+        self.assertTrue(user.check_password('correct-horse-battery'))
+
+    def test_changed_cost_is_applied_on_login(self):
+        user = self.create_user(make_password('correct-horse-battery'))
+
+        with self.settings(PASSWORD_SCRYPT_WORK_FACTOR=2 ** 11):
+            self.login()
+
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).decode(user.password)['work_factor'], 2 ** 11)
+
+    def test_login_reports_hash_time(self):
+        self.create_user(make_password('correct-horse-battery'))
+
+        response = self.login()
+
+        self.assertRegex(response['Server-Timing'], r'^hash;dur=\d+\.\d$')
+        self.assertNotIn('Server-Timing', self.client.get(reverse('accounts:login')))
+
+    def test_benchmark_recommends_strongest_cost_within_target(self):
+        timings = iter([0.05, 0.02, 0.04, 0.08, 0.2, 0.01])
+        stdout = StringIO()
+
+        with mock.patch('commands.management.commands.benchmark_hashers.measure', side_effect=lambda *args: next(timings)), \
+                mock.patch('commands.management.commands.benchmark_hashers.argon2', None):
+            call_command('benchmark_hashers', target_ms=100, stdout=stdout)
+
+        self.assertIn('PASSWORD_HASHER=scrypt', stdout.getvalue())
+        self.assertIn(f'PASSWORD_SCRYPT_WORK_FACTOR={2 ** 16}', stdout.getvalue())
+
+
+@override_settings(
+    CACHES={**settings.CACHES, 'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle'}},
+    THROTTLE_CACHE='throttle',
+    THROTTLE_RATES={'login:ip': '5/m', 'login:username': '2/m', 'register': '1/h'},
+    PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10,
+)
+class ThrottleTests(TestCase):
+    """
+    Tests for the rate limits of the login and registration views.
+    """
+
+    def setUp(self):
+        caches['throttle'].clear()
+        _buckets.clear()
+
+        self.user = AppUser.objects.create_user(
+            username='johndoe', email='johndoe@example.com', password='correct-horse-battery',
+        )
+
+    def login(self, username='johndoe', password='wrong-password', **extra):
+        return self.client.post(reverse('accounts:login'), {'username': username, 'password': password}, **extra)
+
+    def test_throttled_login_is_rejected_before_authenticate(self):
+        self.login()
+        self.login(username='JohnDoe')
+
+        with mock.patch('accounts.views.authenticate') as authenticate:
+            response = self.login()
+
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Other usernames are only limited by the address
+        self.assertEqual(self.login(username='janedoe').status_code, 302)
+
+    def test_address_limit_covers_every_username(self):
+        for index in range(5):
+            self.login(username=f'user{index}')
+
+        self.assertEqual(self.login(username='other').status_code, 429)
+        self.assertEqual(self.login(username='other', REMOTE_ADDR='10.0.0.2').status_code, 302)
+
+    def test_successful_login_refills_username_bucket(self):
+        self.login()
+        self.login(password='correct-horse-battery')
+        self.client.logout()
+
+        self.assertEqual(self.login().status_code, 302)
+        self.assertEqual(self.login().status_code, 302)
+
+    def test_registration_is_throttled(self):
+        url = reverse('profiles:register_user')
+
+        self.assertEqual(self.client.post(url, {}).status_code, 200)
+        self.assertEqual(self.client.post(url, {}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -7,5 +7,5 @@ urlpatterns = [
     path('login/', views.login_user, name='login'),
     path('logout/', views.logout_user, name='logout'),
 
-    path('verify-email/<uidb64>/<token>/', views.verify_email, name='verify_email'),
+    path('verify-email/<str:token>/', views.verify_email, name='verify_email'),
 ]
\ No newline at end of file
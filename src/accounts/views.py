@@ -2,16 +2,22 @@ from django.shortcuts import render, redirect
 
 from django.contrib.auth import login, authenticate, logout, get_user_model
 from django.contrib import messages
-from django.contrib.auth.tokens import PasswordResetTokenGenerator
 
-from django.utils.encoding import force_str
-from django.utils.http import urlsafe_base64_decode
+from utils.throttle import get_bucket, throttle
+
+from .tokens import email_digest, read_verify_token
 
 
 User = get_user_model()
-token_generator = PasswordResetTokenGenerator()
 
 
+def login_username(request):
+    return User.normalize_username(request.POST.get('username'))
+
+
+# Throttled attempts are turned away before their password is hashed
+@throttle('login:ip')
+@throttle('login:username', key=login_username)
 def login_user(request):
     if request.user.is_authenticated:
         return redirect('/')
@@ -21,9 +27,11 @@ def login_user(request):
         password = request.POST.get('password')
 
         if all([username, password]):
+            # The backend looks the username up in any case, through the Lower('username') index
             user = authenticate(request, username=username, password=password)
 
             if user is not None:
+                get_bucket('login:username').reset(login_username(request))
                 login(request, user)
                 messages.success(request, 'Welcome back!')
                 return redirect('/')
@@ -47,22 +55,22 @@ def logout_user(request):
     return redirect('/')
 
 
-def verify_email(request, uidb64, token):
-    try:
-        uid = force_str(urlsafe_base64_decode(uidb64))
-        user = User.objects.get(pk=uid)
-    except (TypeError, ValueError, OverflowError, User.DoesNotExist):
-        user = None
-    
-    if user and token_generator.check_token(user, token):
+def verify_email(request, token):
+    # Forged and expired links are turned away before any query,
+    # unverified accounts are removed by the `purge_unverified` command
+    claims = read_verify_token(token)
+
+    user = None
+    if claims is not None:
+        user_id, digest = claims
+        user = User.objects.filter(pk=user_id, email_verified=False).first()
+
+    if user and email_digest(user.email) == digest:
         user.is_active = True
-        if hasattr(user, 'email_verified'):
-            user.email_verified = True
+        user.email_verified = True
         user.save()
         login(request, user)
         messages.success(request, "Welcome!")
         return redirect('profiles:edit_profile')
-    elif user and not user.email_verified:
-        user.delete()
-    
+
     return render(request, 'emails/verify_email_failed.html', {'title': 'Email Failed'})
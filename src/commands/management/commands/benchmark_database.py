@@ -0,0 +1,186 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from profiles.forms import UserCreationForm
+
+from utils.benchmark import scratch_database, seed_mentors, summarize
+
+
+def run_threads(operation, threads: int, count: int) -> dict:
+    """
+    Runs `count` calls of `operation(index)` spread over `threads` threads.
+    Returns:
+        dict: The summary of the run, see `utils.benchmark.summarize`.
+    """
+
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(indexes):
+        try:
+            for index in indexes:
+                started = time.perf_counter()
+                try:
+                    operation(index)
+                except Exception as error:
+                    with lock:
+                        errors.append(f'{type(error).__name__}: {error}')
+                    continue
+                with lock:
+                    timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(range(start, count, threads),)) for start in range(threads)]
+
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return summarize(timings, elapsed, errors)
+
+
+class Command(BaseCommand):
+    """
+    Management command to benchmark the configured database on the registration and directory workloads.
+    """
+
+    help = (
+        'Runs the registration, directory and mixed workloads against a scratch copy of the configured '
+        'database and reports throughput and latency. Pass --compare to run them against other DATABASE_URLs too.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent clients.')
+        parser.add_argument('--registrations', type=int, default=200, help='Users registered per workload.')
+        parser.add_argument('--requests', type=int, default=200, help='Directory pages requested per workload.')
+        parser.add_argument('--mentors', type=int, default=1000, help='Mentors listed in the directory.')
+        parser.add_argument(
+            '--compare', action='append', default=[], metavar='DATABASE_URL',
+            help='Also benchmark this database, may be repeated.',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            results = {'configured': self.run_workloads(options)}
+            for url in options['compare']:
+                results[url] = self.run_in_subprocess(url, options)
+            self.write_results(results)
+            return
+
+        results = self.run_workloads(options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.write_results({'configured': results})
+
+    def run_in_subprocess(self, url: str, options: dict) -> dict:
+        # Settings are read once per process, so other databases are benchmarked in a fresh one
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'benchmark_database', '--json',
+            '--threads', str(options['threads']), '--registrations', str(options['registrations']),
+            '--requests', str(options['requests']), '--mentors', str(options['mentors']),
+        ]
+        result = subprocess.run(command, env={**os.environ, 'DATABASE_URL': url}, capture_output=True, text=True)
+
+        if result.returncode:
+            raise CommandError(f'Benchmark of {url} failed:\n{result.stderr}')
+
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run_workloads(self, options: dict) -> dict:
+        with scratch_database():
+            seed_mentors(options['mentors'])
+
+            return {
+                'vendor': connection.vendor,
+                'registration': self.register(options, 'registration', options['registrations']),
+                'directory': self.browse(options, options['requests']),
+                'mixed': self.mixed(options),
+            }
+
+    def register(self, options: dict, prefix: str, count: int) -> dict:
+        def operation(index):
+            form = UserCreationForm({
+                'username': f'{prefix}{index}',
+                'email': f'{prefix}{index}@example.com',
+                'password1': 'correct-horse-battery',
+                'password2': 'correct-horse-battery',
+            })
+            if not form.is_valid():
+                raise ValueError(form.errors.as_text())
+            form.save()
+
+        return run_threads(operation, options['threads'], count)
+
+    def browse(self, options: dict, count: int) -> dict:
+        url = reverse('mentors:mentors_list')
+        local = threading.local()
+
+        def operation(index):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            response = local.client.get(url)
+            if response.status_code != 200:
+                raise ValueError(f'{url} returned {response.status_code}')
+
+        return run_threads(operation, options['threads'], count)
+
+    def mixed(self, options: dict) -> dict:
+        # Readers and writers at the same time, where "database is locked" errors show up
+        writers = max(options['threads'] // 2, 1)
+        results = {}
+
+        def run(name, workload):
+            results[name] = workload()
+
+        threads = [
+            threading.Thread(target=run, args=('writes', lambda: self.register(
+                {'threads': writers}, 'mixed', options['registrations'] // 2
+            ))),
+            threading.Thread(target=run, args=('reads', lambda: self.browse(
+                {'threads': max(options['threads'] - writers, 1)}, options['requests'] // 2
+            ))),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def write_results(self, results: dict):
+        for database, workloads in results.items():
+            self.stdout.write(self.style.SUCCESS(f'{database} ({workloads["vendor"]})'))
+
+            rows = [
+                ('registration', workloads['registration']),
+                ('directory', workloads['directory']),
+                ('mixed writes', workloads['mixed']['writes']),
+                ('mixed reads', workloads['mixed']['reads']),
+            ]
+            for name, result in rows:
+                self.stdout.write(
+                    f'  {name:<14} {result["ops"]:>6} ops {result["ops_per_second"]:>8.1f}/s '
+                    f'p50 {result["p50_ms"]:>7.1f}ms p95 {result["p95_ms"]:>7.1f}ms errors {result["errors"]}'
+                )
+                if result['first_error']:
+                    self.stdout.write(self.style.WARNING(f'    {result["first_error"]}'))
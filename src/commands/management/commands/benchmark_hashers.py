@@ -0,0 +1,123 @@
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+from django.utils.crypto import get_random_string
+
+from accounts.hashers import TunedPBKDF2PasswordHasher, TunedScryptPasswordHasher
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+PASSWORD = 'correct-horse-battery-staple'
+
+
+def measure(hash_password, rounds: int) -> float:
+    """
+    Returns the median seconds of `rounds` calls to `hash_password`, after one warm-up call.
+    """
+
+    hash_password()
+
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hash_password()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    """
+    Management command to measure the password hashers on this host and recommend their costs.
+    """
+
+    help = (
+        'Measures password hashes per second for increasing costs of each hasher '
+        'and recommends the strongest settings that hash within the target latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100, help='Latency budget of one hash in milliseconds.')
+        parser.add_argument('--rounds', type=int, default=5, help='Hashes measured per candidate.')
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        rounds = options['rounds']
+        cores = os.cpu_count() or 1
+        # One salt for every candidate, the cost does not depend on it
+        salt = get_random_string(22)
+
+        current = get_hasher()
+        elapsed = measure(lambda: current.encode(PASSWORD, salt), rounds)
+        self.stdout.write(f'Current policy: {settings.PASSWORD_HASHER}, {elapsed * 1000:.1f}ms per hash')
+        self.stdout.write(f'Target: {options["target_ms"]:.0f}ms per hash, {cores} CPU cores\n')
+
+        recommendations = []
+
+        scrypt = TunedScryptPasswordHasher()
+        fitting = None
+        for exponent in range(14, 21):
+            work_factor = 2 ** exponent
+            elapsed = measure(lambda: scrypt.encode(PASSWORD, salt, n=work_factor, r=8, p=1), rounds)
+            self.write_result('scrypt', f'n=2^{exponent} r=8 p=1 ({work_factor // 1024}MiB)', elapsed, cores)
+            if elapsed <= target:
+                fitting = work_factor
+            else:
+                break
+        if fitting:
+            recommendations.append(('scrypt', {
+                'PASSWORD_SCRYPT_WORK_FACTOR': fitting,
+                'PASSWORD_SCRYPT_BLOCK_SIZE': 8,
+                'PASSWORD_SCRYPT_PARALLELISM': 1,
+            }))
+
+        if argon2 is not None:
+            fitting = None
+            memory_cost = 64 * 1024
+            for time_cost in range(1, 11):
+                hasher = argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=1)
+                elapsed = measure(lambda: hasher.hash(PASSWORD), rounds)
+                self.write_result('argon2', f't={time_cost} m=64MiB p=1', elapsed, cores)
+                if elapsed <= target:
+                    fitting = time_cost
+                else:
+                    break
+            if fitting:
+                recommendations.insert(0, ('argon2', {
+                    'PASSWORD_ARGON2_TIME_COST': fitting,
+                    'PASSWORD_ARGON2_MEMORY_COST': memory_cost,
+                    'PASSWORD_ARGON2_PARALLELISM': 1,
+                }))
+        else:
+            self.stdout.write('argon2   skipped, argon2-cffi is not installed')
+
+        # PBKDF2 costs grow linearly with the iterations, one measure is enough to extrapolate
+        pbkdf2 = TunedPBKDF2PasswordHasher()
+        elapsed = measure(lambda: pbkdf2.encode(PASSWORD, salt, iterations=100_000), rounds)
+        self.write_result('pbkdf2', 'iterations=100000', elapsed, cores)
+        iterations = int(target / elapsed * 100_000) // 10_000 * 10_000
+        if iterations:
+            recommendations.append(('pbkdf2', {'PASSWORD_PBKDF2_ITERATIONS': iterations}))
+
+        if not recommendations:
+            self.stderr.write(self.style.ERROR('No hasher fits the target, raise --target-ms'))
+            return
+
+        name, values = recommendations[0]
+        self.stdout.write(self.style.SUCCESS(f'\nRecommended settings:\nPASSWORD_HASHER={name}'))
+        for setting, value in values.items():
+            self.stdout.write(self.style.SUCCESS(f'{setting}={value}'))
+
+    def write_result(self, name: str, params: str, elapsed: float, cores: int):
+        rate = 1 / elapsed if elapsed else 0.0
+        self.stdout.write(
+            f'{name:<8} {params:<30} {elapsed * 1000:>8.1f}ms {rate:>8.1f} hashes/s per core, {rate * cores:.0f} on this host'
+        )
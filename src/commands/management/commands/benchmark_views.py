@@ -0,0 +1,243 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from utils.benchmark import scratch_database, seed_mentors, summarize
+
+
+ASYNC_READ_VIEWS = 'mentors:mentors_list,mentors:profile_overview,mentors:mentor_profile'
+
+# Servers compared by --compare, with the ASYNC_VIEWS each one runs with
+SERVERS = {
+    'wsgi': ('wsgi', ''),
+    'asgi': ('asgi', ''),
+    'asgi+async views': ('asgi', ASYNC_READ_VIEWS),
+}
+
+
+def wsgi_get(handler: WSGIHandler, path: str, headers: dict) -> int:
+    """
+    Sends a GET request through a WSGI handler, as a threaded WSGI server would.
+    Returns:
+        int: The response status.
+    """
+
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        **{f'HTTP_{name.upper().replace("-", "_")}': value for name, value in headers.items()},
+    }
+    statuses = []
+
+    response = handler(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+
+    return int(statuses[0].split()[0])
+
+
+async def asgi_get(handler: ASGIHandler, path: str, headers: dict) -> int:
+    """
+    Sends a GET request through an ASGI handler, as an ASGI server would.
+    Returns:
+        int: The response status.
+    """
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), *((name.lower().encode(), value.encode()) for name, value in headers.items())],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    status = []
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the response is produced
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    await handler(scope, receive, send)
+
+    return status[0]
+
+
+class Command(BaseCommand):
+    """
+    Management command to load test the read views under WSGI and ASGI.
+    """
+
+    help = (
+        'Sends concurrent requests to the directory and mentor profile views through the WSGI or ASGI handler '
+        'and reports throughput and latency percentiles. Pass --compare to run WSGI, ASGI, and ASGI with the '
+        'async read views, each in a process of its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi', help='Handler the requests go through.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint.')
+        parser.add_argument('--mentors', type=int, default=200, help='Mentors listed in the directory.')
+        parser.add_argument('--compare', action='store_true', help='Compare the servers side by side.')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            results = {name: self.run_in_subprocess(server, async_views, options)
+                       for name, (server, async_views) in SERVERS.items()}
+            self.write_results(results)
+            return
+
+        results = self.run_endpoints(options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.write_results({options['server']: results})
+
+    def run_in_subprocess(self, server: str, async_views: str, options: dict) -> dict:
+        # Views are picked when the URLconf is loaded, so every server gets a fresh process
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'benchmark_views', '--json',
+            '--server', server, '--concurrency', str(options['concurrency']),
+            '--requests', str(options['requests']), '--mentors', str(options['mentors']),
+        ]
+        result = subprocess.run(command, env={**os.environ, 'ASYNC_VIEWS': async_views}, capture_output=True, text=True)
+
+        if result.returncode:
+            raise CommandError(f'Benchmark of {server} failed:\n{result.stderr}')
+
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run_endpoints(self, options: dict) -> dict:
+        with scratch_database():
+            username = seed_mentors(options['mentors'])[0]
+
+            endpoints = {
+                'directory': (reverse('mentors:mentors_list'), {}),
+                'directory (htmx)': (reverse('mentors:mentors_list'), {'HX-Request': 'true'}),
+                'profile overview': (reverse('mentors:profile_overview', args=[username]), {'HX-Request': 'true'}),
+                'mentor profile': (reverse('mentors:mentor_profile', args=[username]), {}),
+            }
+
+            run = self.run_asgi if options['server'] == 'asgi' else self.run_wsgi
+
+            return {
+                name: run(path, headers, options['concurrency'], options['requests'])
+                for name, (path, headers) in endpoints.items()
+            }
+
+    def run_wsgi(self, path: str, headers: dict, concurrency: int, count: int) -> dict:
+        handler = WSGIHandler()
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(requests):
+            try:
+                for _ in requests:
+                    started = time.perf_counter()
+                    status = wsgi_get(handler, path, headers)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if status == 200:
+                            timings.append(elapsed)
+                        else:
+                            errors.append(f'{path} returned {status}')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(range(start, count, concurrency),)) for start in range(concurrency)]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return summarize(timings, time.perf_counter() - started, errors)
+
+    def run_asgi(self, path: str, headers: dict, concurrency: int, count: int) -> dict:
+        handler = ASGIHandler()
+        timings = []
+        errors = []
+
+        async def worker(requests):
+            for _ in requests:
+                started = time.perf_counter()
+                status = await asgi_get(handler, path, headers)
+                if status == 200:
+                    timings.append(time.perf_counter() - started)
+                else:
+                    errors.append(f'{path} returned {status}')
+
+        async def main():
+            await asyncio.gather(*(worker(range(start, count, concurrency)) for start in range(concurrency)))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+
+        return summarize(timings, time.perf_counter() - started, errors)
+
+    def write_results(self, results: dict):
+        endpoints = next(iter(results.values())).keys()
+
+        for endpoint in endpoints:
+            self.stdout.write(self.style.SUCCESS(endpoint))
+
+            for server, result in results.items():
+                result = result[endpoint]
+                self.stdout.write(
+                    f'  {server:<17} {result["ops_per_second"]:>8.1f} req/s p50 {result["p50_ms"]:>7.1f}ms '
+                    f'p99 {result["p99_ms"]:>7.1f}ms errors {result["errors"]}'
+                )
+                if result['first_error']:
+                    self.stdout.write(self.style.WARNING(f'    {result["first_error"]}'))
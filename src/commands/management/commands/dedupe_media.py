@@ -0,0 +1,108 @@
+import hashlib
+
+from pathlib import PurePosixPath
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from profiles.models import PROFILE_MODELS, DEFAULT_IMAGE_PATH
+from profiles.storage import profile_media_storage, is_blob
+from profiles.signals import profile_image_changed
+
+
+class Command(BaseCommand):
+    """
+    Management command to move existing profile media into the content-addressed blob store.
+    """
+
+    help = 'Moves profile images and renditions into the deduplicated blob store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without moving any files.')
+
+    def handle(self, *args, **options):
+        self.storage = profile_media_storage()
+        self.dry_run = options['dry_run']
+
+        self.digests = {}
+        self.moved = 0
+        self.bytes_before = 0
+
+        for model in PROFILE_MODELS:
+            profiles = model.objects.exclude(image='').exclude(image=DEFAULT_IMAGE_PATH).only('id', 'image', 'renditions')
+
+            for profile in profiles.iterator():
+                try:
+                    self.dedupe_profile(model, profile)
+                except Exception as error:
+                    self.stdout.write(self.style.ERROR(f'Failed to deduplicate media of {model.__name__} {profile.pk}: {error}'))
+
+        bytes_after = sum(self.digests.values())
+        prefix = 'Would move' if self.dry_run else 'Moved'
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {self.moved} files ({self.bytes_before} bytes) into {len(self.digests)} blobs '
+            f'({bytes_after} bytes), saving {self.bytes_before - bytes_after} bytes'
+        ))
+
+    def dedupe_profile(self, model, profile):
+        image = profile.image.name
+        if not is_blob(image):
+            image = self.move(image)
+
+        renditions = {
+            extension: {size: self.move(name) if not is_blob(name) else name for size, name in names.items()}
+            for extension, names in (profile.renditions or {}).items()
+        }
+
+        if self.dry_run or (image == profile.image.name and renditions == profile.renditions):
+            return
+
+        updated = model.objects.filter(pk=profile.pk, image=profile.image.name).update(
+            image=image,
+            renditions=renditions,
+            updated=timezone.now(),
+        )
+
+        if updated:
+            profile_image_changed.send(sender=model, profile_ids=[profile.pk])
+            for name in [profile.image.name, *self.names(profile.renditions)]:
+                if not is_blob(name):
+                    self.storage.delete(name)
+        else:
+            # The profile changed while its media was being moved, release the new blobs
+            for name in [image, *self.names(renditions)]:
+                if name != profile.image.name and name not in self.names(profile.renditions):
+                    self.storage.delete(name)
+
+    def move(self, name):
+        """
+        Hashes a legacy file and, unless this is a dry run, saves it into the blob store.
+        Returns:
+            str: The name of the blob, or the legacy name on a dry run.
+        """
+
+        size = self.storage.size(name)
+
+        self.moved += 1
+        self.bytes_before += size
+
+        if self.dry_run:
+            digest = hashlib.sha256()
+            with self.storage.open(name) as file:
+                for chunk in file.chunks():
+                    digest.update(chunk)
+            self.digests[digest.hexdigest()] = size
+            return name
+
+        with self.storage.open(name) as file:
+            blob = self.storage.save(name, file)
+
+        # Blob names are the SHA-256 of their content
+        self.digests[PurePosixPath(blob).stem] = size
+
+        return blob
+
+    @staticmethod
+    def names(renditions):
+        return [name for names in (renditions or {}).values() for name in names.values()]
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from profiles.models import PROFILE_MODELS, DEFAULT_IMAGE_PATH
+from profiles.signals import profile_image_changed
+
+from utils.renditions import generate_renditions, delete_renditions
+
+
+def backfill_profile(model, profile_id, image_name):
+    """
+    Generates the renditions of a single profile image and stores them on the profile,
+    unless the image was replaced while they were being generated.
+    Returns:
+        bool: True if the renditions were stored.
+    """
+
+    try:
+        storage = model._meta.get_field('image').storage
+
+        with storage.open(image_name) as source:
+            renditions = generate_renditions(source, storage, image_name)
+
+        updated = model.objects.filter(pk=profile_id, image=image_name).update(
+            renditions=renditions,
+            updated=timezone.now(),
+        )
+
+        if updated:
+            profile_image_changed.send(sender=model, profile_ids=[profile_id])
+        else:
+            delete_renditions(storage, renditions)
+
+        return bool(updated)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    """
+    Management command to generate the image renditions of existing profiles.
+    """
+
+    help = 'Generates missing avatar renditions for existing profile images in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads.')
+        parser.add_argument('--force', action='store_true', help='Regenerate renditions that already exist.')
+
+    def handle(self, *args, **options):
+        tasks = []
+
+        for model in PROFILE_MODELS:
+            queryset = model.objects.exclude(image='').exclude(image=DEFAULT_IMAGE_PATH)
+            if not options['force']:
+                queryset = queryset.filter(renditions={})
+
+            tasks.extend(
+                (model, profile_id, image_name, renditions)
+                for profile_id, image_name, renditions in queryset.values_list('id', 'image', 'renditions')
+            )
+
+        if not tasks:
+            self.stdout.write('All profile images already have renditions')
+            return
+
+        self.stdout.write(f'Generating renditions for {len(tasks)} profile images...')
+
+        completed = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            futures = {
+                executor.submit(backfill_profile, model, profile_id, image_name): (model, image_name, renditions)
+                for model, profile_id, image_name, renditions in tasks
+            }
+
+            for future in as_completed(futures):
+                model, image_name, renditions = futures[future]
+                try:
+                    if future.result():
+                        completed += 1
+                        delete_renditions(model._meta.get_field('image').storage, renditions)
+                except Exception as error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Failed to generate renditions for {image_name}: {error}'))
+
+        if failed:
+            self.stderr.write(self.style.ERROR(f'{failed} of {len(tasks)} profile images failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Generated renditions for {completed} profile images'))
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from profiles.models import ImageProcessingJob
+from profiles.image_processing import process_job, _run_in_thread
+
+
+Statuses = ImageProcessingJob.Statuses
+
+
+class Command(BaseCommand):
+    """
+    Management command to drain pending profile image processing jobs.
+    """
+
+    help = 'Compresses uploaded profile images that are waiting in the processing queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads.')
+        parser.add_argument('--limit', type=int, default=None, help='Process at most this many jobs.')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue failed jobs before draining.')
+        parser.add_argument(
+            '--requeue-stale', type=int, default=None, metavar='MINUTES',
+            help='Requeue jobs stuck in processing for longer than this many minutes.',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = ImageProcessingJob.objects.filter(status=Statuses.FAILED).update(
+                status=Statuses.PENDING, error='', updated=timezone.now()
+            )
+            self.stdout.write(f'Requeued {count} failed jobs')
+
+        if options['requeue_stale'] is not None:
+            threshold = timezone.now() - timedelta(minutes=options['requeue_stale'])
+            count = ImageProcessingJob.objects.filter(
+                status=Statuses.PROCESSING, updated__lt=threshold
+            ).update(status=Statuses.PENDING, updated=timezone.now())
+            self.stdout.write(f'Requeued {count} stale jobs')
+
+        job_ids = list(ImageProcessingJob.objects.pending().values_list('id', flat=True)[:options['limit']])
+
+        if not job_ids:
+            self.stdout.write('No pending image processing jobs')
+            return
+
+        self.stdout.write(f'Processing {len(job_ids)} jobs with {options["workers"]} workers...')
+
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = list(executor.map(_run_in_thread, job_ids))
+        else:
+            results = [process_job(job_id) for job_id in job_ids]
+
+        jobs = [job for job in results if job is not None]
+
+        failed = [job for job in jobs if job.status == Statuses.FAILED]
+        for job in failed:
+            self.stdout.write(self.style.ERROR(f'Failed to process {job.source}: {job.error}'))
+
+        if failed:
+            self.stderr.write(self.style.ERROR(f'{len(failed)} of {len(jobs)} image processing jobs failed'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Processed {len(jobs)} image processing jobs'))
@@ -0,0 +1,58 @@
+import sys
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from profiles.provisioning import BulkProvisioner, read_records
+
+
+class Command(BaseCommand):
+    """
+    Management command to bulk import users and their profiles from a CSV or JSON Lines file.
+    """
+
+    help = (
+        'Bulk imports users and profiles. Records have username, email and optionally password, '
+        'role, first_name, last_name and email_verified fields.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the file to import, or '-' for stdin.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default=None, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of records per transaction.')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes, 0 to hash inline.')
+        parser.add_argument('--role', default='user', help='Role of records without one.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or Path(path).suffix.lstrip('.').lower()
+
+        if format not in ('csv', 'jsonl'):
+            raise CommandError('Cannot infer the format, pass --format csv or --format jsonl')
+
+        provisioner = BulkProvisioner(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            default_role=options['role'],
+        )
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+
+        try:
+            report = provisioner.provision(read_records(stream, format), on_batch=self.write_progress)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line, reason in report.skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {line}: {reason}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created} users in {report.elapsed:.1f}s ({report.rate:.0f} users/s, '
+            f'{report.hashing_time:.1f}s waiting for hashes, {report.insert_time:.1f}s inserting), '
+            f'skipped {len(report.skipped)}'
+        ))
+
+    def write_progress(self, report):
+        self.stdout.write(f'{report.created} users created ({report.rate:.0f} users/s)')
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from accounts.purge import UnverifiedPurger
+
+
+class Command(BaseCommand):
+    """
+    Management command to delete the accounts whose email was never verified.
+    """
+
+    help = (
+        'Deletes unverified accounts whose verification link has expired, with their profiles and media, '
+        'in batches of raw deletes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of accounts deleted per transaction.')
+        parser.add_argument('--workers', type=int, default=4, help='Threads removing media files.')
+        parser.add_argument('--limit', type=int, default=None, help='Delete at most this many accounts.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the accounts that would be deleted.')
+
+    def handle(self, *args, **options):
+        purger = UnverifiedPurger(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            limit=options['limit'],
+        )
+
+        if purger.unhandled:
+            self.stdout.write(self.style.WARNING(
+                f'Deleting through the ORM, the fast path does not handle {", ".join(purger.unhandled)}'
+            ))
+
+        if options['dry_run']:
+            counts = purger.count()
+            by_role = ', '.join(f'{count} {role}' for role, count in sorted(counts.items())) or 'none'
+            self.stdout.write(f'Would delete {sum(counts.values())} unverified accounts ({by_role})')
+            return
+
+        report = purger.purge(on_batch=self.write_progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {report.deleted} unverified accounts ({report.rows} rows) in {report.elapsed:.1f}s '
+            f'({report.rate:.0f} accounts/s), removed {report.media} media paths'
+        ))
+
+        if report.media_errors:
+            self.stderr.write(self.style.ERROR(f'Failed to remove {report.media_errors} media paths'))
+
+    def write_progress(self, report):
+        self.stdout.write(f'{report.deleted}/{report.expired} accounts deleted ({report.rate:.0f} accounts/s)')
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mentors.models import MentorCard, Skill
+from mentors.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Management command to rebuild the denormalised mentor cards of the mentors directory.
+    """
+
+    help = 'Rebuilds every mentor card, the mentor search index and the skill counts from the users, mentor profiles and skills tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of cards written per query.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        count = MentorCard.objects.rebuild(batch_size=options['batch_size'])
+        indexed = rebuild_index()
+        Skill.objects.recount()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} mentor cards and indexed {indexed} mentors in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_sqlite(source: str, target: str, timeout: float = 20) -> int:
+    """
+    Copies a SQLite database into another one with the online backup API.
+    Writers of the source are not blocked, and readers of the target keep their
+    snapshot until the copy is committed, as they would with a lagging replica.
+    Returns:
+        int: Number of pages copied.
+    """
+
+    with closing(sqlite3.connect(source, timeout=timeout)) as source_db, \
+            closing(sqlite3.connect(target, timeout=timeout)) as target_db:
+        source_db.backup(target_db)
+        return target_db.execute('PRAGMA page_count').fetchone()[0]
+
+
+class Command(BaseCommand):
+    """
+    Management command to keep a local SQLite replica in sync with the default database.
+    """
+
+    help = (
+        'Copies the default SQLite database to the DATABASE_REPLICA_URL database, a stand-in for replication '
+        'when testing replica reads locally. Real replicas are kept in sync by the database server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=float, default=None, metavar='SECONDS',
+            help='Keep running, copying the database every this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.DATABASE_REPLICA
+        if not alias:
+            raise CommandError('No replica configured, set DATABASE_REPLICA_URL')
+
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        target = connections[alias].settings_dict
+
+        if source['ENGINE'] != 'django.db.backends.sqlite3' or target['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only SQLite databases can be replicated by this command')
+
+        try:
+            while True:
+                started = time.perf_counter()
+                pages = copy_sqlite(str(source['NAME']), str(target['NAME']), source['OPTIONS'].get('timeout', 20))
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(self.style.SUCCESS(f'Copied {pages} pages to {alias} in {elapsed * 1000:.0f}ms'))
+
+                if options['loop'] is None:
+                    break
+                time.sleep(options['loop'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from utils.send_verify_email import send_verify_emails
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Management command to send the verification email again to every unverified user.
+    """
+
+    help = 'Sends a new verification email to every user who has not verified their email address yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of users loaded per query.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the users that would be emailed.')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(email_verified=False, is_active=False).exclude(email='')
+
+        if options['dry_run']:
+            self.stdout.write(f'Would send {users.count()} verification emails')
+            return
+
+        started = time.perf_counter()
+        user_ids = []
+
+        def recipients():
+            for user in users.only('id', 'username', 'email', 'password', 'last_login').iterator(chunk_size=options['chunk_size']):
+                user_ids.append(user.pk)
+                yield user
+
+        sent = send_verify_emails(recipients())
+
+        # Accounts expire with their last link, so the new links give them a new lease
+        now = timezone.now()
+        for start in range(0, len(user_ids), options['chunk_size']):
+            User.objects.filter(pk__in=user_ids[start:start + options['chunk_size']]).update(verification_sent=now)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} verification emails in {time.perf_counter() - started:.1f}s'
+        ))
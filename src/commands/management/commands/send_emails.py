@@ -0,0 +1,75 @@
+import time
+
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import EmailOutbox
+from accounts.outbox import send_batch
+
+
+Statuses = EmailOutbox.Statuses
+
+
+class Command(BaseCommand):
+    """
+    Management command to drain the email outbox.
+    """
+
+    help = 'Sends the queued transactional emails in batches over one mail server connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of emails claimed per batch.')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after about this many emails.')
+        parser.add_argument(
+            '--loop', type=float, default=None, metavar='SECONDS',
+            help='Keep running, polling an empty outbox every this many seconds.',
+        )
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue emails that ran out of attempts.')
+        parser.add_argument(
+            '--requeue-stale', type=int, default=None, metavar='MINUTES',
+            help='Requeue emails stuck in sending for longer than this many minutes.',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = EmailOutbox.objects.filter(status=Statuses.FAILED).update(
+                status=Statuses.PENDING, attempts=0, next_attempt=timezone.now(), updated=timezone.now()
+            )
+            self.stdout.write(f'Requeued {count} failed emails')
+
+        if options['requeue_stale'] is not None:
+            threshold = timezone.now() - timedelta(minutes=options['requeue_stale'])
+            count = EmailOutbox.objects.filter(status=Statuses.SENDING, updated__lt=threshold).update(
+                status=Statuses.PENDING, claim=None, updated=timezone.now()
+            )
+            self.stdout.write(f'Requeued {count} stale emails')
+
+        connection = get_connection()
+        sent = failed = 0
+
+        try:
+            while options['limit'] is None or sent + failed < options['limit']:
+                batch_sent, batch_failed = send_batch(options['batch_size'], connection=connection)
+                sent += batch_sent
+                failed += batch_failed
+
+                if batch_sent or batch_failed:
+                    continue
+                if options['loop'] is None:
+                    break
+
+                # Servers drop idle sessions, the next batch opens a new one
+                connection.close()
+                time.sleep(options['loop'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        if failed:
+            self.stderr.write(self.style.ERROR(f'{failed} of {sent + failed} emails failed and were rescheduled'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails'))
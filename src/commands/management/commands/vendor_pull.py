@@ -1,10 +1,13 @@
-from utils.downloader import download_vendor_static
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 
+from utils.downloader import VendorDownloader
+
 
 STATICFILES_VENDOR_DIR = getattr(settings, 'STATICFILES_VENDOR_DIR')
+STATICFILES_VENDOR_LOCKFILE = getattr(settings, 'STATICFILES_VENDOR_LOCKFILE')
 VENDOR_FILES = {
     'bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
     'comfortaa.css': 'https://fonts.googleapis.com/css2?family=Comfortaa:wght@300;400;700&display=swap',
@@ -18,22 +21,57 @@ class Command(BaseCommand):
     Management command to download CDN vendor static files.
     """
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write('Downloading CDN vendor static files...')
+    help = (
+        'Downloads the vendor static files in parallel, skipping the ones that did not change, '
+        'and records their SRI hashes in the lockfile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Files downloaded at once.')
+        parser.add_argument('--force', action='store_true', help='Download every file, even if it did not change.')
+        parser.add_argument(
+            '--frozen', action='store_true',
+            help='Fail instead of updating files whose content no longer matches the lockfile.',
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only verify the files on disk against the lockfile, without downloading.',
+        )
 
-        completed_urls = []
+    def handle(self, *args, **options):
+        downloader = VendorDownloader(
+            STATICFILES_VENDOR_DIR,
+            STATICFILES_VENDOR_LOCKFILE,
+            workers=options['workers'],
+            frozen=options['frozen'],
+            force=options['force'],
+        )
 
-        for filename, url in VENDOR_FILES.items():
-            out_path = STATICFILES_VENDOR_DIR / filename
+        if options['check']:
+            mismatched = downloader.check(VENDOR_FILES)
+            if mismatched:
+                raise CommandError(f'Vendor files do not match the lockfile: {", ".join(mismatched)}')
+            self.stdout.write(self.style.SUCCESS('All vendor static files match the lockfile'))
+            return
 
-            download_status = download_vendor_static(url, out_path, parent_mkdir=True)
+        self.stdout.write('Downloading CDN vendor static files...')
+
+        started = time.perf_counter()
+        results = downloader.pull(VENDOR_FILES)
+        elapsed = time.perf_counter() - started
 
-            if download_status:
-                completed_urls.append(url)
+        for result in results:
+            if result.status == 'failed':
+                self.stdout.write(self.style.ERROR(f'  {result.name}: failed, {result.error}'))
             else:
-                self.stdout.write(self.style.ERROR(f'Failed to download {url}'))
+                self.stdout.write(f'  {result.name}: {result.status} ({result.size} bytes in {result.elapsed * 1000:.0f}ms)')
+
+        failed = sum(result.status == 'failed' for result in results)
+        received = sum(result.size for result in results)
 
-        if set(completed_urls) == set(VENDOR_FILES.values()):
-            self.stdout.write(self.style.SUCCESS('All vendor static files were downloaded successfully'))
+        if failed:
+            self.stderr.write(self.style.ERROR(f'{failed} of {len(results)} vendor static files failed to download'))
         else:
-            self.stderr.write(self.style.ERROR('Some vendor static files failed to download'))
+            self.stdout.write(self.style.SUCCESS(
+                f'All vendor static files are up to date, received {received} bytes in {elapsed:.2f}s'
+            ))
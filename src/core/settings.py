@@ -1,6 +1,9 @@
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
+
+from utils.cache import cache_config
+from utils.database import database_config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,6 +27,14 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', cast=str, default='jamessullivanpost
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', cast=str)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool, default=True)
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', cast=bool, default=False)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', cast=int, default=10)
+
+EMAIL_VERIFICATION_MAX_AGE = config('EMAIL_VERIFICATION_MAX_AGE', cast=int, default=3 * 24 * 60 * 60)
+
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', cast=int, default=100)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', cast=int, default=6)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', cast=int, default=60)
+EMAIL_OUTBOX_MAX_RETRY_DELAY = config('EMAIL_OUTBOX_MAX_RETRY_DELAY', cast=int, default=60 * 60)
 
 
 # Application definition
@@ -54,10 +65,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utils.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.PasswordHashTimingMiddleware',
+    'utils.replicas.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
@@ -88,16 +102,80 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# URL names of the read views served by their async versions, such as mentors:mentors_list.
+# Only worth it under an ASGI server (core.asgi), under WSGI each async view runs in an event loop of its own.
+# Compare the two with `manage.py benchmark_views --compare`
+ASYNC_VIEWS = config('ASYNC_VIEWS', cast=Csv(), default='')
+
 
 # Database
 
+# SQLite at db.sqlite3 unless DATABASE_URL is set, see utils.database.database_config
+DATABASE_URL = config('DATABASE_URL', cast=str, default='')
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': database_config(
+        DATABASE_URL,
+        BASE_DIR / 'db.sqlite3',
+        conn_max_age=config('DATABASE_CONN_MAX_AGE', cast=int, default=60),
+    ),
+}
+
+# Read-only views decorated with utils.replicas.read_from_replica read from DATABASE_REPLICA_URL when it is set.
+# Locally, DATABASE_REPLICA_URL=sqlite:///db-replica.sqlite3 with `manage.py replicate_database --loop 5` stands in for one
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', cast=str, default='')
+
+DATABASE_REPLICA = 'replica' if DATABASE_REPLICA_URL else None
+
+if DATABASE_REPLICA:
+    DATABASES[DATABASE_REPLICA] = {
+        **database_config(
+            DATABASE_REPLICA_URL,
+            BASE_DIR / 'db-replica.sqlite3',
+            conn_max_age=config('DATABASE_CONN_MAX_AGE', cast=int, default=60),
+        ),
+        # Tests read their own writes from the test database
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['utils.replicas.ReplicaRouter']
+
+# After a write, clients read from the default database for this long, longer than the replication lag
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', cast=int, default=15)
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+
+# Password hashing
+
+# New passwords are hashed with PASSWORD_HASHER (argon2, which needs argon2-cffi, scrypt or pbkdf2), the other
+# hashers only verify existing hashes, which are rehashed with the current policy on the next login.
+# Run `manage.py benchmark_hashers` on the production host to pick the costs.
+PASSWORD_HASHER = config('PASSWORD_HASHER', cast=str, default='scrypt')
+
+_PASSWORD_HASHERS = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'accounts.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
 }
 
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+]
+
+PASSWORD_SCRYPT_WORK_FACTOR = config('PASSWORD_SCRYPT_WORK_FACTOR', cast=int, default=2 ** 15)
+PASSWORD_SCRYPT_BLOCK_SIZE = config('PASSWORD_SCRYPT_BLOCK_SIZE', cast=int, default=8)
+PASSWORD_SCRYPT_PARALLELISM = config('PASSWORD_SCRYPT_PARALLELISM', cast=int, default=1)
+
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', cast=int, default=2)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', cast=int, default=64 * 1024)
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', cast=int, default=1)
+
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', cast=int, default=870_000)
+
+# Milliseconds of password hashing a request may take before it is logged
+PASSWORD_HASH_BUDGET_MS = config('PASSWORD_HASH_BUDGET_MS', cast=int, default=250)
+
 
 # Password validation
 
@@ -170,16 +248,117 @@ STATICFILES_BASE_DIR.mkdir(exist_ok=True, parents=True)
 
 STATICFILES_VENDOR_DIR = STATICFILES_BASE_DIR / 'vendor'
 
+# URLs, SRI hashes and cache validators of the vendor files, written by `manage.py vendor_pull`
+STATICFILES_VENDOR_LOCKFILE = BASE_DIR / 'vendor.lock.json'
+
 STATICFILES_DIRS = [
     STATICFILES_BASE_DIR
 ]
 
-STATIC_ROOT = 'local_cdn'
+STATIC_ROOT = BASE_DIR / 'local_cdn'
+
+# `collectstatic` hashes, minifies and pre-compresses the files, see utils.staticfiles, off in development
+STATIC_PIPELINE = config('STATIC_PIPELINE', cast=bool, default=not DEBUG)
+
+# Serve STATIC_ROOT from the application with utils.staticfiles.StaticFilesMiddleware, turn off behind a CDN
+STATIC_SERVE = config('STATIC_SERVE', cast=bool, default=True)
+
+# Cache lifetime of static files without a content hash in their name, hashed ones are cached for a year
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', cast=int, default=60)
 
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'utils.staticfiles.CompressedManifestStaticFilesStorage' if STATIC_PIPELINE
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+    'profile_media': {
+        'BACKEND': 'profiles.storage.ContentAddressedStorage',
+    },
+}
+
+
+# Cache
+
+CACHE_URL = config('CACHE_URL', cast=str, default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'utils.cache.TieredCache',
+        'LOCATION': 'snugly',
+        'TIMEOUT': config('CACHE_TIMEOUT', cast=int, default=300),
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', cast=int, default=1000),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', cast=float, default=5),
+            'NAMESPACES': {
+                'mentors': 'mentors:',
+                'profiles': 'template.cache.',
+                'sessions': 'django.contrib.sessions.',
+            },
+            # A logout or a new session key must take effect in every process at once
+            'SHARED_ONLY': ('django.contrib.sessions.',),
+        },
+    },
+    'shared': cache_config(CACHE_URL, BASE_DIR / 'cache'),
+    # Buckets are locked with cache.add(), which the file based cache does not make atomic across
+    # processes, so they are kept in a database table (created by the accounts migrations) instead
+    'throttle': cache_config(
+        config(
+            'THROTTLE_CACHE_URL', cast=str,
+            default=CACHE_URL if CACHE_URL and not CACHE_URL.startswith('file:') else 'db://throttle_cache',
+        ),
+        BASE_DIR / 'cache',
+    ),
+}
+
+SESSION_ENGINE = config('SESSION_ENGINE', cast=str, default='django.contrib.sessions.backends.cached_db')
+
+
+# Rate limiting
+
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', cast=bool, default=True)
+THROTTLE_CACHE = config('THROTTLE_CACHE', cast=str, default='throttle')
+# Number of reverse proxies in front of the app, whose X-Forwarded-For entries are trusted
+THROTTLE_PROXY_COUNT = config('THROTTLE_PROXY_COUNT', cast=int, default=0)
+
+THROTTLE_RATES = {
+    'login:ip': config('THROTTLE_LOGIN_IP_RATE', cast=str, default='30/m'),
+    'login:username': config('THROTTLE_LOGIN_USERNAME_RATE', cast=str, default='5/m'),
+    'register': config('THROTTLE_REGISTER_RATE', cast=str, default='10/h'),
+}
+
+
+# Image processing
+
+IMAGE_PROCESSING_WORKERS = config('IMAGE_PROCESSING_WORKERS', cast=int, default=2)
+
+IMAGE_MAX_UPLOAD_SIZE = config('IMAGE_MAX_UPLOAD_SIZE', cast=int, default=10 * 1024 * 1024)
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', cast=int, default=40_000_000)
+IMAGE_MAX_DIMENSION = config('IMAGE_MAX_DIMENSION', cast=int, default=2048)
+IMAGE_COMPRESSION_SPOOL_SIZE = config('IMAGE_COMPRESSION_SPOOL_SIZE', cast=int, default=1024 * 1024)
+IMAGE_COMPRESSION_METRICS_HOOK = config('IMAGE_COMPRESSION_METRICS_HOOK', cast=str, default='utils.image_compression.log_metrics')
+
+
+# Mentor search
+
+MENTOR_SEARCH_BACKEND = config('MENTOR_SEARCH_BACKEND', cast=str, default='auto')
+MENTOR_SEARCH_INDEX_TTL = config('MENTOR_SEARCH_INDEX_TTL', cast=int, default=300)
+MENTOR_SEARCH_MAX_CANDIDATES = config('MENTOR_SEARCH_MAX_CANDIDATES', cast=int, default=250)
+
+
+# Profile pages
+
+PROFILE_FRAGMENT_CACHE_TIMEOUT = config('PROFILE_FRAGMENT_CACHE_TIMEOUT', cast=int, default=60 * 60)
+
 
 # Default primary key field type
 
@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from . import models
+
+
+class SkillAliasInline(admin.TabularInline):
+    model = models.SkillAlias
+    extra = 1
+
+
+@admin.register(models.Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'mentor_count', 'created')
+    search_fields = ('name', 'slug', 'aliases__slug')
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('mentor_count', 'created')
+    inlines = (SkillAliasInline,)
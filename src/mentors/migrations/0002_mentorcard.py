@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:12
+
+import django.db.models.deletion
+import profiles.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_cards(apps, schema_editor):
+    AppUser = apps.get_model('accounts', 'AppUser')
+    MentorCard = apps.get_model('mentors', 'MentorCard')
+
+    mentors = (
+        AppUser.objects.filter(role='mentor', email_verified=True, mentor_profile__isnull=False)
+        .select_related('mentor_profile')
+        .prefetch_related('mentor_profile__skills')
+    )
+
+    MentorCard.objects.bulk_create([
+        MentorCard(
+            user_id=mentor.id,
+            username=mentor.username,
+            full_name=f'{mentor.first_name} {mentor.last_name}',
+            image=mentor.mentor_profile.image.name,
+            renditions=mentor.mentor_profile.renditions,
+            verified=mentor.mentor_profile.verified,
+            skills=[skill.name for skill in mentor.mentor_profile.skills.all()],
+            created=mentor.created,
+        )
+        for mentor in mentors.iterator(chunk_size=1000)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('mentors', '0001_initial'),
+        ('profiles', '0004_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorCard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='mentor_card', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150)),
+                ('full_name', models.CharField(max_length=301)),
+                ('image', models.ImageField(blank=True, storage=profiles.storage.profile_media_storage, upload_to='')),
+                ('renditions', models.JSONField(blank=True, default=dict)),
+                ('verified', models.BooleanField(default=False)),
+                ('skills', models.JSONField(blank=True, default=list)),
+                ('created', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created', '-user'],
+                'indexes': [models.Index(fields=['-created', '-user'], name='mentorcard_created_idx')],
+            },
+        ),
+        migrations.RunPython(build_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+SEARCH_TABLE = 'mentors_search'
+
+
+def fts5_supported(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(option == 'ENABLE_FTS5' for option, in cursor.fetchall())
+
+
+def create_search_table(apps, schema_editor):
+    # Without FTS5 the search falls back to the in-process inverted index
+    if not fts5_supported(schema_editor):
+        return
+
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+        "user_id UNINDEXED, created UNINDEXED, name, skills, bio, experience, skill_keys, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6')"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0002_mentorcard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,144 @@
+import uuid
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def link_skills(apps, schema_editor):
+    """
+    Points every MentorSkill row at a canonical Skill, merging spellings with the same slug
+    and dropping duplicate rows of a profile.
+    """
+
+    Skill = apps.get_model('mentors', 'Skill')
+    MentorSkill = apps.get_model('mentors', 'MentorSkill')
+    MentorCard = apps.get_model('mentors', 'MentorCard')
+
+    skills = {}
+    seen = set()
+    duplicates = []
+    links = []
+
+    for mentor_skill in MentorSkill.objects.order_by('name').iterator(chunk_size=2000):
+        name = ' '.join(mentor_skill.name.split())
+        slug = slugify(name)
+
+        if not slug or (mentor_skill.profile_id, slug) in seen:
+            duplicates.append(mentor_skill.pk)
+            continue
+        seen.add((mentor_skill.profile_id, slug))
+
+        if slug not in skills:
+            skills[slug] = Skill(name=name, slug=slug)
+
+        mentor_skill.skill = skills[slug]
+        links.append(mentor_skill)
+
+    Skill.objects.bulk_create(skills.values(), batch_size=1000)
+    MentorSkill.objects.bulk_update(links, ['skill'], batch_size=1000)
+
+    for start in range(0, len(duplicates), 500):
+        MentorSkill.objects.filter(pk__in=duplicates[start:start + 500]).delete()
+
+    # Cards show the canonical names from now on, and skills count the listed mentors
+    names = {}
+    for user_id, name in MentorSkill.objects.values_list('profile__user_id', 'skill__name').iterator(chunk_size=2000):
+        names.setdefault(user_id, []).append(name)
+
+    cards = list(MentorCard.objects.only('user_id', 'skills'))
+    for card in cards:
+        card.skills = names.get(card.user_id, [])
+    MentorCard.objects.bulk_update(cards, ['skills'], batch_size=1000)
+
+    counts = Counter(name for card in cards for name in card.skills)
+    for skill in skills.values():
+        skill.mentor_count = counts[skill.name]
+    Skill.objects.bulk_update(skills.values(), ['mentor_count'], batch_size=1000)
+
+
+def unlink_skills(apps, schema_editor):
+    MentorSkill = apps.get_model('mentors', 'MentorSkill')
+
+    for mentor_skill in MentorSkill.objects.select_related('skill').iterator(chunk_size=2000):
+        mentor_skill.name = mentor_skill.skill.name
+        mentor_skill.save(update_fields=['name'])
+
+
+def reset_search_index(apps, schema_editor):
+    # Skill filters are indexed by slug now, the search backend refills the table on first use
+    if 'mentors_search' in schema_editor.connection.introspection.table_names():
+        schema_editor.execute('DELETE FROM mentors_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0003_mentor_search'),
+        ('profiles', '0004_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+                ('mentor_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-mentor_count', 'name'], name='skill_mentor_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='mentors.skill')),
+            ],
+            options={
+                'verbose_name_plural': 'skill aliases',
+            },
+        ),
+        migrations.AddField(
+            model_name='mentorskill',
+            name='skill',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mentor_skills', to='mentors.skill'),
+        ),
+        migrations.RunPython(link_skills, unlink_skills),
+        # Gives the dropped column a default so that the migration can be reversed
+        migrations.AlterField(
+            model_name='mentorskill',
+            name='name',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RemoveField(
+            model_name='mentorskill',
+            name='name',
+        ),
+        migrations.AlterField(
+            model_name='mentorskill',
+            name='skill',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentor_skills', to='mentors.skill'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='mentors',
+            field=models.ManyToManyField(related_name='skill_set', through='mentors.MentorSkill', to='profiles.mentorprofile'),
+        ),
+        migrations.AddConstraint(
+            model_name='mentorskill',
+            constraint=models.UniqueConstraint(fields=('profile', 'skill'), name='mentorskill_profile_skill_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='mentorskill',
+            index=models.Index(fields=['skill', 'profile'], name='mentorskill_skill_profile_idx'),
+        ),
+        migrations.RunPython(reset_search_index, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,132 @@
 from uuid import uuid4
 
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from accounts.models import AppUser, AppUserProxy
 from profiles.models import MentorProfile
+from profiles.storage import profile_media_storage
+
+
+# Cached skill filters of the mentors directory
+SKILL_COUNTS_CACHE_KEY = 'mentors:skill_counts'
+
+
+class SkillManager(models.Manager):
+    """
+    Custom manager for the Skill model.
+    Methods:
+        canonical(name): Returns the skill a name or alias refers to, creating it if needed.
+        recount(skill_ids): Recomputes the number of listed mentors of the given skills.
+        mentor_counts(limit): Returns the precomputed skill name to mentor count map.
+    """
+
+    def canonical(self, name: str):
+        name = ' '.join(name.split())
+        slug = slugify(name)
+        if not slug:
+            raise ValidationError(f'{name!r} is not a valid skill name')
+
+        skill = self.filter(models.Q(slug=slug) | models.Q(aliases__slug=slug)).first()
+        if skill is None:
+            skill, _ = self.get_or_create(slug=slug, defaults={'name': name})
+
+        return skill
+
+    def recount(self, skill_ids=None):
+        """
+        Counts the listed mentors (those with a mentor card) of the given skills, or of every skill.
+        """
+
+        skills = self.all() if skill_ids is None else self.filter(id__in=skill_ids)
+
+        listed = (
+            MentorSkill.objects
+            .filter(skill=models.OuterRef('pk'), profile__user__mentor_card__isnull=False)
+            .order_by()
+            .values('skill')
+            .annotate(count=models.Count('profile', distinct=True))
+            .values('count')
+        )
+
+        updated = skills.update(mentor_count=Coalesce(models.Subquery(listed), 0))
+        cache.delete(SKILL_COUNTS_CACHE_KEY)
+
+        return updated
+
+    def mentor_counts(self, limit: int | None = None) -> dict:
+        skills = self.filter(mentor_count__gt=0).order_by('-mentor_count', 'name').values_list('name', 'mentor_count')
+        if limit is not None:
+            skills = skills[:limit]
+
+        return dict(skills)
+
+
+class Skill(models.Model):
+    """
+    Canonical skill shared by every mentor who has it.
+    Attributes:
+        name (str): The display name of the skill.
+        slug (str): The canonical form of the name, unique.
+        mentor_count (int): Number of listed mentors with the skill, maintained by mentors.signals.
+        created (datetime): Creation date of the skill.
+    """
+
+    id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
+
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=60, unique=True)
+
+    mentors = models.ManyToManyField(MentorProfile, through='MentorSkill', related_name='skill_set')
+    mentor_count = models.PositiveIntegerField(default=0, editable=False)
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = SkillManager()
+
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['-mentor_count', 'name'], name='skill_mentor_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.name)
+        super().save(*args, **kwargs)
+
+
+class SkillAlias(models.Model):
+    """
+    Alternative spelling of a skill, resolved to the skill by `Skill.objects.canonical`.
+    """
+
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+    slug = models.SlugField(max_length=60, unique=True)
+
+    class Meta:
+        verbose_name_plural = 'skill aliases'
+
+    def __str__(self):
+        return self.slug
+
+
+class MentorSkillManager(models.Manager):
+    """
+    Custom manager for the MentorSkill model.
+    Methods:
+        add(profile, name): Gives the profile the canonical skill of a name, unless it already has it.
+    """
+
+    def add(self, profile, name: str):
+        mentor_skill, _ = self.get_or_create(profile=profile, skill=Skill.objects.canonical(name))
+        return mentor_skill
 
 
 class MentorSkill(models.Model):
@@ -10,9 +135,139 @@ class MentorSkill(models.Model):
     """
     
     profile = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='skills')
-    name = models.CharField(max_length=50)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='mentor_skills')
 
     id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
 
+    objects = MentorSkillManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'skill'], name='mentorskill_profile_skill_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'profile'], name='mentorskill_skill_profile_idx'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @property
+    def name(self):
+        return self.skill.name
+
+
+class MentorCardManager(models.Manager):
+    """
+    Custom manager for the MentorCard model.
+    Methods:
+        refresh(user_ids): Rebuilds the cards of the given users from their current rows.
+        rebuild(batch_size): Rebuilds every card and drops cards of users no longer listed.
+    """
+
+    def refresh(self, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+
+        cards = [
+            MentorCard.from_mentor(mentor)
+            for mentor in AppUserProxy.objects.directory().filter(id__in=user_ids)
+            if mentor.profile is not None
+        ]
+
+        with transaction.atomic():
+            self._upsert(cards)
+            self.filter(user_id__in=user_ids).exclude(user_id__in=[card.user_id for card in cards]).delete()
+
+    def rebuild(self, batch_size: int = 1000):
+        listed = AppUserProxy.objects.directory()
+
+        with transaction.atomic():
+            count = 0
+            batch = []
+            for mentor in listed.iterator(chunk_size=batch_size):
+                if mentor.profile is None:
+                    continue
+                batch.append(MentorCard.from_mentor(mentor))
+                if len(batch) >= batch_size:
+                    count += self._upsert(batch)
+                    batch = []
+            count += self._upsert(batch)
+
+            self.exclude(user_id__in=listed.values('id')).delete()
+
+        return count
+
+    def _upsert(self, cards):
+        self.bulk_create(
+            cards,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=MentorCard.CARD_FIELDS,
+        )
+        return len(cards)
+
+
+class MentorCard(models.Model):
+    """
+    Denormalised read model of a mentor as shown in the mentors directory.
+
+    Holds everything a directory card renders, so the directory page is a single indexed scan
+    of this table. Cards exist only for verified mentors and are kept up to date from the
+    save/delete signals of AppUser, MentorProfile and MentorSkill (see mentors.signals).
+    Attributes:
+        user (OneToOneField): The mentor, also the primary key.
+        username (str): The mentor's username.
+        full_name (str): The mentor's full name.
+        image (ImageField): The mentor's profile image, served through the profile media storage.
+        renditions (dict): The renditions of the profile image, keyed by format and size.
+        verified (bool): Whether the mentor profile is verified.
+        skills (list): Names of the mentor's skills.
+        created (datetime): Creation date of the mentor, used for ordering.
+    """
+
+    CARD_FIELDS = ['username', 'full_name', 'image', 'renditions', 'verified', 'skills', 'created']
+
+    user = models.OneToOneField(AppUser, on_delete=models.CASCADE, primary_key=True, related_name='mentor_card')
+
+    username = models.CharField(max_length=150)
+    full_name = models.CharField(max_length=301)
+
+    image = models.ImageField(storage=profile_media_storage, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)
+
+    verified = models.BooleanField(default=False)
+    skills = models.JSONField(default=list, blank=True)
+
+    created = models.DateTimeField()
+
+    objects = MentorCardManager()
+
+    class Meta:
+        ordering = ['-created', '-user']
+        indexes = [
+            models.Index(fields=['-created', '-user'], name='mentorcard_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.username
+
+    @classmethod
+    def from_mentor(cls, mentor):
+        """
+        Builds a card from a mentor loaded with `AppUserProxy.objects.directory()`.
+        """
+
+        profile = mentor.profile
+
+        return cls(
+            user_id=mentor.id,
+            username=mentor.username,
+            full_name=profile.full_name,
+            image=profile.image.name,
+            renditions=profile.renditions,
+            verified=profile.verified,
+            skills=[skill.name for skill in profile.all_skills],
+            created=mentor.created,
+        )
@@ -0,0 +1,499 @@
+import re
+import time
+import hashlib
+import heapq
+import bisect
+import logging
+import threading
+
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from .models import MentorCard
+
+from utils.logging import send_log
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'mentors_search'
+
+# Relative weight of a term match in each indexed field
+FIELD_WEIGHTS = {
+    'name': 4.0,
+    'skills': 3.0,
+    'bio': 1.0,
+    'experience': 1.0,
+}
+
+MAX_FACETS = 20
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text) -> list:
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def is_prefix(token: str) -> bool:
+    # Single characters would expand to most of the vocabulary, so they only match whole words
+    return len(token) > 1
+
+
+def normalize_skills(skills) -> list:
+    # Skill names and slugs both normalise to the slug of the canonical skill
+    return list(dict.fromkeys(slug for slug in map(slugify, skills) if slug))
+
+
+def documents(user_ids=None, chunk_size: int = 2000):
+    """
+    Yields the searchable text of listed mentors, read from their cards and mentor profiles.
+    Args:
+        user_ids (Iterable, optional): Restricts the documents to these users.
+    Yields:
+        dict: user_id, created, name, skills (list), bio and experience of a mentor.
+    """
+
+    cards = MentorCard.objects.order_by()
+    if user_ids is not None:
+        cards = cards.filter(user_id__in=list(user_ids))
+
+    rows = cards.values_list(
+        'user_id', 'created', 'username', 'full_name', 'skills',
+        'user__mentor_profile__bio', 'user__mentor_profile__experience',
+    )
+
+    for user_id, created, username, full_name, skills, bio, experience in rows.iterator(chunk_size=chunk_size):
+        yield {
+            'user_id': user_id,
+            'created': created,
+            'name': f'{full_name} {username}',
+            'skills': skills or [],
+            'bio': bio or '',
+            'experience': experience or '',
+        }
+
+
+@dataclass
+class SearchResult:
+    """
+    Outcome of a mentor search.
+    Attributes:
+        user_ids (list): Ids of the requested page of best matching mentors, best first.
+        total (int): Number of mentors matching the query and the skill filters.
+        facets (list): (skill, count) pairs over the matching mentors, most common first.
+        truncated (bool): True if the backend stopped after MENTOR_SEARCH_MAX_CANDIDATES matches,
+            in which case the total and the facet counts only cover those matches.
+    """
+
+    user_ids: list = field(default_factory=list)
+    total: int = 0
+    facets: list = field(default_factory=list)
+    truncated: bool = False
+
+
+class BaseSearchBackend(ABC):
+    """
+    Interface of the mentor search backends.
+
+    Queries match every token, the last one as a prefix so results follow the user
+    while they type. Skill filters match skill names or slugs exactly.
+    Methods:
+        search(query, skills, limit, offset): Returns a SearchResult with `limit` mentors
+            from the `offset`-th best match on.
+        update(user_ids): Re-indexes the given mentors, dropping the ones no longer listed.
+        rebuild(): Re-indexes every listed mentor.
+    """
+
+    @abstractmethod
+    def search(self, query: str, skills=(), limit: int = 24, offset: int = 0) -> SearchResult:
+        pass
+
+    @abstractmethod
+    def update(self, user_ids):
+        pass
+
+    @abstractmethod
+    def rebuild(self) -> int:
+        pass
+
+
+class FTS5SearchBackend(BaseSearchBackend):
+    """
+    Search backend on a SQLite FTS5 table, created by the mentors migrations when the
+    SQLite build supports FTS5.
+
+    Rows are keyed by a 63-bit rowid derived from the mentor's UUID, so incremental updates
+    are rowid lookups, and skills are indexed as opaque keys so skill filters are part of the
+    MATCH expression. Pages are ranked with BM25 by FTS5 over every match. To keep broad
+    prefixes (the first letters typed) within the latency budget, the total and the facets
+    only count the first MENTOR_SEARCH_MAX_CANDIDATES matches, and the result is then marked
+    as truncated.
+    """
+
+    COLUMNS = ('user_id', 'created', 'name', 'skills', 'bio', 'experience', 'skill_keys')
+    TEXT_COLUMNS = '{name skills bio experience}'
+
+    def __init__(self, max_candidates: int | None = None):
+        self.max_candidates = settings.MENTOR_SEARCH_MAX_CANDIDATES if max_candidates is None else max_candidates
+        self._checked = False
+
+    @staticmethod
+    def rowid(user_id) -> int:
+        return UUID(str(user_id)).int & ((1 << 63) - 1)
+
+    @staticmethod
+    def skill_key(skill: str) -> str:
+        return 'sk' + hashlib.blake2b(skill.encode(), digest_size=8).hexdigest()
+
+    @classmethod
+    def row(cls, document) -> tuple:
+        return (
+            cls.rowid(document['user_id']),
+            UUID(str(document['user_id'])).hex,
+            document['created'].isoformat(),
+            document['name'],
+            '\n'.join(document['skills']),
+            document['bio'],
+            document['experience'],
+            ' '.join(cls.skill_key(skill) for skill in normalize_skills(document['skills'])),
+        )
+
+    def match_expression(self, tokens, skills) -> str:
+        terms = []
+        if tokens:
+            phrases = [f'"{token}"' for token in tokens]
+            if is_prefix(tokens[-1]):
+                phrases[-1] += '*'
+            terms.append(f'{self.TEXT_COLUMNS} : ({" ".join(phrases)})')
+        terms.extend(f'skill_keys : {self.skill_key(skill)}' for skill in skills)
+
+        return ' AND '.join(terms)
+
+    def search(self, query: str, skills=(), limit: int = 24, offset: int = 0) -> SearchResult:
+        self._ensure_built()
+
+        tokens = tokenize(query)
+        skills = normalize_skills(skills)
+
+        if tokens or skills:
+            # The rank column is ranked by FTS5 itself, with the column weights set for this query
+            where = f'WHERE {SEARCH_TABLE} MATCH %s AND rank MATCH %s'
+            where_params = [self.match_expression(tokens, skills), self.rank_function()]
+            page = f'SELECT user_id FROM {SEARCH_TABLE} {where} ORDER BY rank, created DESC LIMIT %s OFFSET %s'
+        else:
+            where = ''
+            where_params = []
+            page = f'SELECT user_id FROM {SEARCH_TABLE} ORDER BY created DESC LIMIT %s OFFSET %s'
+
+        # Counted without ranking, over at most max_candidates + 1 matches
+        counts = f'SELECT skills FROM {SEARCH_TABLE} {where} LIMIT %s'
+
+        with connection.cursor() as cursor:
+            cursor.execute(page, [*where_params, limit, offset])
+            user_ids = [UUID(user_id) for user_id, in cursor.fetchall()]
+
+            cursor.execute(counts, [*where_params, self.max_candidates + 1])
+            rows = cursor.fetchall()
+
+        truncated = len(rows) > self.max_candidates
+        del rows[self.max_candidates:]
+
+        facets = Counter()
+        names = {}
+        for text, in rows:
+            for name in dict.fromkeys(name for name in text.split('\n') if name):
+                facets[slugify(name)] += 1
+                names.setdefault(slugify(name), name)
+
+        return SearchResult(
+            user_ids=user_ids,
+            total=len(rows),
+            truncated=truncated,
+            facets=[(names[skill], count) for skill, count in sorted(facets.items(), key=lambda item: (-item[1], item[0]))[:MAX_FACETS]],
+        )
+
+    @staticmethod
+    def rank_function() -> str:
+        # One weight per column: user_id and created are not searched, skill_keys only filters
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        return f'bm25(0, 0, {weights}, 0)'
+
+    def update(self, user_ids):
+        user_ids = list(user_ids)
+        rows = [self.row(document) for document in documents(user_ids)]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(self.rowid(user_id),) for user_id in user_ids])
+            cursor.executemany(self.insert_statement(), rows)
+
+    def rebuild(self, batch_size: int = 2000) -> int:
+        count = 0
+        batch = []
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+            for document in documents(chunk_size=batch_size):
+                batch.append(self.row(document))
+                if len(batch) >= batch_size:
+                    cursor.executemany(self.insert_statement(), batch)
+                    count += len(batch)
+                    batch = []
+            cursor.executemany(self.insert_statement(), batch)
+            count += len(batch)
+
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+        self._checked = True
+
+        return count
+
+    def insert_statement(self) -> str:
+        return (
+            f'INSERT INTO {SEARCH_TABLE} (rowid, {", ".join(self.COLUMNS)}) '
+            f'VALUES ({", ".join(["%s"] * (len(self.COLUMNS) + 1))})'
+        )
+
+    def _ensure_built(self):
+        # Populates the table on first use after it was created on an existing database
+        if self._checked:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM {SEARCH_TABLE} LIMIT 1')
+            empty = cursor.fetchone() is None
+
+        if empty and MentorCard.objects.exists():
+            self.rebuild()
+
+        self._checked = True
+
+
+class InvertedIndexSearchBackend(BaseSearchBackend):
+    """
+    Pure Python search backend for databases without FTS5.
+
+    Keeps an in-process inverted index of weighted term frequencies and a sorted vocabulary
+    for prefix lookups. Signal driven updates only reach the index of the process that made
+    the change, so the index is rebuilt once it is older than MENTOR_SEARCH_INDEX_TTL seconds.
+    Rebuilds fill a new index in a background thread while the old one keeps serving searches,
+    and swap it in when done.
+    """
+
+    def __init__(self, ttl: int | None = None):
+        self.ttl = settings.MENTOR_SEARCH_INDEX_TTL if ttl is None else ttl
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._refresher = None   # thread rebuilding a stale index
+        self._rebuilds = 0       # rebuilds in progress
+        self._changed = set()    # user ids updated while a rebuild was in progress
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)   # term -> {user_id: weight}
+        self._skills = defaultdict(set)      # skill slug -> user ids
+        self._skill_names = {}               # skill slug -> display name
+        self._documents = {}                 # user_id -> (terms, skills, created timestamp)
+        self._vocabulary = None
+
+    def search(self, query: str, skills=(), limit: int = 24, offset: int = 0) -> SearchResult:
+        tokens = tokenize(query)
+        skills = normalize_skills(skills)
+
+        with self._lock:
+            self._ensure_built()
+
+            scores = None
+            for position, token in enumerate(tokens, start=1):
+                matches = {}
+                terms = self._expand(token) if position == len(tokens) else [token]
+                for term in terms:
+                    for user_id, weight in self._postings[term].items():
+                        matches[user_id] = matches.get(user_id, 0.0) + weight
+
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {user_id: score + matches[user_id] for user_id, score in scores.items() if user_id in matches}
+
+                if not scores:
+                    return SearchResult()
+
+            candidates = set(scores) if scores is not None else set(self._documents)
+            for skill in sorted(skills, key=lambda skill: len(self._skills.get(skill, ()))):
+                candidates &= self._skills.get(skill, set())
+
+            scores = scores or {}
+            documents = self._documents
+            best = heapq.nsmallest(
+                offset + limit, candidates,
+                key=lambda user_id: (-scores.get(user_id, 0.0), -documents[user_id][2]),
+            )[offset:]
+
+            facets = Counter()
+            for user_id in candidates:
+                facets.update(documents[user_id][1])
+
+            return SearchResult(
+                user_ids=best,
+                total=len(candidates),
+                facets=[
+                    (self._skill_names[skill], count)
+                    for skill, count in sorted(facets.items(), key=lambda item: (-item[1], item[0]))[:MAX_FACETS]
+                ],
+            )
+
+    def update(self, user_ids):
+        user_ids = list(user_ids)
+        fresh = list(documents(user_ids))
+
+        with self._lock:
+            if self._rebuilds:
+                self._changed.update(user_ids)
+            if self._built_at is None:
+                return
+            for user_id in user_ids:
+                self._remove(user_id)
+            for document in fresh:
+                self._add(document)
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self._rebuilds += 1
+
+        try:
+            index = type(self)(ttl=self.ttl)
+            for document in documents():
+                index._add(document)
+        finally:
+            with self._lock:
+                self._rebuilds -= 1
+
+        with self._lock:
+            self._postings = index._postings
+            self._skills = index._skills
+            self._skill_names = index._skill_names
+            self._documents = index._documents
+            self._vocabulary = None
+            self._built_at = time.monotonic()
+
+            changed = self._changed
+            self._changed = set() if not self._rebuilds else set(changed)
+
+        # Updates made while the documents were read may be missing from the new index
+        if changed:
+            self.update(changed)
+
+        return len(index._documents)
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            self.rebuild()
+        elif time.monotonic() - self._built_at > self.ttl and self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh, name='mentor-search-index', daemon=True)
+            self._refresher.start()
+
+    def _refresh(self):
+        try:
+            self.rebuild()
+        except Exception as error:
+            send_log(logger, f'Rebuilding the mentor search index failed: {error}', level='error')
+        finally:
+            connection.close()
+            with self._lock:
+                self._refresher = None
+
+    def _expand(self, prefix):
+        if not is_prefix(prefix):
+            return [prefix]
+
+        if self._vocabulary is None:
+            self._vocabulary = sorted(term for term, postings in self._postings.items() if postings)
+
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff', lo=start)
+
+        return self._vocabulary[start:end]
+
+    def _add(self, document):
+        user_id = document['user_id']
+
+        weights = Counter()
+        for name, weight in FIELD_WEIGHTS.items():
+            text = '\n'.join(document[name]) if name == 'skills' else document[name]
+            for term in tokenize(text):
+                weights[term] += weight
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._vocabulary = None
+            self._postings[term][user_id] = weight
+
+        skills = []
+        for name in document['skills']:
+            skill = slugify(name)
+            if skill and skill not in skills:
+                skills.append(skill)
+                self._skills[skill].add(user_id)
+                self._skill_names.setdefault(skill, name)
+
+        self._documents[user_id] = (list(weights), skills, document['created'].timestamp())
+
+    def _remove(self, user_id):
+        terms, skills, _ = self._documents.pop(user_id, ((), (), None))
+
+        for term in terms:
+            self._postings[term].pop(user_id, None)
+        for skill in skills:
+            self._skills[skill].discard(user_id)
+
+
+BACKENDS = {
+    'fts5': FTS5SearchBackend,
+    'python': InvertedIndexSearchBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def fts5_available() -> bool:
+    return connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names()
+
+
+def get_backend() -> BaseSearchBackend:
+    """
+    Returns the configured search backend, shared by the whole process.
+    MENTOR_SEARCH_BACKEND is 'fts5', 'python' or 'auto' (FTS5 when its table exists).
+    """
+
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = settings.MENTOR_SEARCH_BACKEND
+                if name == 'auto':
+                    name = 'fts5' if fts5_available() else 'python'
+                _backend = BACKENDS[name]()
+
+    return _backend
+
+
+def search_mentors(query: str, skills=(), limit: int = 24, offset: int = 0) -> SearchResult:
+    return get_backend().search(query, skills=skills, limit=limit, offset=offset)
+
+
+def update_index(user_ids):
+    get_backend().update(user_ids)
+
+
+def rebuild_index() -> int:
+    return get_backend().rebuild()
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from profiles.models import MentorProfile
+from profiles.signals import profile_image_changed, profiles_bulk_created
+
+from .models import MentorCard, MentorSkill, Skill
+from .search import update_index
+
+
+User = get_user_model()
+
+# Fields rendered on (or deciding the listing of) a mentor card
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name', 'role', 'email_verified'}
+CARD_PROFILE_FIELDS = {'image', 'renditions', 'verified'}
+# Profile fields indexed by the mentor search (see mentors.search)
+SEARCH_PROFILE_FIELDS = {'bio', 'experience'}
+
+
+def refresh_cards(user_ids, skill_ids=()):
+    """
+    Refreshes the mentor cards and search index entries of the given users, and the mentor
+    counts of their skills and of the given skills, once the current transaction commits.
+    """
+
+    user_ids = list(user_ids)
+    skill_ids = set(skill_ids)
+
+    def refresh():
+        MentorCard.objects.refresh(user_ids)
+        update_index(user_ids)
+        Skill.objects.recount(
+            skill_ids.union(MentorSkill.objects.filter(profile__user_id__in=user_ids).values_list('skill_id', flat=True))
+        )
+
+    transaction.on_commit(refresh)
+
+
+def touch_profiles(profile_ids):
+    """
+    Bumps the `updated` timestamp of mentor profiles whose pages changed without a profile save,
+    which changes their ETags and the keys of their cached fragments.
+    """
+
+    MentorProfile.objects.filter(pk__in=profile_ids).update(updated=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def refresh_card_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Refreshes the card of a mentor, or drops it if the user is no longer a mentor.
+    Saves that only touch fields the card does not show (such as `last_login`) are ignored.
+    """
+
+    if update_fields is not None and not CARD_USER_FIELDS.intersection(update_fields):
+        return
+
+    if instance.role == User.Roles.MENTOR or not created:
+        refresh_cards([instance.pk])
+
+
+@receiver(post_save, sender=MentorProfile)
+def refresh_card_on_profile_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not (CARD_PROFILE_FIELDS | SEARCH_PROFILE_FIELDS).intersection(update_fields):
+        return
+
+    refresh_cards([instance.user_id])
+
+
+@receiver(post_delete, sender=MentorProfile)
+def refresh_card_on_profile_delete(sender, instance, **kwargs):
+    refresh_cards([instance.user_id])
+
+
+@receiver(post_save, sender=MentorSkill)
+@receiver(post_delete, sender=MentorSkill)
+def refresh_card_on_skill_change(sender, instance, **kwargs):
+    touch_profiles([instance.profile_id])
+    refresh_cards(
+        MentorProfile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True),
+        skill_ids=[instance.skill_id],
+    )
+
+
+@receiver(post_save, sender=Skill)
+def refresh_cards_on_skill_rename(sender, instance, created, **kwargs):
+    if not created:
+        touch_profiles(instance.mentors.values_list('pk', flat=True))
+        refresh_cards(instance.mentors.values_list('user_id', flat=True))
+
+
+@receiver(profile_image_changed, sender=MentorProfile)
+def refresh_card_on_image_change(sender, profile_ids, **kwargs):
+    refresh_cards(
+        MentorProfile.objects.filter(pk__in=profile_ids).values_list('user_id', flat=True)
+    )
+
+
+@receiver(profiles_bulk_created, sender=MentorProfile)
+def refresh_cards_on_bulk_create(sender, profiles, **kwargs):
+    refresh_cards(profile.user_id for profile in profiles)
@@ -1,3 +1,526 @@
-from django.test import TestCase
+import sqlite3
+import threading
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from accounts.models import AppUser
+
+from . import search, views
+from .models import MentorCard, MentorSkill, Skill, SkillAlias, SKILL_COUNTS_CACHE_KEY
+from .search import FTS5SearchBackend, InvertedIndexSearchBackend, rebuild_index
+
+
+# Keeps the tests off the cache of the running site, the default tier is backed by memory instead
+LOCMEM_CACHES = {
+    **settings.CACHES,
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'mentors-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MentorsListQueryTests(TestCase):
+    """
+    Regression tests keeping the mentors directory free of per-mentor queries.
+    """
+
+    MAX_QUERIES = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(30):
+            user = AppUser.objects.create_user(
+                username=f'mentor{index}',
+                email=f'mentor{index}@example.com',
+                first_name='Mentor',
+                last_name=str(index),
+                role=AppUser.Roles.MENTOR,
+                email_verified=True,
+            )
+            MentorSkill.objects.add(user.mentor_profile, 'Self-Confidence')
+
+        MentorCard.objects.rebuild()
+
+    def setUp(self):
+        cache.delete(SKILL_COUNTS_CACHE_KEY)
+
+    def test_mentors_list_query_count_is_constant(self):
+        # The first page also loads the skill filters, once until they change
+        with self.assertNumQueries(self.MAX_QUERIES + 1):
+            response = self.client.get(reverse('mentors:mentors_list'))
+
+        with self.assertNumQueries(self.MAX_QUERIES):
+            response = self.client.get(reverse('mentors:mentors_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Mentor 29')
+        self.assertContains(response, 'Self-Confidence')
+
+    def test_next_page_query_count_is_constant(self):
+        first_page = self.client.get(reverse('mentors:mentors_list')).context['mentors']
+
+        with self.assertNumQueries(self.MAX_QUERIES):
+            response = self.client.get(reverse('mentors:mentors_list'), {'cursor': first_page.next_cursor})
+
+        self.assertEqual(response.status_code, 200)
+
+
+class MentorsListPaginationTests(TestCase):
+    """
+    Tests for the keyset pagination of the mentors directory.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(30):
+            AppUser.objects.create_user(
+                username=f'mentor{index}',
+                email=f'mentor{index}@example.com',
+                role=AppUser.Roles.MENTOR,
+                email_verified=True,
+            )
+
+        MentorCard.objects.rebuild()
+
+    def test_pages_cover_every_mentor_once(self):
+        seen = []
+        cursor = None
+
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            page = self.client.get(reverse('mentors:mentors_list'), params).context['mentors']
+            seen.extend(mentor.username for mentor in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(set(seen), {f'mentor{index}' for index in range(30)})
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('mentors:mentors_list'), {'cursor': 'garbage'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['mentors'].has_previous)
+
+    def test_htmx_request_renders_cards_and_out_of_band_pagination(self):
+        response = self.client.get(reverse('mentors:mentors_list'), headers={'HX-Request': 'true'})
+
+        self.assertTemplateUsed(response, 'mentors/partials/mentors_page.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'hx-swap-oob="true"')
+
+
+class MentorCardTests(TestCase):
+    """
+    Tests for keeping the denormalised mentor cards in sync.
+    """
+
+    def create_mentor(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AppUser.objects.create_user(
+                username='johndoe',
+                email='johndoe@example.com',
+                first_name='John',
+                last_name='Doe',
+                role=AppUser.Roles.MENTOR,
+                **kwargs,
+            )
+
+    def test_card_is_created_for_verified_mentor(self):
+        self.create_mentor(email_verified=True)
+
+        card = MentorCard.objects.get()
+        self.assertEqual(card.full_name, 'John Doe')
+        self.assertEqual(card.username, 'johndoe')
+
+    def test_unverified_mentor_has_no_card(self):
+        self.create_mentor()
+
+        self.assertFalse(MentorCard.objects.exists())
+
+    def test_card_follows_user_profile_and_skill_changes(self):
+        user = self.create_mentor(email_verified=True)
+        profile = user.mentor_profile
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = 'Jack'
+            user.save()
+            profile.verified = True
+            profile.save()
+            MentorSkill.objects.add(profile, 'Anxiety')
+
+        card = MentorCard.objects.get()
+        self.assertEqual(card.full_name, 'Jack Doe')
+        self.assertTrue(card.verified)
+        self.assertEqual(card.skills, ['Anxiety'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.role = AppUser.Roles.USER
+            user.save()
+
+        self.assertFalse(MentorCard.objects.exists())
+
+    def test_unrelated_user_save_does_not_refresh_card(self):
+        user = self.create_mentor(email_verified=True)
+        user.last_login = user.created
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save()
+
+        self.assertEqual(callbacks, [])
+
+
+class SkillTaxonomyTests(TestCase):
+    """
+    Tests for the canonical skills shared by mentor profiles.
+    """
+
+    def create_mentor(self, username):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AppUser.objects.create_user(
+                username=username,
+                email=f'{username}@example.com',
+                role=AppUser.Roles.MENTOR,
+                email_verified=True,
+            )
+
+    def test_spellings_and_aliases_resolve_to_one_skill(self):
+        skill = Skill.objects.canonical('Self-Confidence')
+        SkillAlias.objects.create(skill=skill, slug='confidence')
+
+        self.assertEqual(Skill.objects.canonical('  self confidence '), skill)
+        self.assertEqual(Skill.objects.canonical('Confidence'), skill)
+        self.assertEqual(Skill.objects.count(), 1)
+
+    def test_adding_a_skill_twice_keeps_one_row(self):
+        profile = self.create_mentor('alice').mentor_profile
+
+        MentorSkill.objects.add(profile, 'Anxiety')
+        MentorSkill.objects.add(profile, 'anxiety')
+
+        self.assertEqual(profile.skills.count(), 1)
+        self.assertEqual(list(profile.skill_set.values_list('slug', flat=True)), ['anxiety'])
+
+    def test_mentor_counts_follow_listing_changes(self):
+        alice = self.create_mentor('alice')
+        bob = self.create_mentor('bob')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MentorSkill.objects.add(alice.mentor_profile, 'Anxiety')
+            MentorSkill.objects.add(bob.mentor_profile, 'Anxiety')
+            MentorSkill.objects.add(bob.mentor_profile, 'Grief')
+
+        self.assertEqual(Skill.objects.mentor_counts(), {'Anxiety': 2, 'Grief': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bob.email_verified = False
+            bob.save()
+
+        self.assertEqual(Skill.objects.mentor_counts(), {'Anxiety': 1})
+
+
+class SearchBackendTestsMixin:
+    """
+    Tests shared by the mentor search backends.
+    """
+
+    backend_class = None
+
+    @classmethod
+    def setUpTestData(cls):
+        mentors = [
+            ('alice', 'Alice', 'I help with anxiety and stress at work.', ['Anxiety', 'Career']),
+            ('bob', 'Bob', 'Former teacher, patient listener.', ['Career']),
+            ('carol', 'Carol', 'Recovering from burnout myself.', ['Anxiety', 'Burnout']),
+        ]
+
+        for username, first_name, bio, skills in mentors:
+            user = AppUser.objects.create_user(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=first_name,
+                last_name='Smith',
+                role=AppUser.Roles.MENTOR,
+                email_verified=True,
+            )
+            profile = user.mentor_profile
+            profile.bio = bio
+            profile.save()
+            for skill in skills:
+                MentorSkill.objects.add(profile, skill)
+
+        MentorCard.objects.rebuild()
+
+    def setUp(self):
+        self.backend = self.backend_class()
+        self.backend.rebuild()
+
+    def usernames(self, result):
+        return [MentorCard.objects.get(pk=user_id).username for user_id in result.user_ids]
+
+    def test_matches_prefix_of_every_token(self):
+        result = self.backend.search('anxiety wor')
+
+        self.assertEqual(self.usernames(result), ['alice'])
+        self.assertEqual(result.total, 1)
+
+    def test_skill_matches_rank_above_bio_matches(self):
+        result = self.backend.search('burnout')
+
+        self.assertEqual(self.usernames(result), ['carol'])
+
+        result = self.backend.search('anxiety')
+        self.assertEqual(set(self.usernames(result)), {'alice', 'carol'})
+
+    def test_skill_filter_and_facet_counts(self):
+        result = self.backend.search('', skills=['career'])
+
+        self.assertEqual(set(self.usernames(result)), {'alice', 'bob'})
+        self.assertEqual(dict(result.facets), {'Career': 2, 'Anxiety': 1})
+
+    def test_no_match_returns_empty_result(self):
+        result = self.backend.search('astrophysics')
+
+        self.assertEqual(result.user_ids, [])
+        self.assertEqual(result.total, 0)
+
+    def test_offset_pages_through_ranked_results(self):
+        result = self.backend.search('', skills=['career'])
+        pages = [self.backend.search('', skills=['career'], limit=1, offset=offset) for offset in (0, 1, 2)]
+
+        self.assertEqual([user_id for page in pages for user_id in page.user_ids], result.user_ids)
+        self.assertEqual([page.total for page in pages], [2, 2, 2])
+
+    def test_update_reindexes_changed_and_unlisted_mentors(self):
+        bob = AppUser.objects.get(username='bob')
+        bob.mentor_profile.experience = 'Ten years of astrophysics research'
+        bob.mentor_profile.save()
+
+        self.backend.update([bob.pk])
+        self.assertEqual(self.usernames(self.backend.search('astrophys')), ['bob'])
+
+        MentorCard.objects.filter(pk=bob.pk).delete()
+        self.backend.update([bob.pk])
+        self.assertEqual(self.backend.search('astrophys').total, 0)
+
+
+FTS5_SUPPORTED = ('ENABLE_FTS5',) in sqlite3.connect(':memory:').execute('PRAGMA compile_options').fetchall()
+
+
+@skipUnless(connection.vendor == 'sqlite' and FTS5_SUPPORTED, 'SQLite is built without FTS5')
+class FTS5SearchBackendTests(SearchBackendTestsMixin, TestCase):
+    backend_class = FTS5SearchBackend
+
+    def test_ranks_every_match_when_counts_are_truncated(self):
+        best = self.backend.search('anxiety').user_ids
+        result = FTS5SearchBackend(max_candidates=1).search('anxiety')
+
+        self.assertEqual(result.user_ids, best)
+        self.assertEqual(result.total, 1)
+        self.assertTrue(result.truncated)
+
+
+class InvertedIndexSearchBackendTests(SearchBackendTestsMixin, TestCase):
+    backend_class = InvertedIndexSearchBackend
+
+    def test_stale_index_is_served_while_it_is_rebuilt(self):
+        bob = AppUser.objects.get(username='bob')
+        bob.mentor_profile.experience = 'Ten years of astrophysics research'
+        bob.mentor_profile.save()
+
+        fresh = list(search.documents())
+        release = threading.Event()
+
+        def slow_documents(user_ids=None, chunk_size=2000):
+            release.wait()
+            return iter(fresh)
+
+        self.backend._built_at -= self.backend.ttl + 1
+
+        with mock.patch.object(search, 'documents', slow_documents):
+            self.assertEqual(self.backend.search('astrophys').total, 0)
+
+            refresher = self.backend._refresher
+            release.set()
+            refresher.join()
+
+        self.assertEqual(self.usernames(self.backend.search('astrophys')), ['bob'])
+
+
+class MentorSearchViewTests(TestCase):
+    """
+    Tests for the search-as-you-type endpoint of the mentors directory.
+    """
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = AppUser.objects.create_user(
+                username='johndoe',
+                email='johndoe@example.com',
+                first_name='John',
+                last_name='Doe',
+                role=AppUser.Roles.MENTOR,
+                email_verified=True,
+            )
+        rebuild_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MentorSkill.objects.add(user.mentor_profile, 'Grief')
+
+    def test_htmx_search_renders_results_and_facets(self):
+        response = self.client.get(reverse('mentors:search'), {'q': 'gri'}, headers={'HX-Request': 'true'})
+
+        self.assertTemplateUsed(response, 'mentors/partials/search_results.html')
+        self.assertContains(response, 'John Doe')
+        self.assertContains(response, 'id="search-facets"')
+        self.assertContains(response, 'skill=grief')
+
+    def test_results_load_more_with_the_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = AppUser.objects.create_user(
+                username='janedoe', email='janedoe@example.com', role=AppUser.Roles.MENTOR, email_verified=True,
+            )
+            MentorSkill.objects.add(user.mentor_profile, 'Grief')
+
+        with mock.patch.object(views, 'MENTORS_PER_PAGE', 1):
+            first = self.client.get(reverse('mentors:search'), {'q': 'grief'}, headers={'HX-Request': 'true'})
+            self.assertContains(first, '?q=grief&cursor=1')
+
+            second = self.client.get(reverse('mentors:search'), {'q': 'grief', 'cursor': '1'}, headers={'HX-Request': 'true'})
+
+        usernames = [mentor.username for response in (first, second) for mentor in response.context['mentors']]
+        self.assertEqual(sorted(usernames), ['janedoe', 'johndoe'])
+        self.assertFalse(second.context['mentors'].has_next)
+        self.assertNotContains(second, 'id="search-facets"')
+
+    def test_empty_query_falls_back_to_directory(self):
+        response = self.client.get(reverse('mentors:search'))
+
+        self.assertTemplateUsed(response, 'mentors/mentors_list.html')
+        self.assertEqual(list(response.context['mentors'])[0].username, 'johndoe')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProfileFragmentCacheTests(TestCase):
+    """
+    Tests for the cached, conditional mentor profile pages.
+    """
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            username='johndoe',
+            email='johndoe@example.com',
+            first_name='John',
+            last_name='Doe',
+            role=AppUser.Roles.MENTOR,
+            email_verified=True,
+        )
+        self.url = reverse('mentors:profile_overview', args=['johndoe'])
+
+    def test_cached_overview_costs_one_query(self):
+        self.client.get(self.url, headers={'HX-Request': 'true'})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={'HX-Request': 'true'})
+
+        self.assertContains(response, 'John Doe')
+
+    def test_unchanged_overview_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_skill_change_invalidates_overview(self):
+        etag = self.client.get(self.url)['ETag']
+
+        MentorSkill.objects.add(self.user.mentor_profile, 'Grief')
+
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Grief')
+
+    def test_mentor_profile_page_renders_skills(self):
+        MentorSkill.objects.add(self.user.mentor_profile, 'Anxiety')
+
+        response = self.client.get(reverse('mentors:mentor_profile', args=['johndoe']))
+
+        self.assertContains(response, 'Anxiety')
+        self.assertEqual(response.context['title'], 'John Doe')
+
+    def test_unknown_mentor_returns_404(self):
+        response = self.client.get(reverse('mentors:profile_overview', args=['nobody']))
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    ASYNC_VIEWS=['mentors:mentors_list', 'mentors:profile_overview', 'mentors:mentor_profile'],
+)
+class AsyncReadViewTests(TestCase):
+    """
+    Tests for the async versions of the directory and mentor profile views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AppUser.objects.create_user(
+            username='johndoe',
+            email='johndoe@example.com',
+            first_name='John',
+            last_name='Doe',
+            role=AppUser.Roles.MENTOR,
+            email_verified=True,
+        )
+        MentorSkill.objects.add(cls.user.mentor_profile, 'Anxiety')
+        MentorCard.objects.rebuild()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_views_follow_the_setting_without_reloading_the_urlconf(self):
+        self.assertIs(resolve(reverse('mentors:profile_overview', args=['johndoe'])).func, views.aprofile_overview)
+
+        with self.settings(ASYNC_VIEWS=[]):
+            self.assertIs(resolve(reverse('mentors:profile_overview', args=['johndoe'])).func, views.profile_overview)
+
+    async def test_directory_lists_mentors_for_signed_in_user(self):
+        await self.async_client.aforce_login(self.user)
+
+        self.assertIs(resolve(reverse('mentors:mentors_list')).func, views.amentors_list)
+        response = await self.async_client.get(reverse('mentors:mentors_list'))
+
+        self.assertContains(response, 'John Doe')
+        self.assertContains(response, 'Anxiety')
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    async def test_overview_renders_then_is_not_modified(self):
+        url = reverse('mentors:profile_overview', args=['johndoe'])
+
+        response = await self.async_client.get(url, headers={'HX-Request': 'true'})
+        self.assertContains(response, 'Anxiety')
+
+        # Served from the fragment cache, the lazy profile is never loaded
+        response = await self.async_client.get(url, headers={'HX-Request': 'true'})
+        self.assertContains(response, 'John Doe')
+
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_mentor_profile_page(self):
+        response = await self.async_client.get(reverse('mentors:mentor_profile', args=['johndoe']))
+
+        self.assertContains(response, 'Anxiety')
+        self.assertEqual(response.context['title'], 'John Doe')
+
+        response = await self.async_client.get(reverse('mentors:mentor_profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
@@ -1,11 +1,42 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import URLPattern, path
+from django.urls.resolvers import RoutePattern
 
 from . import views
 
 app_name = 'mentors'
 
+
+class SelectedViewPattern(URLPattern):
+    """
+    A URL pattern resolving to the async version of its view while its URL name is listed in
+    ASYNC_VIEWS. The setting is read on every resolve, so changing it needs no URLconf reload.
+    """
+
+    def __init__(self, route: str, view, async_view, name: str):
+        super().__init__(RoutePattern(route, name=name, is_endpoint=True), view, name=name)
+        self.async_view = async_view
+
+    @property
+    def callback(self):
+        return self.async_view if f'{app_name}:{self.name}' in settings.ASYNC_VIEWS else self.view
+
+    @callback.setter
+    def callback(self, view):
+        self.view = view
+
+
+def select(route: str, view, async_view, name: str) -> SelectedViewPattern:
+    """
+    Returns a URL pattern like `path()`, serving the async version of the view if its URL name is listed in ASYNC_VIEWS.
+    """
+
+    return SelectedViewPattern(route, view, async_view, name)
+
+
 urlpatterns = [
-    path('', views.mentors_list, name='mentors_list'),
-    path('profile-overview/<str:username>/', views.profile_overview, name='profile_overview'),
-    path('profile/<str:username>/', views.mentor_profile, name='mentor_profile'),
-]
\ No newline at end of file
+    select('', views.mentors_list, views.amentors_list, name='mentors_list'),
+    path('search/', views.search, name='search'),
+    select('profile-overview/<str:username>/', views.profile_overview, views.aprofile_overview, name='profile_overview'),
+    select('profile/<str:username>/', views.mentor_profile, views.amentor_profile, name='mentor_profile'),
+]
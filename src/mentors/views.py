@@ -1,39 +1,325 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.http import Http404, QueryDict
+from django.shortcuts import render, redirect
 from django.contrib.auth import get_user_model
+from django.utils.cache import patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils.text import slugify
+from django.views.decorators.http import condition
 
-from accounts.models import AppUserProxy
+from accounts.models import username_matches
+from profiles.models import MentorProfile
+
+from .models import MentorCard, Skill, SKILL_COUNTS_CACHE_KEY
+from .search import search_mentors, MAX_FACETS
+
+from utils.cache import get_or_compute
+from utils.pagination import KeysetPage, KeysetPaginator
+from utils.replicas import read_from_replica
 
 
 User = get_user_model()
 
+MENTORS_PER_PAGE = 24
 
-def mentors_list(request):
-    mentors = AppUserProxy.objects.mentors().filter(email_verified=True)
 
+def _mentors_paginator():
+    return KeysetPaginator(MentorCard.objects.all(), MENTORS_PER_PAGE, ordering=('-created', '-user'))
+
+
+def _skill_counts():
+    return get_or_compute(SKILL_COUNTS_CACHE_KEY, lambda: Skill.objects.mentor_counts(MAX_FACETS))
+
+
+def _render_mentors_list(request, mentors, counts):
     context = {
         'mentors': mentors,
         'title': 'Find a Mentor'
     }
 
+    if counts is not None:
+        context['facets'] = _facets('', [], counts.items())
+
+    if request.htmx:
+        return render(request, 'mentors/partials/mentors_page.html', context)
+
+    return render(request, 'mentors/mentors_list.html', context)
+
+
+@read_from_replica
+def mentors_list(request):
+    mentors = _mentors_paginator().get_page(request.GET.get('cursor'))
+    counts = _skill_counts() if not mentors.has_previous else None
+
+    return _render_mentors_list(request, mentors, counts)
+
+
+@read_from_replica
+async def amentors_list(request):
+    """
+    Async version of `mentors_list`, served under ASGI when listed in ASYNC_VIEWS.
+    """
+
+    await _aload_user(request)
+
+    mentors = await _mentors_paginator().aget_page(request.GET.get('cursor'))
+    counts = await sync_to_async(_skill_counts)() if not mentors.has_previous else None
+
+    # Everything the templates use is loaded, rendering does not touch the database
+    return _render_mentors_list(request, mentors, counts)
+
+
+def _search_offset(cursor) -> int:
+    # Search results are ranked rather than ordered by a column, so their cursor is an offset
+    try:
+        return max(int(cursor or 0), 0)
+    except ValueError:
+        return 0
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    skills = [skill for skill in request.GET.getlist('skill') if skill.strip()]
+
+    if not query and not skills:
+        return mentors_list(request)
+
+    offset = _search_offset(request.GET.get('cursor'))
+    results = search_mentors(query, skills=skills, limit=MENTORS_PER_PAGE, offset=offset)
+    cards = MentorCard.objects.in_bulk(results.user_ids)
+
+    next_offset = offset + MENTORS_PER_PAGE
+    mentors = KeysetPage(
+        [cards[user_id] for user_id in results.user_ids if user_id in cards],
+        str(offset) if offset else None,
+        str(next_offset) if next_offset < results.total else None,
+    )
+
+    params = QueryDict(mutable=True)
+    params['q'] = query
+    params.setlist('skill', skills)
+
+    context = {
+        'mentors': mentors,
+        'total': results.total,
+        'truncated': results.truncated,
+        'facets': _facets(query, skills, results.facets),
+        'query': query,
+        'skills': skills,
+        'search_params': params.urlencode(),
+        'title': 'Find a Mentor',
+    }
+
+    if request.htmx:
+        return render(request, 'mentors/partials/search_results.html', context)
+
     return render(request, 'mentors/mentors_list.html', context)
 
 
+def _facets(query: str, skills: list, counts) -> list:
+    """
+    Builds the skill filters of the directory from (name, count) pairs, each with the query
+    string of the search with its skill added, or removed if already selected.
+    """
+
+    selected = [slugify(skill) for skill in skills]
+    facets = []
+
+    for name, count in counts:
+        slug = slugify(name)
+        remaining = [skill for skill in selected if skill != slug]
+
+        params = QueryDict(mutable=True)
+        if query:
+            params['q'] = query
+        params.setlist('skill', remaining if slug in selected else [*selected, slug])
+
+        facets.append({
+            'name': name,
+            'count': count,
+            'selected': slug in selected,
+            'query': params.urlencode(),
+        })
+
+    return facets
+
+
+async def _aload_user(request):
+    # Templates read request.user, which would otherwise be loaded lazily from the event loop
+    request.user = await request.auser()
+
+
+def _profile_versions(username: str):
+    return (
+        MentorProfile.objects.filter(username_matches(username, 'user__username'))
+        .values_list('id', 'updated', 'user__updated', 'user__first_name', 'user__last_name')
+    )
+
+
+def _set_profile_version(request, row):
+    request._profile_version = row and {
+        'id': row[0],
+        'modified': max(row[1], row[2]),
+        'full_name': f'{row[3]} {row[4]}',
+    }
+
+
+def _profile_version(request, username: str):
+    """
+    Returns the id, full name and last modification time of a mentor profile, or None.
+    Loaded with one query and memoised on the request, since the conditional response
+    and the fragment cache both need it.
+    """
+
+    if not hasattr(request, '_profile_version'):
+        _set_profile_version(request, _profile_versions(username).first())
+
+    return request._profile_version
+
+
+async def _aprofile_version(request, username: str):
+    """
+    Async version of `_profile_version`.
+    """
+
+    if not hasattr(request, '_profile_version'):
+        _set_profile_version(request, await _profile_versions(username).afirst())
+
+    return request._profile_version
+
+
+def profile_etag(request, username: str):
+    version = _profile_version(request, username)
+    if version is not None:
+        return f'{version["id"].hex}-{version["modified"].timestamp():.6f}'
+
+
+def profile_last_modified(request, username: str):
+    version = _profile_version(request, username)
+    if version is not None:
+        return version['modified']
+
+
+def _profiles():
+    return MentorProfile.objects.select_related('user').prefetch_related('skills__skill')
+
+
+def _lazy_profile(profile_id):
+    # Only loaded if the cached fragment has to be rendered again
+    return SimpleLazyObject(lambda: _profiles().get(pk=profile_id))
+
+
+async def _arender_profile(request, template: str, fragment: str, context: dict, profile_id):
+    """
+    Renders a profile template from an async view. When its cached fragment is there, which
+    is looked up with the async cache API, the template is rendered on the event loop and the
+    profile is never loaded. Otherwise it is rendered in a thread, where the lazy profile is
+    loaded and the fragment written to the cache.
+    """
+
+    context = {**context, 'profile': _lazy_profile(profile_id)}
+    key = make_template_fragment_key(fragment, [context['version']])
+
+    if await _fragment_cache().aget(key) is not None:
+        # Read again by the {% cache %} tag, from the local tier the lookup just filled
+        return render(request, template, context)
+
+    return await sync_to_async(render)(request, template, context)
+
+
+def _fragment_cache():
+    # The cache used by the {% cache %} tag
+    return caches['template_fragments'] if 'template_fragments' in settings.CACHES else caches['default']
+
+
+@read_from_replica
+@condition(etag_func=profile_etag, last_modified_func=profile_last_modified)
 def profile_overview(request, username: str):
-    profile = get_object_or_404(User, username=username).profile
+    version = _profile_version(request, username)
+    if version is None:
+        raise Http404
 
     context = {
-        'profile': profile,
+        'profile': _lazy_profile(version['id']),
+        'version': profile_etag(request, username),
+        'cache_timeout': settings.PROFILE_FRAGMENT_CACHE_TIMEOUT,
     }
 
-    return render(request, 'mentors/partials/profile_overview.html', context)
+    response = render(request, 'mentors/partials/profile_overview.html', context)
+    # Browsers revalidate the modal every time it is opened and get a 304 while it is unchanged
+    patch_cache_control(response, private=True, no_cache=True)
+
+    return response
+
+
+@condition(etag_func=profile_etag, last_modified_func=profile_last_modified)
+async def _aprofile_overview(request, username: str):
+    version = request._profile_version
+    if version is None:
+        raise Http404
+
+    await _aload_user(request)
+
+    context = {
+        'version': profile_etag(request, username),
+        'cache_timeout': settings.PROFILE_FRAGMENT_CACHE_TIMEOUT,
+    }
+
+    response = await _arender_profile(
+        request, 'mentors/partials/profile_overview.html', 'profile_overview', context, version['id'],
+    )
+    patch_cache_control(response, private=True, no_cache=True)
+
+    return response
+
 
+@read_from_replica
+async def aprofile_overview(request, username: str):
+    """
+    Async version of `profile_overview`, served under ASGI when listed in ASYNC_VIEWS.
+    """
 
+    # Loaded up front, so that the conditional response checks find it memoised
+    await _aprofile_version(request, username)
+
+    return await _aprofile_overview(request, username)
+
+
+@read_from_replica
 def mentor_profile(request, username: str):
-    profile = get_object_or_404(User, username=username).profile
+    version = _profile_version(request, username)
+    if version is None:
+        raise Http404
+
+    context = {
+        'profile': _lazy_profile(version['id']),
+        'version': profile_etag(request, username),
+        'cache_timeout': settings.PROFILE_FRAGMENT_CACHE_TIMEOUT,
+        'title': version['full_name'],
+    }
+
+    return render(request, 'mentors/mentor_profile.html', context)
+
+
+@read_from_replica
+async def amentor_profile(request, username: str):
+    """
+    Async version of `mentor_profile`, served under ASGI when listed in ASYNC_VIEWS.
+    """
+
+    version = await _aprofile_version(request, username)
+    if version is None:
+        raise Http404
+
+    await _aload_user(request)
 
     context = {
-        'profile': profile,
-        'title': profile.full_name
+        'version': profile_etag(request, username),
+        'cache_timeout': settings.PROFILE_FRAGMENT_CACHE_TIMEOUT,
+        'title': version['full_name'],
     }
 
-    return render(request, 'mentors/mentor_profile.html', context)
\ No newline at end of file
+    return await _arender_profile(request, 'mentors/mentor_profile.html', 'mentor_profile', context, version['id'])
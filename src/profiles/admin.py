@@ -19,4 +19,19 @@ class ManagerProfileAdmin(admin.ModelAdmin):
 class MentorProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'verified', 'image', 'user__created')
     list_filter = ('verified',)
-    search_fields = ('user__username', 'specialization')
+    search_fields = ('user__username', 'user__first_name', 'user__last_name', 'skills__skill__name')
+
+
+@admin.register(models.ImageProcessingJob)
+class ImageProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('source', 'content_type', 'status', 'attempts', 'created', 'updated')
+    list_filter = ('status', 'content_type')
+    search_fields = ('source',)
+    readonly_fields = ('created', 'updated')
+
+
+@admin.register(models.MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'references', 'created')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'references', 'created', 'updated')
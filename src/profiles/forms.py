@@ -1,6 +1,7 @@
 from django import forms
 
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from django.urls import reverse
 
 from crispy_forms.helper import FormHelper
@@ -8,6 +9,8 @@ from crispy_forms.layout import Layout, Submit, Field, HTML
 
 from accounts.forms import BaseAppUserCreationForm
 
+from utils.image_compression import inspect_image, ImageCompressionError
+
 from .models import MentorProfile, UserProfile
 
 
@@ -38,6 +41,19 @@ class BaseProfileForm(forms.ModelForm):
         )
         self.helper.layout = self.base_layout
 
+    def clean_image(self):
+        """
+        Rejects oversized uploads from their header, before they are stored and queued for processing.
+        """
+
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                inspect_image(image)
+            except ImageCompressionError as error:
+                raise forms.ValidationError(str(error))
+        return image
+
     def append_fields(self, fields_layout):
         """
         Helper method to append fields to the base layout.
@@ -0,0 +1,132 @@
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from utils.logging import send_log
+from utils.image_compression import compress
+from utils.renditions import generate_renditions, delete_renditions
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide thread pool used to compress uploaded images,
+    creating it on first use.
+    """
+
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='image-processing',
+            )
+        return _executor
+
+
+def submit(job_id):
+    """
+    Hands a job to the local worker pool. When IMAGE_PROCESSING_WORKERS is 0 the job
+    is left pending for the `process_images` management command.
+    Returns:
+        Future | None: The future of the submitted job, or None if no pool is configured.
+    """
+
+    if settings.IMAGE_PROCESSING_WORKERS < 1:
+        return None
+
+    return get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    # Worker threads open their own connections, which must not outlive them
+    try:
+        return process_job(job_id)
+    finally:
+        connection.close()
+
+
+def process_job(job_id):
+    """
+    Compresses the image of a pending job, generates its renditions and swaps both into the profile.
+
+    The job is claimed with a conditional UPDATE so that concurrent workers never
+    process it twice. If the profile was deleted or got a newer image in the meantime,
+    the job is cancelled and the compressed file is discarded.
+    Args:
+        job_id (UUID): The id of the ImageProcessingJob to process.
+    Returns:
+        ImageProcessingJob | None: The processed job, or None if it was not pending.
+    """
+
+    from profiles.models import ImageProcessingJob
+    from profiles.signals import profile_image_changed
+
+    Statuses = ImageProcessingJob.Statuses
+
+    claimed = ImageProcessingJob.objects.filter(pk=job_id, status=Statuses.PENDING).update(
+        status=Statuses.PROCESSING,
+        attempts=F('attempts') + 1,
+        updated=timezone.now(),
+    )
+    if not claimed:
+        return None
+
+    job = ImageProcessingJob.objects.select_related('content_type').get(pk=job_id)
+
+    try:
+        profile = job.profile
+
+        if profile is None or profile.image.name != job.source:
+            job.status = Statuses.CANCELLED
+        else:
+            storage = profile.image.storage
+
+            name = profile.image.field.generate_filename(profile, f'{PurePosixPath(job.source).stem}.jpg')
+
+            with storage.open(job.source) as source, compress(source) as compressed:
+                result = storage.save(name, compressed)
+
+            try:
+                with storage.open(job.source) as source:
+                    renditions = generate_renditions(source, storage, result)
+            except Exception:
+                storage.delete(result)
+                raise
+
+            swapped = type(profile).objects.filter(pk=profile.pk, image=job.source).update(
+                image=result,
+                renditions=renditions,
+                updated=timezone.now(),
+            )
+
+            if swapped:
+                profile_image_changed.send(sender=type(profile), profile_ids=[profile.pk])
+                storage.delete(job.source)
+                job.result = result
+                job.status = Statuses.DONE
+            else:
+                storage.delete(result)
+                delete_renditions(storage, renditions)
+                job.status = Statuses.CANCELLED
+    except Exception as error:
+        send_log(logger, f'Image processing failed for {job.source}: {error}', level='error')
+        job.status = Statuses.FAILED
+        job.error = str(error)
+
+    job.save(update_fields=['status', 'result', 'error', 'updated'])
+
+    return job
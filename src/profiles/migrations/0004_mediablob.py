@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:07
+
+import profiles.models
+import profiles.storage
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_profile_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='managerprofile',
+            name='image',
+            field=models.ImageField(blank=True, default='img/def.png', storage=profiles.storage.profile_media_storage, upload_to=profiles.models.upload_to),
+        ),
+        migrations.AlterField(
+            model_name='mentorprofile',
+            name='image',
+            field=models.ImageField(blank=True, default='img/def.png', storage=profiles.storage.profile_media_storage, upload_to=profiles.models.upload_to),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='image',
+            field=models.ImageField(blank=True, default='img/def.png', storage=profiles.storage.profile_media_storage, upload_to=profiles.models.upload_to),
+        ),
+    ]
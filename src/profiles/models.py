@@ -1,20 +1,21 @@
 import os
-import logging
 import shortuuid
 
 from uuid import uuid4
 
-from django.db import models
+from django.db import models, transaction
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 
 from accounts.models import AppUser
 
-from utils.logging import send_log
-from utils.image_compression import compress
+from utils.models import DirtyFieldsMixin
+from utils.renditions import delete_renditions
 
+from .storage import profile_media_storage
 
-DEFAULT_IMAGE_PATH = 'img/def.png'
 
-logger = logging.getLogger(__name__)
+DEFAULT_IMAGE_PATH = 'img/def.png'
 
 
 def upload_to(instance, filename):
@@ -25,25 +26,31 @@ def upload_to(instance, filename):
     return f'profiles/{instance.user.username}/{filename}'
 
 
-class BaseProfile(models.Model):
+class BaseProfile(DirtyFieldsMixin, models.Model):
     """
     BaseProfile is an abstract base class for user profile models.
     Attributes:
         user (OneToOneField): A one-to-one relationship with the AppUser model.
         image (ImageField): An image field for the user's profile picture.
         bio (TextField): A text field for the user's biography.
+        renditions (JSONField): Storage names of the downscaled copies of the image, keyed by format and size.
     Methods:
         __str__(): Returns the username of the associated user.
-        save(*args, **kwargs): Custom save method that handles image compression and logging.
+        save(*args, **kwargs): Custom save method that writes only changed fields, queues new images
+            for background compression and releases the replaced image.
         username: Returns the username of the associated user.
         full_name: Returns the full name of the associated user.
+        image_job: Returns the latest image processing job of the profile.
+        image_processing: Returns True while the latest uploaded image is still being processed.
     """
     
     user = models.OneToOneField(AppUser, on_delete=models.CASCADE, related_name='profile')
-    image = models.ImageField(upload_to=upload_to, default=DEFAULT_IMAGE_PATH, blank=True)
+    image = models.ImageField(upload_to=upload_to, storage=profile_media_storage, default=DEFAULT_IMAGE_PATH, blank=True)
 
     bio = models.TextField(null=True, blank=True)
 
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -56,26 +63,24 @@ class BaseProfile(models.Model):
         return self.user.username
     
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
-
-        if not is_new and self.image:
-            try:
-                old_instance = type(self).objects.get(id=self.id)
-                if old_instance.image == self.image:
-                    super().save(*args, **kwargs)
-                    return
-            except type(self).DoesNotExist:
-                send_log(logger, f'Instance with id {self.id} not found during update.', level='warning')
-
-        if self.image and self.image != DEFAULT_IMAGE_PATH:
-            try:
-                self.image = compress(self.image)
-            except Exception as error:
-                send_log(logger, f'Image compression failed for {self.user.username}: {error}.', level='error')
-                raise
+        image_changed = self._state.adding or self.is_dirty('image')
+
+        stale_image, stale_renditions = None, {}
+        if image_changed:
+            stale_image = (self.get_dirty_fields() or {}).get('image')
+            stale_renditions, self.renditions = self.renditions, {}
 
         super().save(*args, **kwargs)
 
+        storage = self.image.storage
+        if stale_image and stale_image != DEFAULT_IMAGE_PATH:
+            transaction.on_commit(lambda: storage.delete(stale_image))
+        if stale_renditions:
+            transaction.on_commit(lambda: delete_renditions(storage, stale_renditions))
+
+        if image_changed and self.image and self.image != DEFAULT_IMAGE_PATH:
+            ImageProcessingJob.objects.enqueue(self)
+
     @property
     def username(self):
         return self.user.username
@@ -84,6 +89,15 @@ class BaseProfile(models.Model):
     def full_name(self):
         return f'{self.user.first_name} {self.user.last_name}'
 
+    @property
+    def image_job(self):
+        return ImageProcessingJob.objects.for_profile(self).first()
+
+    @property
+    def image_processing(self):
+        job = self.image_job
+        return job is not None and job.status in ImageProcessingJob.ACTIVE_STATUSES
+
 
 class UserProfile(BaseProfile):
     """
@@ -124,3 +138,109 @@ class ManagerProfile(BaseProfile):
     """
 
     user = models.OneToOneField(AppUser, on_delete=models.CASCADE, related_name='manager_profile')
+
+
+PROFILE_MODELS = (UserProfile, MentorProfile, ManagerProfile)
+
+
+class ImageProcessingJobManager(models.Manager):
+    """
+    Custom manager for the ImageProcessingJob model.
+    Methods:
+        for_profile(profile): Returns a queryset of the jobs of the given profile, newest first.
+        pending(): Returns a queryset of the jobs waiting to be processed, oldest first.
+        enqueue(profile): Creates a pending job for the profile's current image and
+            hands it to the local worker pool once the transaction commits.
+    """
+
+    def for_profile(self, profile):
+        return self.filter(
+            content_type=ContentType.objects.get_for_model(profile),
+            object_id=profile.pk,
+        ).order_by('-created')
+
+    def pending(self):
+        return self.filter(status=ImageProcessingJob.Statuses.PENDING).order_by('created')
+
+    def enqueue(self, profile):
+        from profiles.image_processing import submit
+
+        job = self.create(profile=profile, source=profile.image.name)
+        transaction.on_commit(lambda: submit(job.pk))
+
+        return job
+
+
+class ImageProcessingJob(models.Model):
+    """
+    A background compression job for an uploaded profile image.
+
+    The profile keeps serving the original upload until the job finishes,
+    then its image is swapped for the compressed one.
+    Attributes:
+        profile (GenericForeignKey): The UserProfile, MentorProfile or ManagerProfile the image belongs to.
+        source (str): Storage name of the uploaded image.
+        result (str): Storage name of the compressed image, once the job is done.
+        status (str): The state of the job, chosen from predefined statuses.
+        attempts (int): How many times the job has been picked up by a worker.
+        error (str): The last error raised while processing the job.
+    """
+
+    class Statuses(models.TextChoices):
+        PENDING = ('pending', 'Pending')
+        PROCESSING = ('processing', 'Processing')
+        DONE = ('done', 'Done')
+        FAILED = ('failed', 'Failed')
+        CANCELLED = ('cancelled', 'Cancelled')
+
+    ACTIVE_STATUSES = (Statuses.PENDING, Statuses.PROCESSING)
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.UUIDField()
+    profile = GenericForeignKey('content_type', 'object_id')
+
+    source = models.CharField(max_length=255)
+    result = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(max_length=15, choices=Statuses, default=Statuses.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
+
+    objects = ImageProcessingJobManager()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(fields=['status', 'created'], name='imagejob_status_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='imagejob_profile_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
+
+
+class MediaBlob(models.Model):
+    """
+    A content-addressed file in the profile media blob store.
+    Attributes:
+        name (str): Storage name of the blob, derived from the SHA-256 of its content.
+        size (int): Size of the blob in bytes.
+        references (int): How many saved files share the blob. It is deleted when this drops to zero.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    id = models.UUIDField(default=uuid4, unique=True, editable=False, primary_key=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,251 @@
+import csv
+import json
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import django
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from accounts.models import AppUser, EmailOutbox
+
+from .models import UserProfile, MentorProfile, ManagerProfile
+from .signals import profiles_bulk_created
+
+
+Roles = AppUser.Roles
+
+PROFILE_FACTORIES = {
+    Roles.USER: lambda user: UserProfile(user=user, display_name=user.username),
+    Roles.MENTOR: lambda user: MentorProfile(user=user),
+    Roles.MANAGER: lambda user: ManagerProfile(user=user),
+}
+
+
+@dataclass
+class ProvisioningReport:
+    """
+    Outcome of a bulk provisioning run.
+    Attributes:
+        created (int): Number of users created.
+        skipped (list): (line, reason) pairs for records that were not imported.
+        hashing_time (float): Seconds spent waiting for password hashes.
+        insert_time (float): Seconds spent inserting users and profiles.
+        elapsed (float): Total wall time in seconds.
+    """
+
+    created: int = 0
+    skipped: list = field(default_factory=list)
+    hashing_time: float = 0.0
+    insert_time: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+def read_records(stream, format: str = 'csv'):
+    """
+    Lazily reads user records from a CSV (with a header row) or JSON Lines stream.
+    Yields:
+        tuple: The line number and the record as a dict, or a ValidationError for
+            a line that is not valid JSON, which the provisioner reports as skipped.
+    """
+
+    if format == 'csv':
+        for line, record in enumerate(csv.DictReader(stream), start=2):
+            yield line, record
+    elif format == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except json.JSONDecodeError as error:
+                yield line, ValidationError(f'invalid JSON: {error.msg}')
+    else:
+        raise ValueError(f'Unsupported format: {format}')
+
+
+def _init_worker():
+    # Processes started with `spawn` do not inherit the configured app registry
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password):
+    return make_password(password or None)
+
+
+def _build_user(record: dict, default_role: str):
+    username = AppUser.normalize_username(record.get('username'))
+    email = AppUser.objects.normalize_email(record.get('email'))
+    role = (record.get('role') or default_role).strip().lower()
+
+    if not username:
+        raise ValidationError('username is required')
+    AppUser.username_validator(username)
+    validate_email(email)
+    if role not in PROFILE_FACTORIES:
+        raise ValidationError(f'unsupported role {role!r}')
+
+    user = AppUser(
+        username=username,
+        email=email,
+        first_name=(record.get('first_name') or '').strip(),
+        last_name=(record.get('last_name') or '').strip(),
+        role=role,
+        email_verified=str(record.get('email_verified', '')).strip().lower() in ('1', 'true', 'yes'),
+    )
+    user.is_active = user.email_verified
+    user.apply_role_flags()
+
+    return user
+
+
+class BulkProvisioner:
+    """
+    Imports users and their profiles in batches, bypassing per-row saves and signals.
+    `profiles_bulk_created` is sent once per profile type and batch instead.
+
+    Each batch is validated, checked against existing usernames and emails with two
+    queries, and inserted with one `bulk_create` for users and one per profile type
+    inside a single transaction, which also queues a verification email for every
+    unverified user. Passwords are hashed in a process pool, and the next batch is
+    hashed while the current one is being inserted.
+    Args:
+        batch_size (int, optional): Number of records per transaction.
+        workers (int | None, optional): Size of the hashing process pool. 0 hashes in this process.
+        default_role (str, optional): Role of records without one.
+    Example:
+        report = BulkProvisioner(batch_size=2000).provision(read_records(stream, 'jsonl'))
+    """
+
+    def __init__(self, batch_size: int = 1000, workers: int | None = None, default_role: str = Roles.USER):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.default_role = default_role
+
+    def provision(self, records, on_batch=None) -> ProvisioningReport:
+        """
+        Provisions every record from an iterable of (line, record) pairs.
+        Args:
+            records (Iterable): The records, as yielded by `read_records`.
+            on_batch (callable, optional): Called with the report after every batch.
+        Returns:
+            ProvisioningReport: Counts and timings of the run.
+        """
+
+        report = ProvisioningReport()
+        started = time.perf_counter()
+
+        executor = None
+        if self.workers != 0:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+        try:
+            records = iter(records)
+            pending = self._start_batch(records, executor, report)
+
+            while pending is not None:
+                users, lines, hashes = pending
+                # Start hashing the next batch before inserting this one
+                pending = self._start_batch(records, executor, report)
+
+                hashing_started = time.perf_counter()
+                for user, password in zip(users, hashes):
+                    user.password = password
+                report.hashing_time += time.perf_counter() - hashing_started
+
+                self._insert(users, lines, report)
+
+                report.elapsed = time.perf_counter() - started
+                if on_batch is not None:
+                    on_batch(report)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        report.elapsed = time.perf_counter() - started
+
+        return report
+
+    def _start_batch(self, records, executor, report):
+        batch = list(islice(records, self.batch_size))
+        if not batch:
+            return None
+
+        users, lines, passwords = [], [], []
+        for line, record in batch:
+            try:
+                if isinstance(record, ValidationError):
+                    raise record
+                users.append(_build_user(record, self.default_role))
+                lines.append(line)
+                passwords.append(record.get('password'))
+            except (ValidationError, AttributeError) as error:
+                report.skipped.append((line, '; '.join(getattr(error, 'messages', [str(error)]))))
+
+        if executor is None:
+            hashes = map(_hash_password, passwords)
+        else:
+            hashes = executor.map(_hash_password, passwords, chunksize=max(len(passwords) // 32, 1))
+
+        return users, lines, hashes
+
+    def _insert(self, users, lines, report):
+        inserted_started = time.perf_counter()
+
+        usernames = {user.username for user in users}
+        emails = {user.email for user in users}
+
+        # Compared through the case-insensitive unique indexes, the records are already normalised
+        taken_usernames = set(
+            AppUser.objects.annotate(username_lower=Lower('username'))
+            .filter(username_lower__in=usernames).values_list('username_lower', flat=True)
+        )
+        taken_emails = set(
+            AppUser.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails).values_list('email_lower', flat=True)
+        )
+
+        accepted = []
+        for user, line in zip(users, lines):
+            if user.username in taken_usernames or user.email in taken_emails:
+                report.skipped.append((line, 'username or email already in use'))
+                continue
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+            accepted.append(user)
+
+        with transaction.atomic():
+            AppUser.objects.bulk_create(accepted, batch_size=self.batch_size)
+
+            profiles = {}
+            for user in accepted:
+                profile = PROFILE_FACTORIES[user.role](user)
+                profiles.setdefault(type(profile), []).append(profile)
+
+            for model, objects in profiles.items():
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+                profiles_bulk_created.send(sender=model, profiles=objects)
+
+            # Unverified accounts are purged once their link expires, so they are sent one like a registration
+            invitations = [
+                EmailOutbox(user=user, kind=EmailOutbox.Kinds.VERIFY_EMAIL, to=user.email)
+                for user in accepted if not user.email_verified
+            ]
+            if invitations:
+                EmailOutbox.objects.bulk_create(invitations, batch_size=self.batch_size)
+
+        report.created += len(accepted)
+        report.insert_time += time.perf_counter() - inserted_started
@@ -3,13 +3,15 @@ import shutil
 import logging
 
 from django.db.models.signals import post_delete, post_save
-from django.dispatch import receiver
+from django.dispatch import receiver, Signal
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
+from django.conf import settings
 
-from .models import UserProfile, MentorProfile, ManagerProfile
+from .models import UserProfile, MentorProfile, ManagerProfile, DEFAULT_IMAGE_PATH
 
 from utils.logging import send_log
+from utils.renditions import delete_renditions
 
 
 User = get_user_model()
@@ -17,6 +19,12 @@ Roles = User.Roles
 
 logger = logging.getLogger(__name__)
 
+# Sent with `profile_ids` when profile images or renditions are changed with a queryset update
+profile_image_changed = Signal()
+
+# Sent with `profiles` when profiles are created with bulk_create, which bypasses post_save
+profiles_bulk_created = Signal()
+
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
@@ -56,12 +64,18 @@ def create_profile(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=ManagerProfile)
 def delete_profile_media(sender, instance, **kwargs):
     """
-    Deletes the media files associated with a user's profile after profile deletion.
+    Releases the media files associated with a user's profile after profile deletion.
+    Shared blobs are only removed once no other profile references them.
     """
 
     try:
-        path = f'media/profiles/{instance.user.username}'
+        storage = instance.image.storage
+        if instance.image and instance.image.name != DEFAULT_IMAGE_PATH:
+            storage.delete(instance.image.name)
+        delete_renditions(storage, instance.renditions)
+
+        path = os.path.join(settings.MEDIA_ROOT, 'profiles', instance.user.username)
         if os.path.exists(path):
             shutil.rmtree(path)
     except Exception as error:
-        send_log(logger, f'Error occured while deleting profile media for: {error}', level='error')
\ No newline at end of file
+        send_log(logger, f'Error occured while deleting profile media for: {error}', level='error')
@@ -0,0 +1,120 @@
+import os
+import hashlib
+import tempfile
+
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+BLOB_PREFIX = 'blobs'
+
+
+def profile_media_storage():
+    """
+    Returns the storage of profile images, configured under the 'profile_media' alias in STORAGES.
+    """
+
+    return storages['profile_media']
+
+
+def blob_name(digest: str, extension: str = '') -> str:
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_blob(name) -> bool:
+    return str(name).startswith(f'{BLOB_PREFIX}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 of their content.
+
+    Content is hashed while it is streamed to a temporary file, so identical uploads
+    share one blob under `blobs/<aa>/<bb>/<sha256><ext>`. Every `save` adds a reference
+    to the blob and every `delete` removes one; the file is only removed once
+    no references are left. Reference counts live in the MediaBlob table.
+
+    Files outside the blob store (such as the default profile image or media uploaded
+    before this storage was introduced) are opened and deleted as usual.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save
+        return name
+
+    def _save(self, name, content):
+        extension = PurePosixPath(name).suffix.lower()
+
+        temp_dir = os.path.join(self.location, BLOB_PREFIX, 'tmp')
+        os.makedirs(temp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+
+            name = blob_name(digest.hexdigest(), extension)
+            self._add_reference(name, size, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return name
+
+    def _add_reference(self, name, size, temp_path):
+        MediaBlob = apps.get_model('profiles', 'MediaBlob')
+
+        for attempt in range(2):
+            try:
+                # Every critical section starts with a write, so the row lock (or the
+                # SQLite write lock) serialises it against concurrent deletes of the blob
+                with transaction.atomic():
+                    if not MediaBlob.objects.filter(name=name).update(references=F('references') + 1):
+                        MediaBlob.objects.create(name=name, size=size, references=1)
+
+                    path = self.path(name)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(temp_path, path)
+                        if self.file_permissions_mode is not None:
+                            os.chmod(path, self.file_permissions_mode)
+                return
+            except IntegrityError:
+                # Another process created the blob row first, add the reference to it instead
+                if attempt:
+                    raise
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+
+        if not is_blob(name):
+            return super().delete(name)
+
+        MediaBlob = apps.get_model('profiles', 'MediaBlob')
+
+        with transaction.atomic():
+            MediaBlob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+            unreferenced, _ = MediaBlob.objects.filter(name=name, references=0).delete()
+            if unreferenced:
+                super().delete(name)
+
+    def references(self, name) -> int:
+        """
+        Returns the number of references to a blob, or 0 for files outside the blob store.
+        """
+
+        MediaBlob = apps.get_model('profiles', 'MediaBlob')
+        return MediaBlob.objects.filter(name=name).values_list('references', flat=True).first() or 0
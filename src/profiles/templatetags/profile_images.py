@@ -0,0 +1,54 @@
+from django import template
+
+from utils.renditions import RENDITION_FORMATS
+
+
+register = template.Library()
+
+
+def build_srcset(storage, renditions: dict) -> str:
+    """
+    Builds a `srcset` attribute value from renditions keyed by size.
+    Example:
+        'media/profiles/johndoe/renditions/abc_64.webp 64w, media/profiles/johndoe/renditions/abc_128.webp 128w'
+    """
+
+    return ', '.join(
+        f'{storage.url(name)} {size}w'
+        for size, name in sorted(renditions.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.inclusion_tag('profiles/partials/avatar.html')
+def avatar(profile, size: int, css_class: str = '', alt: str = 'Profile Picture'):
+    """
+    Renders a profile image as a responsive <picture> with a srcset for every rendition format,
+    falling back to the full-size image when the profile has no renditions yet.
+    Usage:
+        {% load profile_images %}
+        {% avatar profile 75 css_class='rounded-circle' %}
+    """
+
+    storage = profile.image.storage
+    renditions = profile.renditions or {}
+
+    sources = [
+        {'type': config['mime_type'], 'srcset': build_srcset(storage, renditions[extension])}
+        for extension, config in RENDITION_FORMATS.items()
+        if renditions.get(extension)
+    ]
+
+    src = profile.image.url
+    fallback = renditions.get('jpeg', {})
+    if fallback:
+        sizes = sorted(int(key) for key in fallback)
+        best = next((key for key in sizes if key >= size * 2), sizes[-1])
+        src = storage.url(fallback[str(best)])
+
+    return {
+        'src': src,
+        'sources': sources,
+        'size': size,
+        'css_class': css_class,
+        'alt': alt,
+    }
@@ -1,3 +1,411 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import AppUser, EmailOutbox
+
+from utils.image_compression import compress, ImageCompressionError, ImageTooLarge
+
+from .models import ImageProcessingJob, MediaBlob, UserProfile
+from .storage import profile_media_storage
+from .provisioning import BulkProvisioner, read_records
+from .image_processing import process_job
+
+
+def make_upload(name='avatar.png', size=(64, 64), color=(200, 80, 80, 255)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class TemporaryMediaTestCase(TestCase):
+    """
+    TestCase that stores media in a fresh temporary MEDIA_ROOT for every test.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class ImageProcessingTests(TemporaryMediaTestCase):
+    """
+    Tests for the background compression of uploaded profile images.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = AppUser.objects.create_user(username='johndoe', email='johndoe@example.com')
+        self.profile = self.user.user_profile
+        self.uploads = 0
+
+    def upload(self):
+        self.uploads += 1
+        self.profile.image = make_upload(color=(200, 80, self.uploads, 255))
+        self.profile.save()
+        return self.profile.image.name
+
+    def test_upload_keeps_original_and_queues_job(self):
+        original = self.upload()
+
+        job = self.profile.image_job
+        self.assertEqual(job.status, ImageProcessingJob.Statuses.PENDING)
+        self.assertEqual(job.source, original)
+        self.assertTrue(original.endswith('.png'))
+        self.assertTrue(self.profile.image_processing)
+
+    def test_bio_only_edit_does_not_queue_job(self):
+        self.profile.bio = 'Hello'
+        self.profile.save()
+
+        self.assertIsNone(self.profile.image_job)
+
+    def test_process_job_swaps_in_compressed_image(self):
+        original = self.upload()
+
+        job = process_job(self.profile.image_job.pk)
+        self.profile.refresh_from_db()
+
+        self.assertEqual(job.status, ImageProcessingJob.Statuses.DONE)
+        self.assertEqual(self.profile.image.name, job.result)
+        self.assertTrue(job.result.endswith('.jpg'))
+        self.assertFalse(self.profile.image.storage.exists(original))
+        self.assertFalse(self.profile.image_processing)
+
+    def test_superseded_job_is_cancelled(self):
+        self.upload()
+        stale_job = self.profile.image_job
+        self.upload()
+
+        job = process_job(stale_job.pk)
+
+        self.assertEqual(job.status, ImageProcessingJob.Statuses.CANCELLED)
+        self.assertIsNone(process_job(stale_job.pk))
+
+    def test_invalid_image_marks_job_failed(self):
+        self.upload()
+        job = self.profile.image_job
+        with self.profile.image.storage.open(job.source, 'wb') as file:
+            file.write(b'not an image')
+
+        job = process_job(job.pk)
+
+        self.assertEqual(job.status, ImageProcessingJob.Statuses.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    def test_process_images_command_drains_queue(self):
+        self.upload()
+
+        call_command('process_images', workers=1, stdout=StringIO())
+
+        self.assertEqual(self.profile.image_job.status, ImageProcessingJob.Statuses.DONE)
+
+    def test_process_job_generates_renditions(self):
+        self.profile.image = make_upload(size=(300, 200))
+        self.profile.save()
+
+        process_job(self.profile.image_job.pk)
+        self.profile.refresh_from_db()
+
+        self.assertEqual(set(self.profile.renditions), {'webp', 'jpeg'})
+        self.assertEqual(set(self.profile.renditions['jpeg']), {'64', '128', '256'})
+        for name in self.profile.renditions['webp'].values():
+            self.assertTrue(self.profile.image.storage.exists(name))
+
+    def test_new_upload_clears_stale_renditions(self):
+        self.upload()
+        process_job(self.profile.image_job.pk)
+        self.profile.refresh_from_db()
+
+        self.upload()
+
+        self.assertEqual(self.profile.renditions, {})
+
+
+class AvatarTagTests(TestCase):
+    """
+    Tests for the responsive avatar template tag.
+    """
+
+    template = Template("{% load profile_images %}{% avatar profile 64 css_class='rounded-circle' %}")
+
+    def setUp(self):
+        self.profile = AppUser.objects.create_user(username='janedoe', email='janedoe@example.com').user_profile
+
+    def test_avatar_without_renditions_uses_full_image(self):
+        html = self.template.render(Context({'profile': self.profile}))
+
+        self.assertIn(f'src="{self.profile.image.url}"', html)
+        self.assertNotIn('<source', html)
+
+    def test_avatar_emits_srcset_per_format(self):
+        self.profile.renditions = {
+            'webp': {'128': 'profiles/janedoe/renditions/a_128.webp', '64': 'profiles/janedoe/renditions/a_64.webp'},
+            'jpeg': {'64': 'profiles/janedoe/renditions/a_64.jpeg', '128': 'profiles/janedoe/renditions/a_128.jpeg'},
+        }
+
+        html = self.template.render(Context({'profile': self.profile}))
+
+        self.assertIn('type="image/webp" srcset="/media/profiles/janedoe/renditions/a_64.webp 64w, /media/profiles/janedoe/renditions/a_128.webp 128w"', html)
+        self.assertIn('src="/media/profiles/janedoe/renditions/a_128.jpeg"', html)
+
+
+RECORDED_METRICS = []
+
+
+def record_metrics(metrics):
+    RECORDED_METRICS.append(metrics)
+
+
+@override_settings(
+    IMAGE_MAX_DIMENSION=100,
+    IMAGE_MAX_PIXELS=1_000_000,
+    IMAGE_COMPRESSION_METRICS_HOOK='profiles.tests.record_metrics',
+)
+class ImageCompressionTests(TestCase):
+    """
+    Tests for the memory-bounded image compression engine.
+    """
+
+    def make_image(self, size, exif=None):
+        buffer = BytesIO()
+        Image.new('RGB', size, (10, 120, 200)).save(buffer, format='JPEG', exif=exif or b'')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_oversized_image_is_downsampled(self):
+        with compress(self.make_image((400, 200))) as compressed, Image.open(compressed) as result:
+            self.assertEqual(result.size, (100, 50))
+            self.assertEqual(result.format, 'JPEG')
+
+    def test_exif_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+
+        with compress(self.make_image((50, 50), exif=exif.tobytes())) as compressed, Image.open(compressed) as result:
+            self.assertNotIn('exif', result.info)
+
+    def test_too_many_pixels_is_rejected_before_decoding(self):
+        with self.assertRaises(ImageTooLarge):
+            compress(self.make_image((1200, 1000)))
+
+    def test_invalid_image_raises(self):
+        with self.assertRaises(ImageCompressionError):
+            compress(SimpleUploadedFile('photo.jpg', b'not an image'))
+
+    def test_metrics_are_reported(self):
+        RECORDED_METRICS.clear()
+
+        compress(self.make_image((400, 200))).close()
+
+        metrics = RECORDED_METRICS[-1]
+        self.assertEqual(metrics.source_dimensions, (400, 200))
+        self.assertEqual(metrics.output_dimensions, (100, 50))
+        self.assertGreater(metrics.output_size, 0)
+        self.assertGreater(metrics.decoded_bytes, 0)
+
+
+class DirtyFieldsTests(TestCase):
+    """
+    Tests for saving only the changed fields of profiles and users.
+    """
+
+    def setUp(self):
+        AppUser.objects.create_user(username='johndoe', email='johndoe@example.com')
+        self.user = AppUser.objects.get(username='johndoe')
+        self.profile = UserProfile.objects.get(user=self.user)
+
+    def test_bio_only_edit_updates_changed_columns_without_select(self):
+        self.profile.bio = 'Hello'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.save()
+
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+        self.assertIn('"bio"', queries[0]['sql'])
+        self.assertNotIn('"image"', queries[0]['sql'])
+        self.assertFalse(self.profile.get_dirty_fields())
+
+    def test_unchanged_profile_save_still_sends_signals(self):
+        updated = self.profile.updated
+        saved = []
+
+        def receiver(sender, instance, update_fields, **kwargs):
+            saved.append(update_fields)
+
+        post_save.connect(receiver, sender=UserProfile)
+        self.addCleanup(post_save.disconnect, receiver, sender=UserProfile)
+
+        self.profile.save()
+
+        self.assertEqual(saved, [None])
+        self.assertGreater(self.profile.updated, updated)
+
+    def test_image_change_is_detected(self):
+        self.profile.image = 'profiles/johndoe/other.jpg'
+
+        self.assertTrue(self.profile.is_dirty('image'))
+        self.assertFalse(self.profile.is_dirty('bio'))
+
+    def test_user_save_updates_changed_columns(self):
+        self.user.first_name = 'John'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"first_name"', queries[0]['sql'])
+        self.assertNotIn('"password"', queries[0]['sql'])
+
+    def test_user_role_change_normalises_staff_flags(self):
+        self.user.role = AppUser.Roles.ADMIN
+        self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.is_superuser)
+        self.assertFalse(self.user.get_dirty_fields())
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class ContentAddressedStorageTests(TemporaryMediaTestCase):
+    """
+    Tests for the deduplicating, reference-counted profile media storage.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.profiles = [
+            AppUser.objects.create_user(username=username, email=f'{username}@example.com').user_profile
+            for username in ('johndoe', 'janedoe')
+        ]
+        self.storage = profile_media_storage()
+
+    def upload(self, profile, **kwargs):
+        profile.image = make_upload(**kwargs)
+        profile.save()
+        return profile.image.name
+
+    def test_identical_uploads_share_one_blob(self):
+        names = [self.upload(profile) for profile in self.profiles]
+
+        self.assertEqual(names[0], names[1])
+        self.assertTrue(names[0].startswith('blobs/'))
+        self.assertEqual(self.storage.references(names[0]), 2)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+
+    def test_blob_is_removed_with_its_last_reference(self):
+        name = [self.upload(profile) for profile in self.profiles][0]
+
+        self.profiles[0].user.delete()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.references(name), 1)
+
+        self.profiles[1].user.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_replaced_image_is_released(self):
+        name = self.upload(self.profiles[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(self.profiles[0], color=(0, 0, 0, 255))
+
+        self.assertFalse(self.storage.exists(name))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkProvisioningTests(TestCase):
+    """
+    Tests for bulk user and profile provisioning.
+    """
+
+    CSV = (
+        'username,email,password,role,first_name,last_name,email_verified\n'
+        'Alice,alice@example.com,secret,user,Alice,Smith,true\n'
+        'bob,bob@example.com,secret,mentor,Bob,Jones,true\n'
+        'carol,carol@example.com,,manager,,,false\n'
+        'dave,not-an-email,secret,user,,,true\n'
+        'erin,erin@example.com,secret,astronaut,,,true\n'
+        'alice,alice2@example.com,secret,user,,,true\n'
+    )
+
+    def provision(self, text, **kwargs):
+        return BulkProvisioner(workers=0, **kwargs).provision(read_records(StringIO(text), 'csv'))
+
+    def test_creates_users_and_profiles(self):
+        report = self.provision(self.CSV)
+
+        self.assertEqual(report.created, 3)
+        self.assertEqual(len(report.skipped), 3)
+
+        alice = AppUser.objects.get(username='alice')
+        self.assertTrue(alice.check_password('secret'))
+        self.assertTrue(alice.is_active)
+        self.assertEqual(alice.user_profile.display_name, 'alice')
+
+        self.assertTrue(AppUser.objects.get(username='bob').mentor_profile)
+
+        carol = AppUser.objects.get(username='carol')
+        self.assertTrue(carol.is_staff)
+        self.assertFalse(carol.has_usable_password())
+        self.assertTrue(carol.manager_profile)
+
+    def test_existing_users_are_skipped(self):
+        AppUser.objects.create_user(username='bob', email='bob@example.com')
+
+        report = self.provision(self.CSV)
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual(AppUser.objects.filter(username='bob').count(), 1)
+        self.assertIn((3, 'username or email already in use'), report.skipped)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        rows = ''.join(f'user{index},user{index}@example.com,secret,user,,,true\n' for index in range(50))
+
+        # 2 uniqueness checks, savepoint, users insert, profiles insert, release savepoint
+        with self.assertNumQueries(6):
+            report = self.provision('username,email,password,role,first_name,last_name,email_verified\n' + rows, batch_size=50)
+
+        self.assertEqual(report.created, 50)
+
+    @override_settings(EMAIL_VERIFICATION_MAX_AGE=60 * 60)
+    def test_unverified_users_are_sent_a_link_before_they_are_purged(self):
+        self.provision(self.CSV)
+
+        carol = AppUser.objects.get(username='carol')
+        self.assertQuerySetEqual(EmailOutbox.objects.values_list('user', 'to'), [(carol.pk, 'carol@example.com')])
+
+        # The outbox is worked through after the link would have expired had it been sent at import
+        AppUser.objects.filter(pk=carol.pk).update(verification_sent=timezone.now() - timedelta(days=1))
+        call_command('send_emails', stdout=StringIO())
+        call_command('purge_unverified', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(AppUser.objects.filter(pk=carol.pk).exists())
+
+    def test_reads_jsonl(self):
+        stream = StringIO('{"username": "frank", "email": "frank@example.com"}\n\n{"username": "grace",\n')
+
+        report = BulkProvisioner(workers=0).provision(read_records(stream, 'jsonl'))
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual([line for line, _ in report.skipped], [3])
@@ -3,6 +3,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import Http404
 
+from utils.throttle import throttle
+
 from .forms import MentorCreationForm, MentorProfileForm, UserCreationForm, UserProfileForm
 
 
@@ -17,6 +19,7 @@ def register_choice(request):
     return render(request, 'profiles/register_choice.html', context)
 
 
+@throttle('register')
 def register(request, role: str = 'user'):
     if request.user.is_authenticated:
         return redirect('/')
@@ -86,6 +89,8 @@ def edit_profile(request, role: str = 'user'):
         if form.is_valid():
             form.save()
             messages.success(request, 'Profile was updated')
+            if 'image' in form.changed_data:
+                messages.info(request, 'Your new photo will appear once it has been processed')
             return redirect('profiles:edit_profile')
     else:
         form = config['form'](instance=profile, form_url_name='profiles:edit_profile')
@@ -0,0 +1,100 @@
+import math
+import os
+import statistics
+import tempfile
+
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+
+BENCHMARK_SETTINGS = {
+    # Hashing costs the same everywhere and would hide the difference being measured
+    'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+    'THROTTLE_ENABLED': False,
+    'ALLOWED_HOSTS': ['*'],
+    'DATABASE_REPLICA': None,
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+    'CACHES': {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-shared'},
+    },
+}
+
+
+def percentile(timings: list, fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted timings, 0 if there are none.
+    """
+
+    if not timings:
+        return 0.0
+    return timings[min(len(timings) - 1, max(math.ceil(fraction * len(timings)) - 1, 0))]
+
+
+def summarize(timings: list, elapsed: float, errors: list) -> dict:
+    """
+    Summarises the timings of a benchmark run.
+    Args:
+        timings (list): Seconds taken by every successful operation.
+        elapsed (float): Wall time of the run in seconds.
+        errors (list): Messages of the failed operations.
+    Returns:
+        dict: The number of operations, their throughput, latency percentiles in milliseconds and errors.
+    """
+
+    timings = sorted(timings)
+
+    return {
+        'ops': len(timings),
+        'ops_per_second': len(timings) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(timings) * 1000 if timings else 0.0,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else '',
+    }
+
+
+@contextmanager
+def scratch_database():
+    """
+    Runs the enclosed block against a new, migrated copy of the default database, with
+    BENCHMARK_SETTINGS applied, and destroys the copy afterwards.
+    SQLite copies are files rather than in memory, so that locking behaves as in production.
+    """
+
+    creation = connection.creation
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(**BENCHMARK_SETTINGS):
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+
+        old_name = creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            yield
+        finally:
+            connections.close_all()
+            creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_mentors(count: int) -> list:
+    """
+    Creates `count` verified mentors listed in the directory.
+    Returns:
+        list: Their usernames.
+    """
+
+    from profiles.provisioning import BulkProvisioner
+
+    usernames = [f'mentor{index}' for index in range(count)]
+    records = (
+        (index, {'username': username, 'email': f'{username}@example.com', 'role': 'mentor',
+                 'first_name': 'Mentor', 'last_name': str(index), 'email_verified': 'true'})
+        for index, username in enumerate(usernames)
+    )
+    BulkProvisioner(workers=0).provision(records)
+
+    return usernames
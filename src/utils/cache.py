@@ -0,0 +1,301 @@
+import time
+import pickle
+import threading
+
+from collections import OrderedDict, defaultdict
+from urllib.parse import urlsplit, unquote
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.functional import cached_property
+
+
+def cache_config(url: str, default_location) -> dict:
+    """
+    Builds a CACHES entry from a cache URL.
+    Args:
+        url (str): One of redis://host:port/db (or rediss://), file:///path, db://table_name,
+            locmem:// or dummy://. An empty URL selects a file based cache at `default_location`.
+        default_location (str | Path): Directory of the default file based cache.
+    Returns:
+        dict: The cache configuration.
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    Example:
+        CACHES = {'shared': cache_config(config('CACHE_URL', default=''), BASE_DIR / 'cache')}
+    """
+
+    if not url:
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(default_location)}
+
+    parts = urlsplit(url)
+
+    if parts.scheme in ('redis', 'rediss'):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if parts.scheme == 'file':
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': unquote(parts.path)}
+    if parts.scheme == 'db':
+        # Stored in the default database, create the table with `manage.py createcachetable`
+        return {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': parts.netloc or 'cache_entries'}
+    if parts.scheme == 'locmem':
+        return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': parts.netloc}
+    if parts.scheme == 'dummy':
+        return {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+
+    raise ValueError(f'Unsupported cache URL scheme: {parts.scheme}')
+
+
+class CacheStats:
+    """
+    Thread safe, per-process hit and miss counters, grouped by key namespace.
+    Args:
+        namespaces (dict): Namespace names mapped to the key prefix they cover.
+            Keys matching no prefix are counted under 'other'.
+    """
+
+    COUNTERS = ('local_hits', 'hits', 'misses', 'stale', 'computed')
+
+    def __init__(self, namespaces: dict | None = None):
+        self.namespaces = namespaces or {}
+        self._counts = defaultdict(lambda: dict.fromkeys(self.COUNTERS, 0))
+        self._lock = threading.Lock()
+
+    def namespace(self, key: str) -> str:
+        for name, prefix in self.namespaces.items():
+            if key.startswith(prefix):
+                return name
+        return 'other'
+
+    def record(self, key: str, counter: str):
+        namespace = self.namespace(key)
+        with self._lock:
+            self._counts[namespace][counter] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns the counters of every namespace along with its hit ratio.
+        """
+
+        with self._lock:
+            counts = {namespace: dict(counters) for namespace, counters in self._counts.items()}
+
+        for counters in counts.values():
+            lookups = counters['local_hits'] + counters['hits'] + counters['misses']
+            counters['hit_ratio'] = (counters['local_hits'] + counters['hits']) / lookups if lookups else 0.0
+
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+# Local tiers and counters by LOCATION, like the stores of LocMemCache
+_local_tiers = {}
+_stats = {}
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend with a small per-process LRU tier in front of a shared cache.
+
+    Reads are served from the local tier while its copy is younger than LOCAL_TIMEOUT
+    seconds, then from the shared tier, which is any other configured cache (file based,
+    database or Redis). Writes and deletes go to both tiers, so a process sees its own
+    changes immediately and other processes within LOCAL_TIMEOUT seconds. Keys that must
+    never be stale, such as sessions, which a logout in one process has to end in all of
+    them, are listed in SHARED_ONLY and always read from the shared tier.
+
+    The LOCATION names the local tier, which is shared by every thread of the process.
+    Options:
+        SHARED (str): Alias of the shared cache in CACHES.
+        LOCAL_MAX_ENTRIES (int): Size of the local tier, 0 disables it.
+        LOCAL_TIMEOUT (float): Seconds a local copy is served without asking the shared tier.
+        NAMESPACES (dict): Key prefixes the hit and miss counters are grouped by.
+        SHARED_ONLY (tuple): Key prefixes never kept in the local tier.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.shared_only = tuple(options.get('SHARED_ONLY', ()))
+
+        # Cache instances are per thread, the local tier and the counters are shared by the process
+        self._local, self._local_lock = _local_tiers.setdefault(location, (OrderedDict(), threading.Lock()))
+        self.stats = _stats.setdefault(location, CacheStats(options.get('NAMESPACES')))
+
+    @cached_property
+    def shared(self) -> BaseCache:
+        return caches[self._shared_alias]
+
+    def _local_get(self, key):
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+
+        return pickle.loads(entry[0])
+
+    def _local_set(self, key, value, timeout):
+        if not self.local_max_entries:
+            return
+
+        expires = time.monotonic() + (self.local_timeout if timeout is None else min(timeout, self.local_timeout))
+
+        with self._local_lock:
+            self._local[key] = (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._local_lock:
+            self._local.pop(key, None)
+
+    def _is_local(self, key) -> bool:
+        return not key.startswith(self.shared_only)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+
+        if self._is_local(key):
+            value = self._local_get(local_key)
+            if value is not None:
+                self.stats.record(key, 'local_hits')
+                return value
+
+        value = self.shared.get(key, version=version)
+        if value is None:
+            self.stats.record(key, 'misses')
+            return default
+
+        self.stats.record(key, 'hits')
+        if self._is_local(key):
+            self._local_set(local_key, value, None)
+
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout=timeout, version=version)
+        if self._is_local(key):
+            self._local_set(self.make_and_validate_key(key, version=version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Goes straight to the shared tier, which decides for every process
+        added = self.shared.add(key, value, timeout=self._timeout(timeout), version=version)
+        if added:
+            self._local_delete(self.make_and_validate_key(key, version=version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._is_local(key) and self._local_get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta=delta, version=version)
+
+    def clear(self):
+        with self._local_lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+def get_or_compute(key: str, compute, timeout: int = 300, stale: int = 60, lock_timeout: int = 30,
+                   wait: float = 5.0, cache=None):
+    """
+    Returns a cached value, computing it at most once at a time across processes.
+
+    Values are stored with the time they go stale. A stale value is still returned for
+    up to `stale` seconds while the one caller that wins the lock recomputes it
+    (stale-while-revalidate). On a miss, callers that lose the lock wait up to `wait`
+    seconds for the winner's value before computing it themselves.
+    Args:
+        key (str): The cache key.
+        compute (callable): Returns the value, called without arguments.
+        timeout (int, optional): Seconds the value is fresh.
+        stale (int, optional): Seconds a stale value may still be served while it is recomputed.
+        lock_timeout (int, optional): Seconds after which a held lock is considered abandoned.
+        wait (float, optional): Seconds to wait for another caller's value on a miss.
+        cache (BaseCache, optional): The cache to use, defaults to the default cache.
+    Returns:
+        The cached or computed value.
+    Example:
+        counts = get_or_compute('mentors:skill_counts', Skill.objects.mentor_counts, timeout=600)
+    """
+
+    cache = cache or caches['default']
+    stats = getattr(cache, 'stats', None)
+    lock_key = f'{key}:lock'
+
+    def store():
+        value = compute()
+        cache.set(key, (value, time.time() + timeout), timeout=timeout + stale)
+        if stats is not None:
+            stats.record(key, 'computed')
+        return value
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            return value
+
+        if stats is not None:
+            stats.record(key, 'stale')
+
+        if not cache.add(lock_key, 1, timeout=lock_timeout):
+            return value
+
+        try:
+            return store()
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + wait
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+
+    while not locked and time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        locked = cache.add(lock_key, 1, timeout=lock_timeout)
+
+    try:
+        return store()
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def cache_stats(alias: str = 'default') -> dict:
+    """
+    Returns the hit and miss counters of this process for a tiered cache, or an empty dict.
+    """
+
+    stats = getattr(caches[alias], 'stats', None)
+    return stats.snapshot() if stats is not None else {}
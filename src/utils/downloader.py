@@ -1,32 +1,218 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 import requests
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.logging import send_log
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Seconds to connect and to wait between bytes
+TIMEOUT = (5, 30)
+
+
+def sri_hash(path: Path) -> str:
+    """
+    Returns the Subresource Integrity hash of a file, such as 'sha384-...'.
+    """
+
+    digest = hashlib.sha384()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return f'sha384-{base64.b64encode(digest.digest()).decode()}'
+
+
+def make_session(workers: int = 4, retries: int = 3) -> requests.Session:
+    """
+    Returns a session keeping up to `workers` connections per host open, retrying
+    connection errors and 429/5xx responses with exponential backoff.
+    """
+
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+@dataclass
+class DownloadResult:
+    """
+    Outcome of fetching a vendor file.
+    Attributes:
+        name (str): Name of the file in the vendor directory.
+        status (str): One of 'downloaded', 'updated', 'unchanged' or 'failed'.
+        size (int): Bytes received.
+        elapsed (float): Wall time in seconds.
+        lock (dict, optional): The new lockfile entry, None if the download failed.
+        error (str): Why the download failed.
+    """
+
+    name: str
+    status: str
+    size: int = 0
+    elapsed: float = 0.0
+    lock: dict | None = None
+    error: str = ''
 
-def download_vendor_static(url: str, out_path: Path, parent_mkdir: bool = False):
+
+class VendorDownloader:
     """
-    Downloads a file from the specified URL and saves it to the given output path.
+    Downloads vendor static files concurrently over one pooled session, keeping a lockfile.
+
+    The lockfile records the URL, Subresource Integrity hash, ETag and Last-Modified of
+    every file. Files whose hash still matches their lock entry are requested conditionally
+    and a 304 leaves them untouched. Downloads are streamed to a temporary file next to
+    the target while being hashed, and only replace the target when the content changed.
     Args:
-        url (str): The URL of the file to download.
-        out_path (Path): The path where the downloaded file will be saved.
-        parent_mkdir (bool, optional): If True, create parent directories if they do not exist.
-    Returns:
-        bool: True if the file was downloaded and saved successfully, False otherwise.
+        directory (Path): Directory the files are written to.
+        lockfile (Path): Path of the JSON lockfile.
+        workers (int, optional): Files downloaded at once.
+        frozen (bool, optional): Fail instead of updating files whose hash differs from the lockfile.
+        force (bool, optional): Download every file again, without conditional requests.
+        session (requests.Session, optional): Defaults to `make_session(workers)`.
+    Example:
+        results = VendorDownloader(settings.STATICFILES_VENDOR_DIR, settings.STATICFILES_VENDOR_LOCKFILE).pull(VENDOR_FILES)
     """
 
-    if not isinstance(out_path, Path):
-        raise ValueError('out_path must be a valid Path object')
-    
-    if parent_mkdir:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, directory: Path, lockfile: Path, workers: int = 4, frozen: bool = False,
+                 force: bool = False, session: requests.Session | None = None):
+        self.directory = Path(directory)
+        self.lockfile = Path(lockfile)
+        self.workers = max(workers, 1)
+        self.frozen = frozen
+        self.force = force
+        self.session = session or make_session(self.workers)
+
+    def read_lock(self) -> dict:
+        try:
+            with open(self.lockfile, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def write_lock(self, lock: dict):
+        temporary = self.lockfile.with_name(self.lockfile.name + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(dict(sorted(lock.items())), file, indent=2)
+            file.write('\n')
+        os.replace(temporary, self.lockfile)
+
+    def pull(self, files: dict) -> list:
+        """
+        Downloads the files and updates the lockfile with the ones that succeeded.
+        Args:
+            files (dict): URLs by file name.
+        Returns:
+            list: A DownloadResult per file, in the order of `files`.
+        """
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = self.read_lock()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vendor-pull') as executor:
+            results = list(executor.map(lambda item: self.fetch(*item, lock.get(item[0])), files.items()))
+
+        for result in results:
+            if result.lock is not None:
+                lock[result.name] = result.lock
+
+        self.write_lock(lock)
+
+        return results
+
+    def check(self, files: dict) -> list:
+        """
+        Verifies the files on disk against the lockfile without downloading anything.
+        Returns:
+            list: The names of the files that are missing, not locked or do not match their hash.
+        """
+
+        lock = self.read_lock()
+        mismatched = []
+
+        for name, url in files.items():
+            path = self.directory / name
+            entry = lock.get(name)
+            if entry is None or entry.get('url') != url or not path.exists() or sri_hash(path) != entry['integrity']:
+                mismatched.append(name)
+
+        return mismatched
+
+    def fetch(self, name: str, url: str, entry: dict | None) -> DownloadResult:
+        """
+        Downloads one file, conditionally when its lock entry still describes the file on disk.
+        """
+
+        started = time.perf_counter()
+        path = self.directory / name
+        temporary = path.with_name(path.name + '.part')
+
+        current = sri_hash(path) if path.exists() else None
+        headers = {}
+        if entry and not self.force and entry.get('url') == url and entry.get('integrity') == current:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 304:
+                    return DownloadResult(name, 'unchanged', elapsed=time.perf_counter() - started, lock=entry)
+
+                response.raise_for_status()
+
+                digest = hashlib.sha384()
+                size = 0
+                with open(temporary, 'wb') as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        file.write(chunk)
+                        size += len(chunk)
+
+                integrity = f'sha384-{base64.b64encode(digest.digest()).decode()}'
+                lock = {
+                    'url': url,
+                    'integrity': integrity,
+                    'etag': response.headers.get('ETag', ''),
+                    'last_modified': response.headers.get('Last-Modified', ''),
+                }
+        except (requests.RequestException, OSError) as error:
+            temporary.unlink(missing_ok=True)
+            send_log(logger, f'Failed to download {url}: {error}', level='error')
+            return DownloadResult(name, 'failed', elapsed=time.perf_counter() - started, error=str(error))
+
+        elapsed = time.perf_counter() - started
+
+        if integrity == current:
+            temporary.unlink()
+            return DownloadResult(name, 'unchanged', size, elapsed, lock=lock)
 
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
+        if self.frozen and entry and entry.get('url') == url and integrity != entry.get('integrity'):
+            temporary.unlink()
+            error = f'{name} does not match the lockfile ({integrity} instead of {entry["integrity"]})'
+            send_log(logger, error, level='error')
+            return DownloadResult(name, 'failed', size, elapsed, error=error)
 
-        out_path.write_bytes(response.content)
+        os.replace(temporary, path)
 
-        return True
-    except requests.RequestException as error:
-        print('Error downloading file') # < change to logging
-        return False
\ No newline at end of file
+        return DownloadResult(name, 'updated' if current else 'downloaded', size, elapsed, lock=lock)
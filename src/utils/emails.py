@@ -0,0 +1,86 @@
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+
+
+class EmailTemplate:
+    """
+    A transactional email rendered from a plain text and an HTML template.
+
+    Both templates are loaded and compiled the first time the email is rendered, and reused
+    for the lifetime of the process, so that rendering a message costs only the render itself.
+    Attributes:
+        name (str): Name of the templates, loaded from emails/<name>.txt and emails/<name>.html.
+        subject (str): The subject line of the email.
+    Methods:
+        render(context): Returns the plain text and HTML bodies for the context.
+        message(to, context, connection=None): Returns an unsent message with both parts.
+    """
+
+    def __init__(self, name: str, subject: str):
+        self.name = name
+        self.subject = subject
+        self._templates = None
+        self._lock = threading.Lock()
+
+    @property
+    def templates(self):
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = (
+                        get_template(f'emails/{self.name}.txt'),
+                        get_template(f'emails/{self.name}.html'),
+                    )
+        return self._templates
+
+    def render(self, context: dict) -> tuple[str, str]:
+        text, html = self.templates
+        return text.render(context), html.render(context)
+
+    def message(self, to: str, context: dict, connection=None) -> EmailMultiAlternatives:
+        text, html = self.render(context)
+
+        message = EmailMultiAlternatives(self.subject, text, settings.EMAIL_HOST_USER, [to], connection=connection)
+        message.attach_alternative(html, 'text/html')
+
+        return message
+
+
+def send_many(messages, connection=None, chunk_size: int = 100) -> int:
+    """
+    Sends messages over one mail server connection, `chunk_size` messages per call
+    to the backend, instead of opening a connection per message like `send_mail`.
+    Args:
+        messages (Iterable[EmailMessage]): The messages to send, may be a generator.
+        connection (BaseEmailBackend, optional): The connection to use, defaults to a new one.
+        chunk_size (int, optional): Number of messages handed to `send_messages` at once.
+    Returns:
+        int: The number of messages sent.
+    Example:
+        sent = send_many(VERIFY_EMAIL.message(user.email, {'user': user}) for user in users)
+    """
+
+    connection = connection or get_connection()
+    sent = 0
+    chunk = []
+
+    # An open connection is kept open by send_messages, so every chunk shares one session
+    opened = connection.open()
+
+    try:
+        for message in messages:
+            chunk.append(message)
+            if len(chunk) >= chunk_size:
+                sent += connection.send_messages(chunk) or 0
+                chunk = []
+
+        if chunk:
+            sent += connection.send_messages(chunk) or 0
+    finally:
+        if opened:
+            connection.close()
+
+    return sent
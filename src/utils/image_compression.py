@@ -1,20 +1,211 @@
-import os
-from io import BytesIO
+import logging
+import time
 
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
 from django.core.files import File
-from PIL import Image
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from utils.logging import send_log
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+MAX_DIMENSION = 2048
+SPOOL_MAX_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCompressionError(ValueError):
+    pass
+
+
+class ImageTooLarge(ImageCompressionError):
+    pass
+
+
+@dataclass
+class CompressionMetrics:
+    """
+    Measurements of a single `compress` call, passed to the IMAGE_COMPRESSION_METRICS_HOOK.
+    Attributes:
+        name (str): Name of the compressed file.
+        source_size (int): Size of the source file in bytes.
+        source_dimensions (tuple): Width and height of the source image.
+        output_dimensions (tuple): Width and height of the compressed image.
+        output_size (int): Size of the compressed file in bytes.
+        decoded_bytes (int): Size of the largest decoded pixel buffer, the dominant memory cost.
+        peak_rss (int | None): High-water mark of the process resident set size in KiB.
+        duration (float): Wall time in seconds.
+    """
+
+    name: str
+    source_size: int
+    source_dimensions: tuple
+    output_dimensions: tuple
+    output_size: int
+    decoded_bytes: int
+    peak_rss: int | None
+    duration: float
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def check_image(image: Image.Image, size: int | None = None):
+    """
+    Validates an opened, not yet decoded image against the configured limits.
+
+    `Image.open` only reads the header, so this rejects oversized files and
+    decompression bombs before any pixel data is decoded.
+    Args:
+        image (Image): The opened image.
+        size (int, optional): Size of the source file in bytes.
+    Raises:
+        ImageTooLarge: If the file or its pixel count exceeds the limits.
+    """
+
+    max_upload_size = _setting('IMAGE_MAX_UPLOAD_SIZE', MAX_UPLOAD_SIZE)
+    max_pixels = _setting('IMAGE_MAX_PIXELS', MAX_PIXELS)
+
+    if size is not None and size > max_upload_size:
+        raise ImageTooLarge(f'Image file is {size} bytes, the limit is {max_upload_size} bytes')
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(f'Image is {width}x{height} pixels, the limit is {max_pixels} pixels')
 
 
-def compress(file):
+def inspect_image(file):
+    """
+    Reads the header of an image file and validates it against the configured limits.
+    Args:
+        file (File): The image file.
+    Returns:
+        tuple: The width, height and format of the image.
+    Raises:
+        ImageCompressionError: If the file is not an image or exceeds the limits.
+    """
+
     try:
         with Image.open(file) as image:
-            if image.mode in ('P', 'RGBA'):
+            check_image(image, getattr(file, 'size', None))
+            return (*image.size, image.format)
+    except ImageCompressionError:
+        raise
+    except Image.DecompressionBombError as error:
+        raise ImageTooLarge(str(error)) from error
+    except (OSError, SyntaxError, ValueError) as error:
+        raise ImageCompressionError(f'{getattr(file, "name", file)} is not a valid image') from error
+    finally:
+        if hasattr(file, 'seek'):
+            file.seek(0)
+
+
+def compress(file, quality: int = 50):
+    """
+    Compresses an image into a JPEG with bounded memory usage.
+
+    The header is validated before decoding, JPEG sources are decoded at a reduced scale
+    with `Image.draft`, images larger than IMAGE_MAX_DIMENSION are downsampled, EXIF data is
+    stripped (after applying its orientation), and the result is written to a
+    SpooledTemporaryFile that moves to disk once it outgrows IMAGE_COMPRESSION_SPOOL_SIZE.
+    Args:
+        file (File): The source image.
+        quality (int, optional): JPEG quality of the compressed image.
+    Returns:
+        File: The compressed image. The caller is responsible for closing it.
+    Raises:
+        ImageCompressionError: If the file is not an image or exceeds the limits.
+    """
+
+    started = time.perf_counter()
+
+    max_dimension = _setting('IMAGE_MAX_DIMENSION', MAX_DIMENSION)
+    source_size = getattr(file, 'size', None)
+
+    output = SpooledTemporaryFile(max_size=_setting('IMAGE_COMPRESSION_SPOOL_SIZE', SPOOL_MAX_SIZE))
+
+    try:
+        with Image.open(file) as source:
+            check_image(source, source_size)
+            source_dimensions = source.size
+
+            source.draft('RGB', (max_dimension, max_dimension))
+            source.load()
+            decoded_bytes = source.width * source.height * len(source.getbands())
+
+            ImageOps.exif_transpose(source, in_place=True)
+
+            # Palette images can only be resized with nearest-neighbour sampling
+            image = source.convert('RGB') if source.mode in ('P', '1') else source
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            if image.mode not in ('RGB', 'L'):
                 image = image.convert('RGB')
+            image.save(output, format='JPEG', quality=quality, optimize=True)
+    except ImageCompressionError:
+        output.close()
+        raise
+    except Image.DecompressionBombError as error:
+        output.close()
+        raise ImageTooLarge(str(error)) from error
+    except (OSError, SyntaxError, ValueError) as error:
+        output.close()
+        raise ImageCompressionError(f'{getattr(file, "name", file)} is not a valid image') from error
+
+    output_size = output.tell()
+    output.seek(0)
+
+    report_metrics(CompressionMetrics(
+        name=getattr(file, 'name', ''),
+        source_size=source_size,
+        source_dimensions=source_dimensions,
+        output_dimensions=image.size,
+        output_size=output_size,
+        decoded_bytes=decoded_bytes,
+        peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        duration=time.perf_counter() - started,
+    ))
+
+    return File(output, name=getattr(file, 'name', None))
+
+
+def report_metrics(metrics: CompressionMetrics):
+    """
+    Passes compression metrics to the hook configured in IMAGE_COMPRESSION_METRICS_HOOK.
+    Errors raised by the hook are logged and never fail the compression.
+    """
+
+    hook = _setting('IMAGE_COMPRESSION_METRICS_HOOK', None)
+    if not hook:
+        return
+
+    try:
+        import_string(hook)(metrics)
+    except Exception as error:
+        send_log(logger, f'Image compression metrics hook failed: {error}', level='warning')
 
-            image_io = BytesIO()
 
-            image.save(image_io, format='JPEG', quality=50, optimize=True)
+def log_metrics(metrics: CompressionMetrics):
+    """
+    Default metrics hook, logs the metrics at debug level.
+    """
 
-            return File(image_io, name=file.name)
-    except Exception:
-        pass
\ No newline at end of file
+    send_log(
+        logger,
+        f'Compressed {metrics.name}: {metrics.source_dimensions} -> {metrics.output_dimensions}, '
+        f'{metrics.source_size} -> {metrics.output_size} bytes, {metrics.decoded_bytes} bytes decoded, '
+        f'peak RSS {metrics.peak_rss} KiB, {metrics.duration * 1000:.1f} ms',
+        level='debug',
+    )
@@ -0,0 +1,93 @@
+from copy import deepcopy
+
+from django.db import models
+
+
+class DirtyFieldsMixin:
+    """
+    Model mixin that tracks which fields changed since the instance was loaded or last saved.
+
+    Field values are snapshotted when the instance is loaded from the database (`from_db`),
+    refreshed or saved, so changes can be detected without re-reading the row. `save` on an
+    existing instance then writes only the changed columns (plus `auto_now` fields). When
+    nothing changed it saves the whole row as usual, so that an explicit `save()` still bumps
+    `auto_now` fields and sends `pre_save` and `post_save`. An explicit `update_fields` is respected.
+    The mixin must come before the model base class.
+    Methods:
+        get_dirty_fields(): Returns a dict of changed field attnames mapped to their previous values.
+        is_dirty(field_name): Returns True if the given field changed.
+    Example:
+        class Profile(DirtyFieldsMixin, models.Model):
+            ...
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _field_value(self, field):
+        value = field.value_from_object(self)
+        if isinstance(field, models.FileField):
+            return value.name if value else ''
+        return value
+
+    def _snapshot(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            if field.attname in self.__dict__:
+                loaded[field.attname] = deepcopy(self._field_value(field))
+
+    def get_dirty_fields(self):
+        """
+        Returns:
+            dict | None: Changed field attnames mapped to their loaded values,
+                or None if the instance has no snapshot to compare against.
+        """
+
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None:
+            return None
+
+        return {
+            field.attname: loaded[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in loaded and self._field_value(field) != loaded[field.attname]
+        }
+
+    def is_dirty(self, field_name: str):
+        dirty_fields = self.get_dirty_fields()
+        if dirty_fields is None:
+            return True
+
+        field = self._meta.get_field(field_name)
+        return field.attname in dirty_fields
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not args
+        ):
+            dirty_fields = self.get_dirty_fields()
+            if dirty_fields is not None:
+                update_fields = set(dirty_fields) - {self._meta.pk.attname}
+                if update_fields:
+                    update_fields.update(
+                        field.attname for field in self._meta.concrete_fields
+                        if getattr(field, 'auto_now', False)
+                    )
+                    kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
+        self._snapshot()
@@ -0,0 +1,156 @@
+import json
+import binascii
+
+from django.db.models import Q
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    A single page of results returned by KeysetPaginator.
+    Attributes:
+        object_list (list): The objects on this page.
+        cursor (str | None): The cursor this page was requested with, None for the first page.
+        next_cursor (str | None): The cursor of the following page, None if this is the last page.
+    Properties:
+        has_next: True if there is a page after this one.
+        has_previous: True if this is not the first page.
+    """
+
+    def __init__(self, object_list, cursor, next_cursor):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return f'<KeysetPage cursor={self.cursor!r} size={len(self)}>'
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) paginator over a queryset with a deterministic ordering.
+
+    Instead of OFFSET, every page is fetched with a `WHERE (ordering) < (last row)` filter,
+    so with an index on the ordering columns page N costs the same as page 1.
+    The ordering must end with a unique field (usually the primary key) to break ties.
+
+    Args:
+        queryset (QuerySet): The queryset to paginate.
+        per_page (int): The number of objects on each page.
+        ordering (tuple, optional): Field names to order by, prefixed with '-' for descending order.
+    Example:
+        page = KeysetPaginator(AppUser.objects.all(), 20).get_page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, per_page: int, ordering: tuple = ('-created', '-id')):
+        if per_page < 1:
+            raise ValueError('per_page must be a positive integer')
+
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj) -> str:
+        values = [str(getattr(obj, field.attname)) for field in self.fields]
+        return urlsafe_base64_encode(force_bytes(json.dumps(values)))
+
+    def decode_cursor(self, cursor: str) -> list:
+        try:
+            values = json.loads(force_str(urlsafe_base64_decode(cursor)))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise InvalidCursor(f'Malformed cursor: {cursor}')
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error) as error:
+            raise InvalidCursor(f'Malformed cursor: {cursor}') from error
+
+    def _after(self, values) -> Q:
+        """
+        Builds the lexicographic `(a, b, c) > (x, y, z)` filter for the given cursor values,
+        honouring the direction of every ordering field.
+        """
+
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): values[position]
+                for position, previous in enumerate(self.ordering[:index])
+            }
+            condition |= Q(**equal, **{f'{name.lstrip("-")}__{lookup}': values[index]})
+        return condition
+
+    def page(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Returns the page following the given cursor.
+        Raises:
+            InvalidCursor: If the cursor cannot be decoded.
+        """
+
+        object_list = list(self._queryset(cursor))
+        return self._page(object_list, cursor)
+
+    async def apage(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Async version of `page`, fetching the rows with the async ORM.
+        """
+
+        object_list = [obj async for obj in self._queryset(cursor)]
+        return self._page(object_list, cursor)
+
+    def _queryset(self, cursor: str | None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+
+        return queryset[:self.per_page + 1]
+
+    def _page(self, object_list: list, cursor: str | None) -> KeysetPage:
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode_cursor(object_list[-1])
+
+        return KeysetPage(object_list, cursor or None, next_cursor)
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Returns the page following the given cursor, falling back to the first page
+        if the cursor is invalid.
+        """
+
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Async version of `get_page`.
+        """
+
+        try:
+            return await self.apage(cursor)
+        except InvalidCursor:
+            return await self.apage()
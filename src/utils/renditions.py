@@ -0,0 +1,79 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from utils.image_compression import check_image
+
+
+RENDITION_SIZES = (64, 128, 256, 512)
+
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'mime_type': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'mime_type': 'image/jpeg', 'options': {'quality': 80, 'optimize': True}},
+}
+
+
+def generate_renditions(file, storage, name: str) -> dict:
+    """
+    Generates downscaled copies of an image in every rendition size and format.
+
+    JPEG sources are decoded at a reduced scale with `Image.draft`, and every size is
+    produced from the previous, larger one, so the full-size image is never resized more than once.
+    Sizes larger than the source image are skipped.
+    Args:
+        file (File): The source image.
+        storage (Storage): The storage to save the renditions to.
+        name (str): Storage name of the source image, used to name the renditions.
+    Returns:
+        dict: Storage names of the renditions, keyed by format and then by size.
+            Example: {'webp': {'64': 'profiles/johndoe/renditions/abc_64.webp'}, 'jpeg': {...}}
+    """
+
+    path = PurePosixPath(name)
+    directory = path.parent / 'renditions'
+
+    renditions = {extension: {} for extension in RENDITION_FORMATS}
+    saved = []
+
+    largest = max(RENDITION_SIZES)
+
+    try:
+        with Image.open(file) as image:
+            check_image(image)
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            for size in sorted(RENDITION_SIZES, reverse=True):
+                if size > max(image.size):
+                    continue
+
+                image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+                for extension, config in RENDITION_FORMATS.items():
+                    buffer = BytesIO()
+                    image.save(buffer, format=config['format'], **config['options'])
+
+                    rendition = storage.save(f'{directory}/{path.stem}_{size}.{extension}', ContentFile(buffer.getvalue()))
+                    saved.append(rendition)
+                    renditions[extension][str(size)] = rendition
+    except Exception:
+        for rendition in saved:
+            storage.delete(rendition)
+        raise
+
+    return renditions
+
+
+def delete_renditions(storage, renditions: dict):
+    """
+    Deletes the rendition files returned by `generate_renditions` from the storage.
+    """
+
+    for names in (renditions or {}).values():
+        for name in names.values():
+            storage.delete(name)
@@ -0,0 +1,151 @@
+import time
+
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Alias the current view reads from, set by read_from_replica
+_read_alias = ContextVar('read_alias', default=None)
+
+# Whether the current request wrote to the database, set up by ReplicaPinMiddleware
+_wrote = ContextVar('wrote', default=None)
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of views decorated with `read_from_replica` to the
+    DATABASE_REPLICA alias. Everything else, writes included, uses the default database.
+
+    The replica is a copy of the default database, so it is never migrated and objects
+    read from either one can be related to each other.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, settings.DATABASE_REPLICA}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if settings.DATABASE_REPLICA and db == settings.DATABASE_REPLICA:
+            return False
+        return None
+
+
+def is_pinned(request) -> bool:
+    """
+    Returns whether the client wrote recently enough that the replica may not have the write yet.
+    """
+
+    try:
+        return float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_from_replica(view):
+    """
+    Decorator that runs the database reads of a view, sync or async, on the DATABASE_REPLICA alias.
+
+    Reads stay on the default database when no replica is configured, for requests that are
+    not GET or HEAD, and for clients pinned by ReplicaPinMiddleware after a write, so that
+    users see their own changes while the replica catches up.
+    Example:
+        @read_from_replica
+        def mentors_list(request):
+            ...
+    """
+
+    def use_replica(request) -> bool:
+        return bool(settings.DATABASE_REPLICA) and request.method in ('GET', 'HEAD') and not is_pinned(request)
+
+    if iscoroutinefunction(view):
+        # The alias is copied into the threads that run the async ORM queries
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not use_replica(request):
+                return await view(request, *args, **kwargs)
+
+            token = _read_alias.set(settings.DATABASE_REPLICA)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not use_replica(request):
+            return view(request, *args, **kwargs)
+
+        token = _read_alias.set(settings.DATABASE_REPLICA)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins clients to the default database for REPLICA_PIN_SECONDS after a request that wrote to it,
+    such as a profile edit, with a cookie holding the time the pin expires.
+    Does nothing when no replica is configured.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _wrote.set([False])
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _wrote.get()[0]
+            _wrote.reset(token)
+
+        return self.pin(request, response, wrote)
+
+    async def __acall__(self, request):
+        # Writes made in sync_to_async threads see a copy of the context, sharing the same list
+        token = _wrote.set([False])
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = _wrote.get()[0]
+            _wrote.reset(token)
+
+        return self.pin(request, response, wrote)
+
+    def pin(self, request, response, wrote: bool):
+        if wrote and settings.DATABASE_REPLICA:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, f'{time.time() + seconds:.0f}',
+                max_age=seconds, httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+
+        return response
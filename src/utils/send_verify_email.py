@@ -1,41 +1,64 @@
-from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.template.loader import render_to_string
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
+from django.urls import reverse
 from django.conf import settings
 
+from accounts.tokens import make_verify_token
+from utils.emails import EmailTemplate, send_many
 
-def send_verify_email(user):
+
+VERIFY_EMAIL = EmailTemplate('verify_email', 'Verify your email address')
+
+
+def verify_email_message(user, connection=None) -> EmailMultiAlternatives:
     """
-    Sends a verification email to the specified user.
+    Builds the verification email of the specified user.
 
-    Generates a unique verification URL for the user and sends
-    an email containing this URL to the user's registered email address.
+    Generates a unique verification URL for the user and renders
+    an email containing this URL, addressed to the user's registered email address.
 
     Args:
         user (User): The user object to whom the verification email will be sent.
+        connection (BaseEmailBackend, optional): The connection the message will be sent with.
+    Returns:
+        EmailMultiAlternatives: The unsent message, with a plain text and an HTML part.
     """
 
-    token_generator = PasswordResetTokenGenerator()
-
-    uid = urlsafe_base64_encode(force_bytes(user.pk))
-    token = token_generator.make_token(user)
+    token = make_verify_token(user)
     domain = settings.DOMAIN
-    verify_url = f'{domain}/accounts/verify-email/{uid}/{token}/'
+    verify_url = f'{domain}{reverse("accounts:verify_email", args=[token])}'
 
-    subject = 'Verify your email address'
-    message = render_to_string(
-        'emails/verify_email.html',
+    return VERIFY_EMAIL.message(
+        user.email,
         {
             'user': user,
             'verify_url': verify_url,
-        }
+        },
+        connection=connection,
     )
-    send_mail(
-        subject,
-        message,
-        settings.EMAIL_HOST_USER,
-        [user.email],
-        html_message=message
-    )
\ No newline at end of file
+
+
+def send_verify_email(user):
+    """
+    Sends a verification email to the specified user right away.
+
+    Registration queues the email in the outbox instead, see `accounts.outbox`.
+
+    Args:
+        user (User): The user object to whom the verification email will be sent.
+    """
+
+    verify_email_message(user).send()
+
+
+def send_verify_emails(users, connection=None) -> int:
+    """
+    Sends a verification email to each of the specified users over one connection.
+
+    Args:
+        users (Iterable[User]): The users to whom the verification emails will be sent.
+        connection (BaseEmailBackend, optional): The connection to use, defaults to a new one.
+    Returns:
+        int: The number of emails sent.
+    """
+
+    return send_many((verify_email_message(user) for user in users), connection=connection)
@@ -0,0 +1,300 @@
+import gzip
+import json
+import mimetypes
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf'}
+
+# Variants only worth keeping if they save at least 5%
+MIN_COMPRESSION_RATIO = 0.95
+
+# Strings and comments, which the whitespace rules must not touch
+_CSS_PRESERVED = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css: str) -> str:
+    """
+    Minifies a stylesheet: removes comments, except /*! licences, and the whitespace around
+    braces, semicolons, commas and child combinators. Strings are left as they are.
+    """
+
+    parts = []
+    for index, part in enumerate(_CSS_PRESERVED.split(css)):
+        if index % 2:
+            if not part.startswith('/*') or part.startswith('/*!'):
+                parts.append(part)
+            continue
+
+        part = _CSS_PUNCTUATION.sub(r'\1', re.sub(r'\s+', ' ', part))
+        if parts and parts[-1].endswith((' ', '{', '}', ';', ',', '>')):
+            # Whitespace left on both sides of a removed comment
+            part = part.lstrip()
+        parts.append(part.replace(';}', '}'))
+
+    return ''.join(parts).strip()
+
+
+def minify_js(js: str) -> str | None:
+    """
+    Minifies a script with rjsmin, when installed.
+    Returns:
+        str | None: The minified script, None if rjsmin is not installed.
+    """
+
+    return rjsmin.jsmin(js, keep_bang_comments=True) if rjsmin is not None else None
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def compress(path: str) -> list:
+    """
+    Writes the gzip variant of a file next to it, and the brotli one when brotli is installed.
+    Variants that are not smaller than the file by MIN_COMPRESSION_RATIO are not written.
+    Returns:
+        list: The paths of the variants written.
+    """
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    # No timestamp in the gzip header, so that the same file always compresses to the same bytes
+    variants = {'.gz': lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = lambda: brotli.compress(data, quality=11)
+
+    written = []
+    for suffix, build in variants.items():
+        compressed = build()
+        if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+            with open(path + suffix, 'wb') as file:
+                file.write(compressed)
+            written.append(path + suffix)
+
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that minifies and pre-compresses static files during `collectstatic`.
+
+    CSS, and JS when rjsmin is installed, is minified before the content hashes are computed,
+    except for files that are already minified (*.min.*). Every hashed file is then compressed
+    with gzip, and brotli when installed, for StaticFilesMiddleware to serve.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in paths:
+                self.minify(name)
+            # Hashed from the minified copies in STATIC_ROOT rather than the source files
+            paths = {name: (self, name) for name in paths}
+
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        if dry_run:
+            return
+
+        names = sorted({hashed for hashed in self.hashed_files.values() if self.is_compressible(hashed)})
+
+        # zlib and brotli release the GIL, so the files are compressed in parallel
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            for name, variants in zip(names, executor.map(compress, map(self.path, names))):
+                for variant in variants:
+                    yield name, os.path.relpath(variant, self.location), True
+
+    def minify(self, name: str):
+        base, extension = os.path.splitext(name)
+        minifier = MINIFIERS.get(extension)
+        if minifier is None or base.endswith('.min'):
+            return
+
+        path = self.path(name)
+        with open(path, encoding='utf-8') as file:
+            source = file.read()
+
+        minified = minifier(source)
+        if minified is not None and len(minified) < len(source):
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(minified)
+
+    @staticmethod
+    def is_compressible(name: str) -> bool:
+        return os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS
+
+
+@dataclass
+class StaticFile:
+    """
+    A file served by StaticFilesMiddleware.
+    Attributes:
+        content_type (str): Its Content-Type header.
+        immutable (bool): Whether its name holds its content hash, so it can be cached forever.
+        variants (dict): Path, size and ETag of each encoding, 'identity' included, in order of preference.
+        last_modified (str): Its Last-Modified header.
+    """
+
+    content_type: str
+    immutable: bool
+    variants: dict = field(default_factory=dict)
+    last_modified: str = ''
+
+
+class StaticFilesMiddleware:
+    """
+    Serves the collected static files from STATIC_ROOT, before the rest of the middleware runs.
+
+    Files with a content hash in their name (see CompressedManifestStaticFilesStorage) are sent
+    with a year long, immutable Cache-Control, others with STATIC_MAX_AGE and revalidated with
+    their ETag. Brotli and gzip variants built by `collectstatic` are sent to clients that
+    accept them. Responses are FileResponses, which WSGI servers with a wsgi.file_wrapper,
+    such as gunicorn, send with sendfile without copying the file through Python.
+
+    STATIC_ROOT is indexed once when the server starts, run `collectstatic` before restarting.
+    Disabled when STATIC_SERVE is off or STATIC_ROOT is empty, to serve the files from a CDN or proxy instead.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+        if not settings.STATIC_SERVE or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+
+        self.prefix = '/' + urlsplit(settings.STATIC_URL).path.strip('/') + '/'
+        self.files = self.index(str(settings.STATIC_ROOT))
+
+        if not self.files:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def index(self, root: str) -> dict:
+        """
+        Returns the files under `root` by URL path.
+        """
+
+        manifest = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+        hashed = set()
+        if os.path.exists(manifest):
+            with open(manifest, encoding='utf-8') as file:
+                hashed = set(json.load(file).get('paths', {}).values())
+
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            names = set(filenames)
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')) and filename[:-3] in names:
+                    continue
+
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+                    content_type += '; charset=utf-8'
+
+                static_file = StaticFile(content_type, immutable=name in hashed)
+                for encoding, suffix in (('br', '.br'), ('gzip', '.gz'), ('identity', '')):
+                    if suffix and filename + suffix not in names:
+                        continue
+                    stat = os.stat(path + suffix)
+                    static_file.variants[encoding] = (path + suffix, stat.st_size, f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"')
+                    if not suffix:
+                        static_file.last_modified = http_date(stat.st_mtime)
+
+                files[self.prefix + name] = static_file
+
+        return files
+
+    def serve(self, request):
+        """
+        Returns the response for a static file, None if the request is not for one.
+        """
+
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return None
+
+        encoding = self.negotiate(request.headers.get('Accept-Encoding', ''), static_file)
+        path, size, etag = static_file.variants[encoding]
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=static_file.content_type)
+            response['Content-Length'] = str(size)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            # FileResponse names the file after the variant, which would only confuse downloads
+            del response['Content-Disposition']
+
+        response['ETag'] = etag
+        response['Last-Modified'] = static_file.last_modified
+        response['Cache-Control'] = (
+            self.IMMUTABLE_CACHE_CONTROL if static_file.immutable else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        if len(static_file.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+
+        return response
+
+    @staticmethod
+    def negotiate(accept_encoding: str, static_file: StaticFile) -> str:
+        """
+        Returns the preferred encoding of the file the client accepts, honouring q=0 refusals.
+        """
+
+        accepted = set()
+        for item in accept_encoding.split(','):
+            coding, _, params = item.strip().partition(';')
+            if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(coding.strip().lower())
+
+        for encoding in static_file.variants:
+            if encoding == 'identity' or encoding in accepted or '*' in accepted:
+                return encoding
+
+        return 'identity'
@@ -0,0 +1,541 @@
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from uuid import uuid4
+
+from unittest import mock
+
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core import mail
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.db import router
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from accounts.models import AppUser
+from commands.management.commands.replicate_database import copy_sqlite
+
+from .cache import TieredCache, cache_config, get_or_compute
+from .database import database_config
+from .downloader import VendorDownloader, sri_hash
+from .emails import EmailTemplate, send_many
+from .replicas import ReplicaPinMiddleware, read_from_replica
+from .staticfiles import StaticFilesMiddleware, minify_css
+from .throttle import TokenBucket, parse_rate
+
+
+def make_cache(**options):
+    location = uuid4().hex
+    cache = TieredCache(location, {'OPTIONS': {'NAMESPACES': {'mentors': 'mentors:'}, **options}})
+    cache.shared = LocMemCache(location, {})
+    return cache
+
+
+class TieredCacheTests(SimpleTestCase):
+    """
+    Tests for the local LRU tier in front of the shared cache.
+    """
+
+    def test_local_tier_serves_recent_values(self):
+        cache = make_cache()
+        cache.set('mentors:a', 1)
+        cache.shared.delete('mentors:a')
+
+        self.assertEqual(cache.get('mentors:a'), 1)
+        self.assertEqual(cache.stats.snapshot()['mentors']['local_hits'], 1)
+
+    def test_local_copies_expire(self):
+        cache = make_cache(LOCAL_TIMEOUT=0)
+        cache.set('mentors:a', 1)
+        cache.shared.set('mentors:a', 2)
+
+        self.assertEqual(cache.get('mentors:a'), 2)
+        self.assertEqual(cache.stats.snapshot()['mentors']['hits'], 1)
+
+    def test_delete_reaches_both_tiers(self):
+        cache = make_cache()
+        cache.set('a', 1)
+        cache.delete('a')
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats.snapshot()['other']['misses'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = make_cache(LOCAL_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.shared.clear()
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+
+    def test_shared_only_keys_are_not_kept_locally(self):
+        # Two processes, each with a local tier, in front of the same shared cache
+        first = make_cache(SHARED_ONLY=('django.contrib.sessions.',))
+        second = make_cache(SHARED_ONLY=('django.contrib.sessions.',))
+        second.shared = first.shared
+
+        session = SessionStore()
+        session._cache = first
+        session['user'] = 1
+        session.save()
+
+        other = SessionStore(session.session_key)
+        other._cache = second
+        self.assertEqual(other.load(), {'user': 1})
+
+        session.delete()
+
+        other = SessionStore(session.session_key)
+        other._cache = second
+        self.assertEqual(other.load(), {})
+
+    def test_cache_config_from_url(self):
+        self.assertEqual(cache_config('', '/tmp/x')['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertEqual(cache_config('redis://localhost:6379/1', '')['LOCATION'], 'redis://localhost:6379/1')
+        self.assertEqual(cache_config('db://cache_table', '')['LOCATION'], 'cache_table')
+        with self.assertRaises(ValueError):
+            cache_config('memcached://localhost', '')
+
+
+class GetOrComputeTests(SimpleTestCase):
+    """
+    Tests for the stampede protected memoisation helper.
+    """
+
+    def setUp(self):
+        self.cache = make_cache()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_computed_once(self):
+        for _ in range(3):
+            value = get_or_compute('mentors:x', self.compute, cache=self.cache)
+
+        self.assertEqual(value, 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_another_caller_refreshes(self):
+        get_or_compute('mentors:x', self.compute, timeout=0, stale=60, cache=self.cache)
+        self.cache.add('mentors:x:lock', 1)
+
+        self.assertEqual(get_or_compute('mentors:x', self.compute, timeout=0, cache=self.cache), 1)
+        self.assertEqual(self.calls, 1)
+
+        self.cache.delete('mentors:x:lock')
+        self.assertEqual(get_or_compute('mentors:x', self.compute, timeout=0, cache=self.cache), 2)
+
+    def test_miss_waits_for_the_lock_holder(self):
+        self.cache.add('mentors:x:lock', 1)
+
+        started = time.monotonic()
+        value = get_or_compute('mentors:x', self.compute, wait=0.1, cache=self.cache)
+
+        self.assertEqual(value, 1)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+
+class EmailTemplateTests(SimpleTestCase):
+    """
+    Tests for the compiled email templates and batched sending.
+    """
+
+    def test_templates_are_loaded_once(self):
+        email = EmailTemplate('verify_email', 'Verify your email address')
+        context = {'user': {'username': 'johndoe'}, 'verify_url': 'http://testserver/verify/'}
+
+        with mock.patch('utils.emails.get_template', wraps=get_template) as loader:
+            first = email.message('johndoe@example.com', context)
+            email.message('janedoe@example.com', context)
+
+        self.assertEqual(loader.call_count, 2)
+        self.assertIn('http://testserver/verify/', first.body)
+        self.assertNotIn('<', first.body)
+        self.assertEqual(first.alternatives[0][1], 'text/html')
+
+    def test_send_many_uses_one_connection(self):
+        email = EmailTemplate('verify_email', 'Verify your email address')
+        context = {'user': {'username': 'johndoe'}, 'verify_url': 'http://testserver/verify/'}
+        connection = get_connection()
+
+        with mock.patch.object(connection, 'send_messages', wraps=connection.send_messages) as send_messages:
+            sent = send_many(
+                (email.message(f'user{index}@example.com', context) for index in range(5)),
+                connection=connection,
+                chunk_size=2,
+            )
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(send_messages.call_count, 3)
+
+
+class TokenBucketTests(SimpleTestCase):
+    """
+    Tests for the token bucket rate limiter.
+    """
+
+    def setUp(self):
+        self.cache = LocMemCache(uuid4().hex, {})
+        patcher = mock.patch.object(TokenBucket, 'cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('100/5m'), (100, 300))
+        with self.assertRaises(ValueError):
+            parse_rate('10 per minute')
+
+    def test_bucket_allows_burst_then_refills(self):
+        bucket = TokenBucket('test', '3/m')
+
+        with mock.patch('utils.throttle.time.time', return_value=1000.0):
+            self.assertEqual([bucket.consume('key') for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(bucket.consume('key'), 20.0)
+
+        with mock.patch('utils.throttle.time.time', return_value=1020.0):
+            self.assertEqual(bucket.consume('key'), 0.0)
+            self.assertGreater(bucket.consume('key'), 0.0)
+
+    def test_throttled_key_is_rejected_without_cache(self):
+        bucket = TokenBucket('test', '1/m')
+        bucket.consume('key')
+
+        with mock.patch.object(self.cache, 'get') as get:
+            self.assertGreater(bucket.consume('key'), 0.0)
+
+        get.assert_not_called()
+
+    def test_concurrent_requests_cannot_spend_the_same_token(self):
+        get = self.cache.get
+
+        def slow_get(*args, **kwargs):
+            # Widens the window between reading and writing the bucket
+            value = get(*args, **kwargs)
+            time.sleep(0.005)
+            return value
+
+        barrier = threading.Barrier(10)
+        allowed = []
+
+        def attempt():
+            # Separate buckets, as in separate processes
+            bucket = TokenBucket('test', '3/m')
+            barrier.wait()
+            allowed.append(bucket.consume('key') == 0.0)
+
+        with mock.patch.object(self.cache, 'get', side_effect=slow_get):
+            threads = [threading.Thread(target=attempt) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sum(allowed), 3)
+
+    def test_buckets_are_shared_through_the_cache(self):
+        TokenBucket('test', '1/m').consume('key')
+
+        # Another process, with nothing in memory
+        self.assertGreater(TokenBucket('test', '1/m').consume('key'), 0.0)
+        self.assertEqual(TokenBucket('test', '1/m').consume('other'), 0.0)
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    """
+    Tests for building database settings from a DATABASE_URL.
+    """
+
+    def test_empty_url_selects_tuned_sqlite(self):
+        config = database_config('', '/srv/db.sqlite3')
+
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], '/srv/db.sqlite3')
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA journal_mode=WAL', config['OPTIONS']['init_command'])
+
+    def test_sqlite_query_overrides_pragmas(self):
+        config = database_config('sqlite:////tmp/db.sqlite3?timeout=5&synchronous=FULL', 'unused')
+
+        self.assertEqual(config['NAME'], '/tmp/db.sqlite3')
+        self.assertEqual(config['OPTIONS']['timeout'], 5.0)
+        self.assertIn('PRAGMA synchronous=FULL', config['OPTIONS']['init_command'])
+        self.assertNotIn('synchronous=NORMAL', config['OPTIONS']['init_command'])
+
+    def test_postgres_url(self):
+        config = database_config(
+            'postgres://snugly:p%40ss@db:5433/snugly?sslmode=require&disable_server_side_cursors=true',
+            'unused', conn_max_age=300,
+        )
+
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['USER'], config['PASSWORD'], config['HOST'], config['PORT']), ('snugly', 'p@ss', 'db', 5433))
+        self.assertEqual(config['CONN_MAX_AGE'], 300)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+
+    def test_unknown_scheme_raises(self):
+        with self.assertRaises(ValueError):
+            database_config('mysql://db/snugly', 'unused')
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    Tests for routing the reads of read-only views to the replica.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = read_from_replica(lambda request: router.db_for_read(AppUser))
+
+    def test_decorated_view_reads_from_replica(self):
+        self.assertEqual(self.view(self.factory.get('/')), 'replica')
+        self.assertEqual(router.db_for_read(AppUser), 'default')
+        self.assertEqual(router.db_for_write(AppUser), 'default')
+
+    def test_writes_and_pinned_clients_read_from_default(self):
+        pinned = self.factory.get('/')
+        pinned.COOKIES['primary_pin'] = str(time.time() + 10)
+        expired = self.factory.get('/')
+        expired.COOKIES['primary_pin'] = str(time.time() - 10)
+
+        self.assertEqual(self.view(self.factory.post('/')), 'default')
+        self.assertEqual(self.view(pinned), 'default')
+        self.assertEqual(self.view(expired), 'replica')
+
+    def test_middleware_pins_clients_that_wrote(self):
+        def write(request):
+            router.db_for_write(AppUser)
+            return HttpResponse()
+
+        wrote = ReplicaPinMiddleware(write)(self.factory.post('/'))
+        read = ReplicaPinMiddleware(lambda request: HttpResponse())(self.factory.get('/'))
+
+        self.assertIn('primary_pin', wrote.cookies)
+        self.assertNotIn('primary_pin', read.cookies)
+
+    def test_copy_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = os.path.join(directory, 'source.sqlite3'), os.path.join(directory, 'target.sqlite3')
+            with closing(sqlite3.connect(source)) as db:
+                db.executescript("CREATE TABLE mentors (name TEXT); INSERT INTO mentors VALUES ('ada');")
+
+            copy_sqlite(source, target)
+
+            with closing(sqlite3.connect(target)) as db:
+                self.assertEqual(db.execute('SELECT name FROM mentors').fetchall(), [('ada',)])
+
+
+class StaticPipelineTests(SimpleTestCase):
+    """
+    Tests for the hashed, minified and pre-compressed static files and their middleware.
+    """
+
+    STYLESHEET = """
+        /*! Licence */
+        /* Layout */
+        body ,
+        main > p {
+            content: "a ,  b";
+            margin: 0 auto ;
+        }
+    """ + '.filler { color: red; }\n' * 50
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        source = os.path.join(directory.name, 'source')
+        self.root = os.path.join(directory.name, 'root')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as file:
+            file.write(self.STYLESHEET)
+
+        settings = override_settings(
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATIC_ROOT=self.root,
+            STATIC_URL='/static/',
+            STATIC_SERVE=True,
+            STATIC_MAX_AGE=60,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'utils.staticfiles.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        with open(os.path.join(self.root, 'staticfiles.json')) as file:
+            self.hashed = json.load(file)['paths']['css/site.css']
+
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse('app'))
+        self.factory = RequestFactory()
+
+    def test_minify_css_keeps_strings_and_licences(self):
+        self.assertEqual(
+            minify_css(self.STYLESHEET[:150]),
+            '/*! Licence */ body,main>p{content: "a ,  b";margin: 0 auto}',
+        )
+
+    def test_collectstatic_hashes_minified_file_and_compresses_it(self):
+        with open(os.path.join(self.root, self.hashed)) as file:
+            content = file.read()
+        with gzip.open(os.path.join(self.root, self.hashed + '.gz'), 'rt') as file:
+            self.assertEqual(file.read(), content)
+
+        self.assertEqual(content, minify_css(self.STYLESHEET))
+
+    def test_middleware_negotiates_encoding_and_caches_hashed_files(self):
+        url = f'/static/{self.hashed}'
+
+        response = self.middleware(self.factory.get(url, headers={'Accept-Encoding': 'gzip, deflate'}))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        refused = self.middleware(self.factory.get(url, headers={'Accept-Encoding': 'gzip;q=0'}))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(refused.streaming_content).decode(), minify_css(self.STYLESHEET))
+
+        revalidated = self.middleware(self.factory.get(url, headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag'],
+        }))
+        self.assertEqual(revalidated.status_code, 304)
+
+        self.assertEqual(self.middleware(self.factory.get('/static/css/site.css'))['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.middleware(self.factory.get('/static/css/missing.css')).content, b'app')
+        self.assertEqual(self.middleware(self.factory.post(url)).content, b'app')
+
+
+class VendorServer(ThreadingHTTPServer):
+    """
+    Local stand-in for a CDN, serving `files` with ETags and answering conditional requests.
+    """
+
+    def __init__(self, files: dict):
+        self.files = files
+        self.requests = []
+        super().__init__(('127.0.0.1', 0), VendorRequestHandler)
+
+    def url(self, name: str) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/{name}'
+
+
+class VendorRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        self.server.requests.append((name, self.headers.get('If-None-Match')))
+
+        if name not in self.server.files:
+            self.send_error(404)
+            return
+
+        content = self.server.files[name]
+        etag = f'"{hash(content):x}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class VendorDownloaderTests(SimpleTestCase):
+    """
+    Tests for the concurrent, conditional and locked vendor file downloads.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name) / 'vendor'
+        self.lockfile = Path(directory.name) / 'vendor.lock.json'
+
+        self.server = VendorServer({'app.css': b'.app{color:red}' * 10_000, 'app.js': b'console.log(1)'})
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.files = {name: self.server.url(name) for name in ('app.css', 'app.js')}
+
+    def pull(self, **options):
+        return {result.name: result for result in VendorDownloader(self.directory, self.lockfile, **options).pull(self.files)}
+
+    def test_downloads_files_and_locks_their_hashes(self):
+        results = self.pull()
+
+        self.assertEqual({name: result.status for name, result in results.items()}, {'app.css': 'downloaded', 'app.js': 'downloaded'})
+        self.assertEqual((self.directory / 'app.css').read_bytes(), self.server.files['app.css'])
+
+        lock = json.loads(self.lockfile.read_text())
+        self.assertEqual(lock['app.css']['integrity'], sri_hash(self.directory / 'app.css'))
+        self.assertTrue(lock['app.css']['integrity'].startswith('sha384-'))
+        self.assertEqual(VendorDownloader(self.directory, self.lockfile).check(self.files), [])
+
+    def test_unchanged_files_are_requested_conditionally_and_kept(self):
+        self.pull()
+        modified = (self.directory / 'app.css').stat().st_mtime_ns
+        self.server.requests.clear()
+
+        results = self.pull()
+
+        self.assertEqual({result.status for result in results.values()}, {'unchanged'})
+        self.assertTrue(all(etag for _, etag in self.server.requests))
+        self.assertEqual((self.directory / 'app.css').stat().st_mtime_ns, modified)
+
+    def test_changed_upstream_file_is_updated_unless_frozen(self):
+        self.pull()
+        self.server.files['app.js'] = b'console.log(2)'
+
+        with self.assertLogs('utils.downloader', 'ERROR'):
+            frozen = self.pull(frozen=True)
+        self.assertEqual(frozen['app.js'].status, 'failed')
+        self.assertEqual((self.directory / 'app.js').read_bytes(), b'console.log(1)')
+
+        self.assertEqual(self.pull()['app.js'].status, 'updated')
+        self.assertEqual((self.directory / 'app.js').read_bytes(), b'console.log(2)')
+
+    def test_failed_download_leaves_no_partial_file(self):
+        self.files['missing.css'] = self.server.url('missing.css')
+
+        with self.assertLogs('utils.downloader', 'ERROR'):
+            results = self.pull()
+
+        self.assertEqual(results['missing.css'].status, 'failed')
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), ['app.css', 'app.js'])
+        self.assertNotIn('missing.css', json.loads(self.lockfile.read_text()))
+
+    def test_check_detects_modified_files(self):
+        self.pull()
+        (self.directory / 'app.js').write_bytes(b'tampered')
+
+        self.assertEqual(VendorDownloader(self.directory, self.lockfile).check(self.files), ['app.js'])
@@ -0,0 +1,196 @@
+import hashlib
+import math
+import time
+
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """
+    Parses a rate like '10/m' into the number of requests and the period in seconds.
+    Periods are s, m, h or d, optionally with a multiplier such as '100/5m'.
+    Raises:
+        ValueError: If the rate is malformed.
+    """
+
+    count, _, period = rate.partition('/')
+    multiplier, unit = period[:-1] or '1', period[-1:]
+
+    if unit not in PERIODS or not count.isdigit() or not multiplier.isdigit():
+        raise ValueError(f'Invalid rate: {rate!r}')
+
+    return int(count), int(multiplier) * PERIODS[unit]
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter shared by every process through a cache.
+
+    A bucket holds up to `count` tokens and refills at `count` tokens per `period`, so it
+    allows bursts of `count` requests and `count` per period after that. It is stored as a
+    single timestamp (the generic cell rate algorithm): the time at which the bucket would be
+    full again, which is moved forward by one refill interval per consumed token. The timestamp
+    is read and written under a short lock taken with `cache.add()`, so concurrent requests from
+    several processes cannot all spend the same token. The lock is as strict as the cache's `add()`,
+    which is atomic on Redis, database and local memory caches.
+
+    Every process remembers the last timestamp it saw for a key. While that one already throttles
+    the key, requests are rejected without asking the cache, so a burst against one process costs
+    no cache round trips. That memory is a plain dict accessed without locks, a lost update only
+    sends the next request to the cache.
+    Args:
+        name (str): Name of the bucket, looked up in THROTTLE_RATES and prefixed to its cache keys.
+        rate (str, optional): The rate, such as '10/m'. Defaults to THROTTLE_RATES[name].
+    Methods:
+        consume(key): Takes a token, returns 0 if it was allowed or the seconds to wait otherwise.
+        reset(key): Refills the bucket of the key.
+    """
+
+    LOCAL_MAX_KEYS = 10_000
+
+    # Seconds after which the lock of a crashed process expires, and seconds waited for a held lock
+    LOCK_TIMEOUT = 2
+    LOCK_WAIT = 0.5
+
+    def __init__(self, name: str, rate: str | None = None):
+        self.name = name
+        self._rate = rate
+        self._local = {}
+
+    @property
+    def rate(self) -> tuple[int, int]:
+        # Read on every call so that the rates can be changed in settings and tests
+        return parse_rate(self._rate or settings.THROTTLE_RATES[self.name])
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def cache_key(self, key: str) -> str:
+        # Keys may be user input, hashing them keeps them short and valid for every backend
+        return f'throttle:{self.name}:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}'
+
+    def consume(self, key: str) -> float:
+        count, period = self.rate
+        interval = period / count
+        tolerance = period - interval
+        now = time.time()
+
+        local = self._local.get(key)
+        if local is not None and local - now > tolerance:
+            return local - now - tolerance
+
+        cache_key = self.cache_key(key)
+        if not self._lock(cache_key):
+            # Requests for the key queued up behind the lock, which only happens during a burst
+            return interval
+
+        try:
+            now = time.time()
+            full_at = max(self.cache.get(cache_key) or now, now)
+
+            if full_at - now > tolerance:
+                self._remember(key, full_at, now)
+                return full_at - now - tolerance
+
+            full_at += interval
+            self.cache.set(cache_key, full_at, timeout=math.ceil(full_at - now) + 1)
+            self._remember(key, full_at, now)
+        finally:
+            self.cache.delete(f'{cache_key}:lock')
+
+        return 0.0
+
+    def _lock(self, cache_key: str) -> bool:
+        deadline = time.monotonic() + self.LOCK_WAIT
+
+        while not self.cache.add(f'{cache_key}:lock', 1, timeout=self.LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+
+        return True
+
+    def reset(self, key: str):
+        self._local.pop(key, None)
+        self.cache.delete(self.cache_key(key))
+
+    def _remember(self, key: str, full_at: float, now: float):
+        if len(self._local) >= self.LOCAL_MAX_KEYS:
+            for stale in [stale for stale, until in list(self._local.items()) if until <= now]:
+                self._local.pop(stale, None)
+            if len(self._local) >= self.LOCAL_MAX_KEYS:
+                self._local.clear()
+
+        self._local[key] = full_at
+
+
+_buckets = {}
+
+
+def get_bucket(name: str) -> TokenBucket:
+    """
+    Returns the process-wide bucket of the given name, creating it on first use.
+    """
+
+    if name not in _buckets:
+        _buckets.setdefault(name, TokenBucket(name))
+    return _buckets[name]
+
+
+def client_ip(request) -> str:
+    """
+    Returns the IP address of the client. Behind THROTTLE_PROXY_COUNT reverse proxies it is
+    taken from X-Forwarded-For, counting from the right, since clients can prepend to the header.
+    """
+
+    proxies = settings.THROTTLE_PROXY_COUNT
+    if proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def throttle(name: str, key=client_ip, methods=('POST',)):
+    """
+    Decorator that rate limits a view with the token bucket `name` before the view runs.
+
+    Throttled requests get a 429 response with a Retry-After header. Requests the key
+    function returns an empty key for are not counted.
+    Args:
+        name (str): Name of the bucket, whose rate is THROTTLE_RATES[name].
+        key (callable, optional): Returns the key to count the request under. Defaults to the client IP.
+        methods (tuple, optional): The HTTP methods that are counted.
+    Example:
+        @throttle('login:ip')
+        @throttle('login:username', key=lambda request: request.POST.get('username', '').lower())
+        def login_user(request):
+            ...
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.THROTTLE_ENABLED and request.method in methods:
+                request_key = key(request)
+                retry_after = get_bucket(name).consume(request_key) if request_key else 0
+
+                if retry_after:
+                    response = render(request, 'throttled.html', {'title': 'Too Many Requests'}, status=429)
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator